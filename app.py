@@ -1,5 +1,26 @@
+import time
+
+# Start of this run, the first run of a process also imports the modules below (cold start)
+run_started = time.perf_counter()
+
 import streamlit as st
 
+from utils.lazy import import_in_background, loaded
+from utils.profiling import profile_imports, record_first_render
+
+# With PROFILE_STARTUP=1, time every module imported from here on (see utils/profiling.py)
+profile_imports()
+
+# Imported in the background once the first page is drawn, the landing pages need none of them
+DEMO_MODULES = [
+    "agno.agent",
+    "agno.team",
+    "agno.models.openai",
+    "utils.registry",
+    "utils.knowledge",
+    "utils.search_cache",
+]
+
 #### HIDE MENU BUTTON ADN OTHER DEFAULT ELEMENTS ###
 hide_streamlit_style = """
 <style>
@@ -63,6 +84,10 @@ pg = st.navigation(
     }
 )
 
+# Keep tmp/ within its disk budget (session TTL, vacuum, LanceDB cleanup), once per process.
+# utils.maintenance pulls in lancedb and agno, so it's imported in the background, not before the first paint
+import_in_background("utils.maintenance", then=lambda maintenance: maintenance.start_background_maintenance())
+
 # --- SHARED ON ALL PAGES ---
 st.sidebar.markdown("## Resources")
 st.sidebar.markdown(
@@ -73,6 +98,16 @@ st.sidebar.markdown(
     """
 )
 
+# Hit rate of the web search cache shared by the demos, once one of them has loaded it
+search_cache = loaded("utils.search_cache")
+if search_cache is not None:
+    search_cache.render_search_cache_stats()
+
+# Busy workers and queue wait of the agent and team runs, once a demo has started one
+run_executor = loaded("utils.run_executor")
+if run_executor is not None:
+    run_executor.render_run_stats()
+
 # Add separator and space between resources and attribution
 st.sidebar.markdown("---")
 st.sidebar.markdown("")  # Empty line for spacing
@@ -85,3 +120,7 @@ st.sidebar.markdown(
 
 # Running the app
 pg.run()
+
+# Cold start and first paint of every page, warned about when over FIRST_RENDER_BUDGET_MS
+record_first_render(pg.title, time.perf_counter() - run_started)
+import_in_background(*DEMO_MODULES)
@@ -0,0 +1 @@
+"""Benchmarks for the Streamlit views and the shared helpers in `utils`."""
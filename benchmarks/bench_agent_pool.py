@@ -0,0 +1,141 @@
+"""Concurrent-user throughput and resident memory: one shared agent vs the agent pool.
+
+Simulates N browser sessions chatting with the Level 2 style agent (session storage,
+3 history runs) against a local OpenAI stub, so no network access is needed:
+
+- shared: the previous setup, one cached Agent for every session. Its run state is not
+  safe to share, so runs are serialized behind a lock (and every model call opens a new
+  OpenAI client and connection pool).
+- pool: one agent per session from `AgentPool`, all models on the shared HTTP client,
+  runs in parallel.
+
+Each variant runs in a fresh subprocess, and reports turns per second, the p50/p95
+latency of a turn as seen by its user (including the time queued on the lock) and the
+process RSS once every user is done.
+
+Usage:
+    python -m benchmarks.bench_agent_pool [--users 1 10 100] [--turns 3] [--latency 0.2]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.stubs import StubOpenAIServer
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = r"""
+import json, statistics, sys, threading, time, uuid
+
+def rss_kb():
+    for line in open("/proc/self/status"):
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1])
+
+from agno.agent import Agent
+from agno.models.openai import OpenAIChat
+from utils.agent_pool import AgentPool
+from utils.registry import get_http_client, get_storage
+
+mode, users, turns = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+storage = get_storage(table_name="agent_sessions", db_file="tmp/agent.db", history_runs=3)
+
+def build(session_id=None, http_client=None):
+    return Agent(
+        name="Agno AGI",
+        model=OpenAIChat(id="gpt-4.1-mini", http_client=http_client),
+        instructions="Answer questions about Agno.",
+        storage=storage,
+        add_history_to_messages=True,
+        num_history_runs=3,
+        session_id=session_id,
+        markdown=True,
+    )
+
+if mode == "shared":
+    shared_agent, lock = build(), threading.Lock()
+    def run(session_id, prompt):
+        with lock:
+            return shared_agent.run(prompt, session_id=session_id)
+else:
+    http_client = get_http_client()
+    pool = AgentPool(lambda session_id: build(session_id, http_client))
+    def run(session_id, prompt):
+        return pool.get(session_id).run(prompt)
+
+latencies, barrier = [], threading.Barrier(users)
+def user():
+    session_id = str(uuid.uuid4())
+    barrier.wait()
+    for turn in range(turns):
+        start = time.perf_counter()
+        run(session_id, f"Question {turn}: how do agents use tools?")
+        latencies.append(time.perf_counter() - start)
+
+threads = [threading.Thread(target=user) for _ in range(users)]
+start = time.perf_counter()
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+elapsed = time.perf_counter() - start
+
+latencies.sort()
+result = {
+    "turns_per_s": len(latencies) / elapsed,
+    "p50_ms": statistics.median(latencies) * 1000,
+    "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+    "rss_mb": rss_kb() / 1024,
+}
+if mode == "pool":
+    result["pool"] = pool.snapshot()
+print(json.dumps(result))
+"""
+
+
+def run_child(mode: str, users: int, turns: int, base_url: str) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "PYTHONPATH": str(REPO_ROOT),
+            "OPENAI_BASE_URL": base_url,
+            "OPENAI_API_KEY": "sk-stub",
+        }
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD, mode, str(users), str(turns)],
+            cwd=tmp,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub time to first token, in seconds")
+    args = parser.parse_args()
+
+    print(f"{'mode':>7} {'users':>6} {'turns/s':>9} {'p50':>9} {'p95':>9} {'rss':>9}  pool")
+    with StubOpenAIServer(latency=args.latency) as server:
+        for users in args.users:
+            for mode in ("shared", "pool"):
+                result = run_child(mode, users, args.turns, server.base_url)
+                pool = result.get("pool")
+                pool_stats = f"{pool['size']} agents, {pool['hits']} hits" if pool else ""
+                print(
+                    f"{mode:>7} {users:>6} {result['turns_per_s']:>9.1f} {result['p50_ms']:>7.0f}ms "
+                    f"{result['p95_ms']:>7.0f}ms {result['rss_mb']:>7.1f}MB  {pool_stats}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Rerun cost of a chat page as its history grows.
+
+Runs a chat page with a transcript of 10, 100 and 1000 turns (a question and an
+answer of `--words` words each) in Streamlit's AppTest, and times a rerun, what
+every message sent or button clicked costs:
+
+- full: what the views did, every message of the transcript drawn on each rerun
+- windowed: utils.chat_history.render_history, the latest HISTORY_WINDOW messages
+
+Also counts the websocket bytes of the rerun's messages, once the browser has
+them in its cache (elements over `global.minCachedMessageSize` are then only
+referenced by hash, .streamlit/config.toml).
+
+Usage:
+    python -m benchmarks.bench_chat_history [--turns 10 100 1000] [--words 400] [--reruns 5]
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import time
+
+from streamlit import config
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.runtime.forward_msg_cache import populate_hash_if_needed
+from streamlit.string_util import clean_text
+from streamlit.testing.v1 import AppTest
+
+
+def chat_page(windowed: bool):
+    import streamlit as st
+
+    from utils.chat_history import render_history
+
+    if windowed:
+        render_history(st.session_state.messages, key="bench")
+    else:
+        for message in st.session_state.messages:
+            with st.chat_message(message["role"]):
+                st.markdown(message["content"])
+
+
+def make_transcript(turns: int, words: int) -> list:
+    rng = random.Random(0)
+    vocabulary = ["market", "investors", "2025", "growth", "rates", "the", "and", "**agents**", "`code`"]
+    messages = []
+    for turn in range(turns):
+        messages.append({"role": "user", "content": f"Question {turn}: what about the markets?"})
+        answer = " ".join(rng.choice(vocabulary) for _ in range(words))
+        messages.append({"role": "assistant", "content": f"Answer {turn}: {answer}"})
+    return messages
+
+
+def rerun_bytes(contents: list) -> int:
+    """Websocket bytes of the markdown elements of a rerun, the browser having them cached."""
+    total = 0
+    for content in contents:
+        message = ForwardMsg()
+        message.delta.new_element.markdown.body = clean_text(content)
+        populate_hash_if_needed(message)
+        if not message.metadata.cacheable:
+            total += len(message.SerializeToString())
+        else:
+            # Sent as a reference to the hash
+            total += len(message.hash) + 16
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--words", type=int, default=400)
+    parser.add_argument("--reruns", type=int, default=5)
+    args = parser.parse_args()
+
+    # Outside of a server, Streamlit warns about every element drawn
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+    # As in .streamlit/config.toml, AppTest doesn't read it
+    config.set_option("global.minCachedMessageSize", 2000)
+    print(f"{'turns':>6} {'mode':>9} {'drawn':>6} {'rerun p50':>10} {'websocket':>10}")
+    for turns in args.turns:
+        messages = make_transcript(turns, args.words)
+        for mode in ("full", "windowed"):
+            app = AppTest.from_function(chat_page, args=(mode == "windowed",), default_timeout=120)
+            app.session_state["messages"] = messages
+            # First run, Streamlit and the page's modules are then loaded
+            app.run()
+            timings = []
+            for _ in range(args.reruns):
+                start = time.perf_counter()
+                app.run()
+                timings.append(time.perf_counter() - start)
+            drawn = [element.value for element in app.markdown]
+            print(
+                f"{turns:>6} {mode:>9} {len(drawn):>6} {statistics.median(timings) * 1000:>8.1f}ms "
+                f"{rerun_bytes(drawn) / 1e3:>8.1f}kB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Time to first token and wall-clock of the Level 4 content team, coordinate vs pipelined.
+
+Runs the three suggested Level 4 prompts against a local OpenAI stub (every call waits
+`--latency` then streams `--tokens` tokens), so only the orchestration differs:
+
+- coordinate: the Team's coordinator transfers the topic to the Researcher, then to the
+  Writer, then writes the final answer. Nothing is visible before the last stage.
+- pipelined: ContentPipeline, sub-queries researched concurrently, the Writer streaming
+  one part per research section as they land, the editor reviewing in the background.
+
+Usage:
+    python -m benchmarks.bench_content_pipeline [--latency 0.5] [--tokens 150]
+"""
+
+import argparse
+import os
+import time
+
+from agno.agent import Agent
+from agno.models.openai import OpenAIChat
+from agno.team import Team
+
+from benchmarks.stubs import StubOpenAIServer
+from utils.content_pipeline import ContentPipeline
+
+PROMPTS = [
+    "Provide a concise summary of 2025 investment trends",
+    "Create a short brief on cryptocurrency regulations",
+    "Draft a brief article about sustainable investing strategies",
+]
+# The coordinator delegates to the Researcher, then to the Writer, then answers
+TRANSFERS = [
+    {"member_id": "researcher", "task_description": "Research the topic", "expected_output": "A Knowledge Report"},
+    {"member_id": "writer", "task_description": "Write the article", "expected_output": "The article"},
+]
+
+
+def researcher() -> Agent:
+    return Agent(name="Researcher", role="Finds financial information", model=OpenAIChat(id="gpt-4.1-mini"))
+
+
+def writer() -> Agent:
+    return Agent(name="Writer", role="Writes financial articles", model=OpenAIChat(id="gpt-4.1-mini"))
+
+
+def editor() -> Agent:
+    return Agent(name="Editor", model=OpenAIChat(id="gpt-4.1-mini"))
+
+
+def run_coordinate(prompt: str) -> dict:
+    team = Team(
+        name="Content Team",
+        mode="coordinate",
+        model=OpenAIChat(id="gpt-4.1-mini"),
+        members=[researcher(), writer()],
+    )
+    start, first = time.perf_counter(), None
+    for chunk in team.run(prompt, stream=True):
+        if chunk.content and first is None:
+            first = time.perf_counter()
+    return {"ttft": first - start, "total": time.perf_counter() - start}
+
+
+def run_pipelined(prompt: str) -> dict:
+    pipeline = ContentPipeline(researcher=researcher, writer=writer, editor=editor)
+    start, first = time.perf_counter(), None
+    for event in pipeline.run(prompt):
+        if event.stage == "draft" and first is None:
+            first = time.perf_counter()
+    return {"ttft": first - start, "total": time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub time to first token, in seconds")
+    parser.add_argument("--tokens", type=int, default=150, help="Tokens streamed by every stub call")
+    args = parser.parse_args()
+
+    stub = StubOpenAIServer(
+        latency=args.latency, tokens=args.tokens, tool_calls={"transfer_task_to_member": TRANSFERS}
+    )
+    with stub as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-stub")
+        print(f"{'mode':>11} {'ttft':>8} {'total':>8}  prompt")
+        for prompt in PROMPTS:
+            for mode, run in (("coordinate", run_coordinate), ("pipelined", run_pipelined)):
+                result = run(prompt)
+                print(f"{mode:>11} {result['ttft']:>7.2f}s {result['total']:>7.2f}s  {prompt}")
+
+
+if __name__ == "__main__":
+    main()
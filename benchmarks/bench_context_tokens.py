@@ -0,0 +1,91 @@
+"""Report the prompt tokens of a Level 1b turn with the JSON context and with the compact one.
+
+Builds the real system message of the Level 1b agent both ways and counts its tokens
+with the model's tokenizer. Uses the persisted HackerNews snapshot when there is one,
+synthetic stories otherwise.
+
+Usage:
+    python -m benchmarks.bench_context_tokens [--stories 5] [--turns 5]
+"""
+
+import argparse
+import json
+from pathlib import Path
+from textwrap import dedent
+
+from agno.agent import Agent
+from agno.models.openai import OpenAIChat
+
+from benchmarks.stubs import StubHackerNewsServer
+from utils.context import compact_stories
+from utils.hackernews import SNAPSHOT_PATH
+from utils.tokens import count_tokens, get_encoding
+
+INSTRUCTIONS = dedent(
+    """\
+    You are an insightful tech trend observer! 📰
+
+    Here are the top stories on HackerNews:
+    {top_hackernews_stories}\
+
+    Your job is to summarize the top stories on HackerNews on demand and provide details on them when asked. Use the search tool to find more information about specific news stories if you don't have enough information.
+"""
+)
+
+PROMPTS = [
+    "Summarize the top HackerNews stories",
+    "Tell me more about the top HackerNews story",
+    "What are the trending HackerNews topics today?",
+]
+
+
+def load_stories(num_stories: int) -> list:
+    if Path(SNAPSHOT_PATH).exists():
+        snapshot = json.loads(Path(SNAPSHOT_PATH).read_text())
+        return snapshot["stories"][:num_stories]
+    stub = StubHackerNewsServer.__new__(StubHackerNewsServer)
+    return [StubHackerNewsServer.item(stub, 1000 + i) for i in range(num_stories)]
+
+
+def system_prompt_tokens(context: str) -> int:
+    agent = Agent(
+        model=OpenAIChat(id="gpt-4.1-mini", api_key="unused"),
+        context={"top_hackernews_stories": context},
+        instructions=INSTRUCTIONS,
+        add_state_in_messages=True,
+        add_datetime_to_instructions=True,
+        markdown=True,
+    )
+    agent.initialize_agent()
+    return count_tokens(agent.get_system_message(session_id="benchmark").content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stories", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+
+    stories = load_stories(args.stories)
+    before_context = json.dumps([{k: v for k, v in s.items() if k != "kids"} for s in stories], indent=4)
+    after_context = compact_stories(stories)
+
+    before = system_prompt_tokens(before_context)
+    after = system_prompt_tokens(after_context)
+    tokenizer = "o200k_base" if get_encoding() is not None else "character estimate"
+
+    print(f"{len(stories)} stories, tokenizer: {tokenizer}\n")
+    print(f"context only: {count_tokens(before_context)} -> {count_tokens(after_context)} tokens\n")
+    print(f"{'turn':>4} {'prompt (json)':>14} {'prompt (compact)':>17} {'saved':>7}")
+    total_before = total_after = 0
+    for turn in range(1, args.turns + 1):
+        user_tokens = count_tokens(PROMPTS[(turn - 1) % len(PROMPTS)])
+        turn_before, turn_after = before + user_tokens, after + user_tokens
+        total_before += turn_before
+        total_after += turn_after
+        print(f"{turn:>4} {turn_before:>14} {turn_after:>17} {1 - turn_after / turn_before:>6.0%}")
+    print(f"{'all':>4} {total_before:>14} {total_after:>17} {1 - total_after / total_before:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
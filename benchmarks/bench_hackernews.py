@@ -0,0 +1,61 @@
+"""Benchmark the HackerNews context fetch against a local stub HN server.
+
+Compares the original approach (one fresh `httpx.get` per story, one after the other)
+with the pooled, concurrent `HackerNewsClient`.
+
+Usage:
+    python -m benchmarks.bench_hackernews [--latency 0.05] [--repeat 5]
+"""
+
+import argparse
+import statistics
+import time
+
+import httpx
+
+from benchmarks.stubs import StubHackerNewsServer
+from utils.hackernews import HackerNewsClient
+
+
+def sequential_fetch(base_url: str, num_stories: int) -> list:
+    """The original implementation: fresh connection, one story at a time."""
+    all_story_ids = httpx.get(f"{base_url}/topstories.json").json()
+    stories = []
+    for story_id in all_story_ids[:num_stories]:
+        story_data = httpx.get(f"{base_url}/item/{story_id}.json").json()
+        stories.append({k: v for k, v in story_data.items() if k != "kids"})
+    return stories
+
+
+def measure(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub round-trip in seconds")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--stories", type=int, nargs="+", default=[5, 10, 30])
+    args = parser.parse_args()
+
+    with StubHackerNewsServer(latency=args.latency) as stub:
+        client = HackerNewsClient(base_url=stub.base_url)
+        print(f"Stub round-trip: {args.latency * 1000:.0f} ms, median of {args.repeat} runs\n")
+        print(f"{'stories':>8} {'sequential':>12} {'pooled':>10} {'speedup':>8} {'RTTs (pooled)':>14}")
+        for num_stories in args.stories:
+            sequential = measure(lambda: sequential_fetch(stub.base_url, num_stories), args.repeat)
+            pooled = measure(lambda: client.get_top_stories(num_stories), args.repeat)
+            print(
+                f"{num_stories:>8} {sequential * 1000:>10.0f}ms {pooled * 1000:>8.0f}ms "
+                f"{sequential / pooled:>7.1f}x {pooled / args.latency:>14.1f}"
+            )
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
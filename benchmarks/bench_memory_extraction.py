@@ -0,0 +1,108 @@
+"""Time to last token of Level 3 turns with agentic vs background memory extraction.
+
+Runs a Level 3 style agent (session storage, user memories) against a local OpenAI
+stub that calls the memory tools whenever it's offered them, so every turn creates a
+memory:
+
+- agentic: `enable_agentic_memory=True`, the agent calls `update_user_memory` during
+  the run, which runs the memory manager's own model and tool round-trips before the
+  answer is streamed.
+- background: the agent only answers, its user message is handed to the
+  `MemoryExtractor` once the response is streamed.
+
+Reports the p50/p95 time to last token of a turn, then waits for the background queue
+and reports the extraction latency, merged duplicates and memories stored.
+
+Usage:
+    python -m benchmarks.bench_memory_extraction [--turns 20] [--latency 0.2]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from agno.agent import Agent
+from agno.memory.v2.memory import Memory
+from agno.models.message import Message
+from agno.models.openai import OpenAIChat
+
+from benchmarks.stubs import StubOpenAIServer
+from utils.memory_worker import MemoryExtractor
+from utils.storage import SqliteMemoryDb, SqliteStorage, SqliteWriter, create_sqlite_engine
+
+USER_ID = "ava"
+# The stub stores the same memory every turn, the background extractor merges the copies
+TOOL_CALLS = {
+    "update_user_memory": {"task": "Remember that Ava prefers short answers with code examples"},
+    "add_memory": {"memory": "Ava prefers short answers with code examples", "topics": ["preferences"]},
+}
+
+
+def run(mode: str, turns: int, db_file: str) -> dict:
+    engine = create_sqlite_engine(db_file)
+    writer = SqliteWriter(engine)
+    storage = SqliteStorage(table_name=f"{mode}_sessions", db_engine=engine, writer=writer, history_runs=3)
+    memory_db = SqliteMemoryDb(table_name=f"{mode}_memories", db_engine=engine, writer=writer)
+    memory_db.create()
+    extractor = MemoryExtractor(lambda: Memory(model=OpenAIChat(id="gpt-4.1-mini"), db=memory_db))
+    agent = Agent(
+        model=OpenAIChat(id="gpt-4.1-mini"),
+        memory=Memory(model=OpenAIChat(id="gpt-4.1-mini"), db=memory_db),
+        storage=storage,
+        add_history_to_messages=True,
+        num_history_runs=3,
+        enable_agentic_memory=mode == "agentic",
+        add_memory_references=True,
+    )
+
+    latencies = []
+    for turn in range(turns):
+        prompt = f"Question {turn}: I like short answers with code examples. How do agents use tools?"
+        start = time.perf_counter()
+        for _ in agent.run(prompt, user_id=USER_ID, stream=True):
+            pass
+        latencies.append((time.perf_counter() - start) * 1000)
+        if mode == "background":
+            extractor.submit(USER_ID, [Message(role="user", content=prompt)])
+
+    extractor.close(timeout=120)
+    result = {
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": sorted(latencies)[int(0.95 * (len(latencies) - 1))],
+        "memories": len(memory_db.read_memories(user_id=USER_ID)),
+        "extractor": extractor.snapshot() if mode == "background" else None,
+    }
+    writer.close()
+    engine.dispose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub time to first token, in seconds")
+    args = parser.parse_args()
+
+    with StubOpenAIServer(latency=args.latency, tool_calls=TOOL_CALLS) as server, tempfile.TemporaryDirectory() as tmp:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-stub")
+        db_file = str(Path(tmp) / "agent.db")
+        print(f"{'mode':>11} {'ttlt p50':>10} {'ttlt p95':>10} {'memories':>9}")
+        for mode in ("agentic", "background"):
+            result = run(mode, args.turns, db_file)
+            print(f"{mode:>11} {result['p50_ms']:>8.0f}ms {result['p95_ms']:>8.0f}ms {result['memories']:>9}")
+            if result["extractor"]:
+                stats = result["extractor"]
+                print(
+                    f"{'':>11} extraction p50 {stats.get('extraction_p50_ms', 0):.0f}ms, "
+                    f"p95 {stats.get('extraction_p95_ms', 0):.0f}ms, "
+                    f"queue wait p95 {stats.get('wait_p95_ms', 0):.0f}ms, "
+                    f"{stats['extracted']} extracted, {stats['merged']} merged, {stats['dropped']} dropped"
+                )
+
+
+if __name__ == "__main__":
+    main()
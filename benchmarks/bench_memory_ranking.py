@@ -0,0 +1,126 @@
+"""Prompt tokens of the Level 3 memories as a user accumulates thousands of them.
+
+Builds synthetic memory sets for one user (preferences, projects, facts about a few
+topics) and renders the Level 3 agent's system message for a query about one topic:
+
+- all: Agno's Memory, every memory of the user goes into the system message.
+- ranked: RankedMemory, the top-k memories of the MemoryIndex most relevant to the
+  query (plus a recency boost), within the token budget.
+
+Reports the system message tokens, the share of the selected memories that are about
+the query's topic, and the time to select them (first search, which embeds every
+memory, and the following ones). Uses the offline HashingEmbedder.
+
+Usage:
+    python -m benchmarks.bench_memory_ranking [--sizes 10 100 1000 5000]
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from agno.agent import Agent
+from agno.memory.v2.db.schema import MemoryRow
+from agno.memory.v2.memory import Memory
+from agno.models.openai import OpenAIChat
+
+from utils.embedders import HashingEmbedder
+from utils.memory_index import MemoryIndex, RankedMemory, memory_query
+from utils.storage import SqliteMemoryDb, SqliteWriter, create_sqlite_engine
+from utils.tokens import count_tokens
+
+USER_ID = "ava"
+TOPICS = {
+    "python": ["Python", "type hints", "asyncio", "pytest"],
+    "travel": ["Lisbon", "train trips", "hiking", "window seats"],
+    "finance": ["index funds", "budgeting", "ETF fees", "savings goals"],
+    "cooking": ["vegetarian recipes", "sourdough", "spicy food", "meal prep"],
+    "agno": ["Agno agents", "agent teams", "knowledge bases", "agent memory"],
+}
+TEMPLATES = [
+    "Ava prefers {subject} when it comes to {topic}.",
+    "Ava mentioned she is working on a project about {subject}.",
+    "Ava asked to be reminded about {subject} in the context of {topic}.",
+    "Ava dislikes long explanations about {subject}.",
+]
+QUERY = ("agno", "How do I give my Agno agent team a shared knowledge base and memory?")
+SEARCHES = 20
+
+
+def synthetic_memories(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    for i in range(count):
+        topic = rng.choice(list(TOPICS))
+        text = rng.choice(TEMPLATES).format(subject=rng.choice(TOPICS[topic]), topic=topic) + f" (note {i})"
+        yield topic, MemoryRow(
+            id=str(uuid.uuid4()), user_id=USER_ID, memory={"memory": text, "topics": [topic], "last_updated": None}
+        )
+
+
+def system_message_tokens(agent: Agent) -> int:
+    return count_tokens(agent.get_system_message(session_id="bench", user_id=USER_ID).content)
+
+
+def run(size: int, tmp: str) -> dict:
+    engine = create_sqlite_engine(str(Path(tmp) / f"memories_{size}.db"))
+    writer = SqliteWriter(engine, batch_window=0)
+    memory_db = SqliteMemoryDb(table_name="user_memories", db_engine=engine, writer=writer)
+    memory_db.create()
+    topics = {}
+    for topic, row in synthetic_memories(size):
+        memory_db.upsert_memory(row)
+        topics[row.memory["memory"]] = topic
+
+    index = MemoryIndex(memory_db=memory_db, embedder=HashingEmbedder())
+    stock = Agent(model=OpenAIChat(id="gpt-4.1-mini"), memory=Memory(db=memory_db), add_memory_references=True)
+    ranked_memory = RankedMemory(index=index, db=memory_db)
+    ranked = Agent(model=OpenAIChat(id="gpt-4.1-mini"), memory=ranked_memory, add_memory_references=True)
+
+    topic, query = QUERY
+    with memory_query(query):
+        start = time.perf_counter()
+        selected = ranked_memory.get_user_memories(user_id=USER_ID)
+        first_ms = (time.perf_counter() - start) * 1000
+        timings = []
+        for _ in range(SEARCHES):
+            start = time.perf_counter()
+            ranked_memory.get_user_memories(user_id=USER_ID)
+            timings.append((time.perf_counter() - start) * 1000)
+        ranked_tokens = system_message_tokens(ranked)
+    result = {
+        "all_tokens": system_message_tokens(stock),
+        "ranked_tokens": ranked_tokens,
+        "selected": len(selected),
+        "on_topic": sum(topics[memory.memory] == topic for memory in selected) / max(len(selected), 1),
+        "first_ms": first_ms,
+        "search_ms": statistics.median(timings),
+    }
+    writer.close()
+    engine.dispose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    args = parser.parse_args()
+
+    print(
+        f"{'memories':>9} {'all tokens':>11} {'ranked tokens':>14} {'selected':>9} {'on topic':>9} "
+        f"{'first search':>13} {'search':>9}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            result = run(size, tmp)
+            print(
+                f"{size:>9} {result['all_tokens']:>11} {result['ranked_tokens']:>14} {result['selected']:>9} "
+                f"{result['on_topic']:>9.0%} {result['first_ms']:>11.1f}ms {result['search_ms']:>7.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Cost of the Level 3 memory sidebar refresh as a user's memories grow.
+
+After every turn the sidebar reads the user's memories back. Compares Agno's stock
+SqliteMemoryDb (the whole user is read and parsed again every time) with the sidebar's
+`read_changes` on utils.storage.SqliteMemoryDb (read once, then only the memories
+written since the version the sidebar last saw).
+
+Each turn writes one memory then refreshes the sidebar's copy; reports the median
+refresh time at a few memory counts.
+
+Usage:
+    python -m benchmarks.bench_memory_sidebar [--memories 2000]
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+from agno.memory.v2.db.schema import MemoryRow
+from agno.memory.v2.db.sqlite import SqliteMemoryDb as StockSqliteMemoryDb
+
+from utils.storage import SqliteMemoryDb, SqliteWriter, create_sqlite_engine
+
+# Reads timed before each checkpoint
+SAMPLE_TURNS = 10
+USER_ID = "ava"
+
+
+def make_memory(turn: int) -> MemoryRow:
+    memory = {
+        "memory": f"Ava mentioned preference number {turn}: she likes concise answers with code examples.",
+        "topics": ["preferences", "style"],
+        "last_updated": None,
+    }
+    return MemoryRow(id=str(uuid.uuid4()), user_id=USER_ID, memory=memory)
+
+
+def run(mode: str, total: int, checkpoints: List[int]) -> List[Dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = str(Path(tmp) / "agent.db")
+        writer = None
+        if mode == "stock":
+            memory_db = StockSqliteMemoryDb(table_name="user_memories", db_file=db_file)
+            engine = memory_db.db_engine
+        else:
+            engine = create_sqlite_engine(db_file)
+            writer = SqliteWriter(engine, batch_window=0)
+            memory_db = SqliteMemoryDb(table_name="user_memories", db_engine=engine, writer=writer)
+        memory_db.create()
+
+        timings = []
+        # The sidebar's copy of the memories and the version it was read at
+        lines: Dict[str, str] = {}
+        version = None
+        for turn in range(total):
+            memory_db.upsert_memory(make_memory(turn))
+            start = time.perf_counter()
+            if mode == "stock":
+                lines = {row.id: row.memory["memory"] for row in memory_db.read_memories(user_id=USER_ID)}
+            else:
+                changes = memory_db.read_changes(USER_ID, since=version)
+                for memory_id in changes.deleted:
+                    lines.pop(memory_id, None)
+                lines.update((row.id, row.memory["memory"]) for row in changes.memories)
+                version = changes.version
+            timings.append((time.perf_counter() - start) * 1000)
+            assert len(lines) == turn + 1
+
+            if turn + 1 in checkpoints:
+                results.append({"memories": turn + 1, "read_ms": statistics.median(timings[-SAMPLE_TURNS:])})
+        if writer is not None:
+            writer.close()
+        engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--memories", type=int, default=2000)
+    args = parser.parse_args()
+    checkpoints = [n for n in (10, 100, 500, 1000, 2000, 5000) if n <= args.memories]
+
+    print(f"{'mode':>12} {'memories':>9} {'refresh':>10}")
+    for mode in ("stock", "incremental"):
+        for result in run(mode, args.memories, checkpoints):
+            print(f"{mode:>12} {result['memories']:>9} {result['read_ms']:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
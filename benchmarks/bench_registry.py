@@ -0,0 +1,128 @@
+"""Compare startup time and resident memory of the Level 2 + Level 3 components,
+built separately per view (before) or through the shared resource registry (after).
+
+Each variant runs in a fresh subprocess inside a scratch directory, with the
+`agno_docs` table pre-created so no network call is needed.
+
+Usage:
+    python -m benchmarks.bench_registry [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = r"""
+import json, sys, time
+
+def rss_kb():
+    for line in open("/proc/self/status"):
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1])
+
+from agno.agent import Agent
+from agno.embedder.openai import OpenAIEmbedder
+from agno.knowledge.url import UrlKnowledge
+from agno.memory.v2.db.sqlite import SqliteMemoryDb
+from agno.memory.v2.memory import Memory
+from agno.models.openai import OpenAIChat
+from agno.storage.sqlite import SqliteStorage
+from agno.vectordb.lancedb import LanceDb, SearchType
+from utils.knowledge import get_knowledge_base
+from utils.registry import get_memory_db, get_storage, registry
+
+mode = sys.argv[1]
+rss_before = rss_kb()
+start = time.perf_counter()
+
+def separate_view(with_memory):
+    knowledge = UrlKnowledge(
+        urls=["https://docs.agno.com/introduction.md"],
+        vector_db=LanceDb(
+            uri="tmp/lancedb",
+            table_name="agno_docs",
+            search_type=SearchType.hybrid,
+            embedder=OpenAIEmbedder(id="text-embedding-3-small"),
+        ),
+    )
+    storage = SqliteStorage(table_name="agent_sessions", db_file="tmp/agent.db")
+    memory = Memory(db=SqliteMemoryDb(table_name="user_memories", db_file="tmp/agent.db")) if with_memory else None
+    storage.create()
+    return storage, memory, knowledge
+
+def shared_view(with_memory):
+    knowledge = get_knowledge_base()
+    storage = get_storage(table_name="agent_sessions", db_file="tmp/agent.db")
+    memory = Memory(db=get_memory_db(table_name="user_memories", db_file="tmp/agent.db")) if with_memory else None
+    storage.create()
+    return storage, memory, knowledge
+
+build = separate_view if mode == "separate" else shared_view
+views = [build(False), build(True)]
+for storage, memory, knowledge in views:
+    if memory is not None:
+        memory.db.read_memories()
+    knowledge.vector_db.get_count()
+
+engines = {id(storage.db_engine) for storage, _, _ in views}
+engines |= {id(memory.db.db_engine) for _, memory, _ in views if memory is not None}
+tables = {id(knowledge.vector_db) for _, _, knowledge in views}
+
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "rss_kb": rss_kb() - rss_before,
+    "sqlite_engines": len(engines),
+    "lancedb_handles": len(tables),
+}))
+"""
+
+
+def prepare(workdir: Path) -> None:
+    import lancedb
+    import pyarrow as pa
+
+    schema = pa.schema(
+        [
+            pa.field("vector", pa.list_(pa.float32(), 1536)),
+            pa.field("id", pa.string()),
+            pa.field("payload", pa.string()),
+        ]
+    )
+    lancedb.connect(str(workdir / "tmp/lancedb")).create_table("agno_docs", schema=schema)
+
+
+def run(mode: str, workdir: Path) -> dict:
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT), OPENAI_API_KEY="unused")
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, mode], cwd=workdir, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        prepare(workdir)
+        print(f"{'mode':>9} {'startup':>9} {'RSS delta':>10} {'SQLite engines':>15} {'LanceDB handles':>16}")
+        for mode in ("separate", "shared"):
+            results = [run(mode, workdir) for _ in range(args.repeat)]
+            print(
+                f"{mode:>9} {statistics.median(r['seconds'] for r in results) * 1000:>7.0f}ms "
+                f"{statistics.median(r['rss_kb'] for r in results) / 1024:>8.1f}MB "
+                f"{results[0]['sqlite_engines']:>15} {results[0]['lancedb_handles']:>16}"
+            )
+
+
+if __name__ == "__main__":
+    main()
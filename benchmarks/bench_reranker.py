@@ -0,0 +1,101 @@
+"""Effect of the LocalReranker on retrieval quality and latency.
+
+Builds a synthetic corpus with the offline HashingEmbedder where each query targets
+one known chunk (a few of its content words, shuffled, plus unrelated words), then
+compares plain hybrid search returning `k` documents with hybrid search over a
+candidate pool reranked down to `k`. Also times the rerank step alone on 100
+candidates.
+
+Usage:
+    python -m benchmarks.bench_reranker [--size 5000] [--queries 200] [-k 5]
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from typing import List, Tuple
+
+from agno.document import Document
+from agno.vectordb.lancedb import SearchType
+
+from benchmarks.bench_retrieval import make_chunks, percentiles
+from utils.embedders import HashingEmbedder
+from utils.reranker import LocalReranker
+from utils.vectordb import IndexedLanceDb
+
+
+def make_labelled_queries(chunks: List[str], count: int, seed: int = 1) -> List[Tuple[str, str]]:
+    """(query, target chunk) pairs: 4 content words of the target and 2 unrelated ones, shuffled.
+
+    Content words are the ones outside the 100 most frequent terms, like the words of a
+    user question are mostly not stop words.
+    """
+    rng = random.Random(seed)
+    unrelated = [f"term{i}" for i in range(100, 20_000)]
+    pairs = []
+    for target in rng.sample(chunks, min(count, len(chunks))):
+        content_words = sorted({word for word in target.split()[:-1] if int(word[4:]) >= 100})
+        words = rng.sample(content_words, min(4, len(content_words))) + rng.sample(unrelated, 2)
+        rng.shuffle(words)
+        pairs.append((" ".join(words), target))
+    return pairs
+
+
+def evaluate(vector_db: IndexedLanceDb, pairs: List[Tuple[str, str]], k: int) -> dict:
+    hits, reciprocal_ranks, latencies = [], [], []
+    for query, target in pairs:
+        start = time.perf_counter()
+        documents = vector_db.search(query, limit=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        contents = [document.content for document in documents]
+        rank = contents.index(target) + 1 if target in contents else None
+        hits.append(rank is not None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+    return {"recall": statistics.mean(hits), "mrr": statistics.mean(reciprocal_ranks), **percentiles(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=5_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--pools", type=int, nargs="+", default=[10, 20, 50])
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.size)
+    pairs = make_labelled_queries(chunks, args.queries)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        embedder = HashingEmbedder()
+        vector_db = IndexedLanceDb(uri=tmp, table_name="bench", embedder=embedder, search_type=SearchType.hybrid)
+        vector_db.insert([Document(name=f"doc{i}", content=chunk) for i, chunk in enumerate(chunks)])
+        vector_db.ensure_indexes()
+
+        print(f"{'config':>22} {f'recall@{args.k}':>9} {'MRR':>6} {'p50':>9} {'p99':>9}")
+        configs = [("hybrid", None)]
+        configs += [(f"hybrid+rerank({pool})", LocalReranker(candidate_pool=pool)) for pool in args.pools]
+        for name, reranker in configs:
+            vector_db.reranker = reranker
+            result = evaluate(vector_db, pairs, args.k)
+            print(
+                f"{name:>22} {result['recall']:>9.3f} {result['mrr']:>6.3f} "
+                f"{result['p50_ms']:>7.2f}ms {result['p99_ms']:>7.2f}ms"
+            )
+
+        # The rerank step alone, on a pool of 100 search results
+        vector_db.reranker = None
+        reranker = LocalReranker()
+        timings = []
+        for query, _ in pairs:
+            candidates = vector_db.search(query, limit=100)
+            start = time.perf_counter()
+            reranker.rerank(query, candidates)
+            timings.append((time.perf_counter() - start) * 1000)
+        rerank = percentiles(timings)
+        print(f"rerank of {len(candidates)} candidates: p50 {rerank['p50_ms']:.2f}ms, p99 {rerank['p99_ms']:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Offline retrieval benchmark for the Level 2/3 knowledge base.
+
+Uses the deterministic HashingEmbedder, so it runs without network or API key. For
+each corpus size (run in a fresh subprocess, so memory numbers don't add up) it
+measures:
+
+- ingestion throughput (chunks/s) through IndexedLanceDb.insert, and index build time
+- vector, keyword and hybrid query latency percentiles through IndexedLanceDb.search
+- memory footprint: resident memory growth and on-disk table size
+
+Results are written as JSON keyed by the current commit, and `--compare` prints the
+change against a previous results file.
+
+Usage:
+    python -m benchmarks.bench_retrieval [--sizes 1000 5000 20000] [--queries 100]
+    python -m benchmarks.bench_retrieval --compare tmp/benchmarks/retrieval-<commit>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = REPO_ROOT / "tmp" / "benchmarks"
+SEARCH_TYPES = ["vector", "keyword", "hybrid"]
+INSERT_BATCH_SIZE = 500
+
+
+def rss_kb() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def make_chunks(size: int, seed: int = 0) -> List[str]:
+    """Chunks of ~100 words drawn from a Zipf-like vocabulary, like documentation text."""
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(20_000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    return [" ".join(rng.choices(vocabulary, weights, k=100)) + f" chunk{i}" for i in range(size)]
+
+
+def make_queries(chunks: List[str], count: int, seed: int = 1) -> List[str]:
+    """A few words lifted from random chunks, so every query has relevant results."""
+    rng = random.Random(seed)
+    queries = []
+    for chunk in rng.sample(chunks, min(count, len(chunks))):
+        words = chunk.split()
+        start = rng.randrange(len(words) - 6)
+        queries.append(" ".join(words[start : start + 6]))
+    return queries
+
+
+def percentiles(latencies: List[float]) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))]  # noqa: E731
+    return {"p50_ms": round(pick(0.5), 3), "p95_ms": round(pick(0.95), 3), "p99_ms": round(pick(0.99), 3)}
+
+
+def run_size(size: int, num_queries: int, limit: int) -> Dict:
+    """Benchmark one corpus size in the current process."""
+    from agno.document import Document
+    from agno.vectordb.lancedb import SearchType
+
+    from utils.embedders import HashingEmbedder
+    from utils.vectordb import IndexedLanceDb
+
+    chunks = make_chunks(size)
+    queries = make_queries(chunks, num_queries)
+    rss_before = rss_kb()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vector_db = IndexedLanceDb(uri=tmp, table_name="bench", embedder=HashingEmbedder())
+        start = time.perf_counter()
+        for i in range(0, size, INSERT_BATCH_SIZE):
+            batch = chunks[i : i + INSERT_BATCH_SIZE]
+            vector_db.insert([Document(name=f"doc{j}", content=chunk) for j, chunk in enumerate(batch, i)])
+        insert_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        vector_db.ensure_indexes()
+        index_seconds = time.perf_counter() - start
+
+        latencies = {}
+        for search_type in SEARCH_TYPES:
+            vector_db.search_type = SearchType(search_type)
+            # Warm the caches (index files, tokenizer) before timing
+            vector_db.search(queries[0], limit=limit)
+            timings = []
+            for query in queries:
+                start = time.perf_counter()
+                vector_db.search(query, limit=limit)
+                timings.append((time.perf_counter() - start) * 1000)
+            latencies[search_type] = percentiles(timings)
+
+        disk_bytes = sum(path.stat().st_size for path in Path(tmp).rglob("*") if path.is_file())
+
+    return {
+        "size": size,
+        "insert_seconds": round(insert_seconds, 3),
+        "chunks_per_second": round(size / insert_seconds, 1),
+        "index_seconds": round(index_seconds, 3),
+        "latency": latencies,
+        "rss_mb": round((rss_kb() - rss_before) / 1024, 1),
+        "disk_mb": round(disk_bytes / 1024 / 1024, 1),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results: List[Dict], baseline: Dict[int, Dict]) -> None:
+    def delta(value: float, old: float) -> str:
+        return f" ({(value - old) / old:+.0%})" if old else ""
+
+    for row in results:
+        old = baseline.get(row["size"], {})
+        print(
+            f"{row['size']:>7} chunks: {row['chunks_per_second']:>8.0f} chunks/s"
+            f"{delta(row['chunks_per_second'], old.get('chunks_per_second', 0))}, "
+            f"index {row['index_seconds']:.2f}s, RSS +{row['rss_mb']}MB, disk {row['disk_mb']}MB"
+        )
+        for search_type in SEARCH_TYPES:
+            latency = row["latency"][search_type]
+            old_latency = old.get("latency", {}).get(search_type, {})
+            print(
+                f"{search_type:>16}: p50 {latency['p50_ms']:>7.2f}ms"
+                f"{delta(latency['p50_ms'], old_latency.get('p50_ms', 0))}"
+                f"  p95 {latency['p95_ms']:>7.2f}ms  p99 {latency['p99_ms']:>7.2f}ms"
+                f"{delta(latency['p99_ms'], old_latency.get('p99_ms', 0))}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 5_000, 20_000])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=5, help="Documents per search, like the agents use")
+    parser.add_argument("--output", type=Path, help="Results file, defaults to tmp/benchmarks/retrieval-<commit>.json")
+    parser.add_argument("--compare", type=Path, help="Previous results file to compare against")
+    parser.add_argument("--single-size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single_size:
+        print(json.dumps(run_size(args.single_size, args.queries, args.limit)))
+        return
+
+    results = []
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    for size in args.sizes:
+        command = [sys.executable, "-m", "benchmarks.bench_retrieval", "--single-size", str(size)]
+        command += ["--queries", str(args.queries), "--limit", str(args.limit)]
+        output = subprocess.run(command, cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True)
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    commit = git_commit()
+    report = {
+        "benchmark": "retrieval",
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "queries": args.queries,
+        "limit": args.limit,
+        "results": results,
+    }
+    output_path = args.output or RESULTS_DIR / f"retrieval-{commit}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, indent=2))
+
+    baseline = {}
+    if args.compare:
+        previous = json.loads(args.compare.read_text())
+        print(f"Compared with {previous['commit']} ({previous['timestamp']})")
+        baseline = {row["size"]: row for row in previous["results"]}
+    print_results(results, baseline)
+    print(f"Results written to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Queue wait and pool saturation of background runs, and how fast Stop takes effect.
+
+Submits `--sessions` agent runs at once to utils.run_executor.RunExecutor pools of
+`--workers` threads, against a local OpenAI stub (every call waits `--latency`, then
+streams `--tokens` tokens `--token-delay` apart), and drains them as the pages would.
+Prints the queue wait, the time to the last answer and the busiest the pool got.
+
+Then starts one long run, stops it half way and prints how long the page waited for
+the run to stop, and how long the worker took to let go of it (its next chunk).
+
+Last, checks that a new prompt waits for the stopped run of its session: the stopped
+run's job blocks (as in a model call), the next run of the session must not start
+before it returns, even though the page already collected it.
+
+Usage:
+    python -m benchmarks.bench_run_executor [--sessions 16] [--workers 2 4 8 16] [--latency 0.3]
+"""
+
+import argparse
+import os
+import threading
+import time
+
+from agno.agent import Agent
+from agno.models.openai import OpenAIChat
+
+from benchmarks.stubs import StubOpenAIServer
+from utils.run_executor import RunExecutor, RunHandle, stop_run
+
+
+def answer(run: RunHandle):
+    agent = Agent(model=OpenAIChat(id="gpt-4.1-mini"))
+    for chunk in agent.run("Provide a concise summary of 2025 investment trends", stream=True):
+        if chunk.content:
+            yield chunk.content
+
+
+def drain(run: RunHandle) -> None:
+    while run.drain() or not run.finished:
+        pass
+
+
+def concurrency(sessions: int, workers: int) -> dict:
+    executor = RunExecutor(workers=workers)
+    busiest = [0.0]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.01):
+            busiest[0] = max(busiest[0], executor.snapshot()["saturation"])
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    runs = [executor.submit(f"session-{i}", answer) for i in range(sessions)]
+    # One page per session
+    pages = [threading.Thread(target=drain, args=(run,)) for run in runs]
+    for page in pages:
+        page.start()
+    for page in pages:
+        page.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    snapshot = executor.snapshot()
+    executor.close()
+    assert snapshot["done"] == sessions, snapshot
+    return {"elapsed": elapsed, "busiest": busiest[0], **snapshot}
+
+
+def stop_latency(token_delay: float) -> dict:
+    executor = RunExecutor(workers=1)
+    run = executor.submit("session", answer)
+    while len(run.text) < 20:
+        run.drain()
+    stopped_at = time.perf_counter()
+    run.stop()
+    drain(run)
+    page = time.perf_counter() - stopped_at
+    run.wait()
+    worker = time.perf_counter() - stopped_at
+    executor.close()
+    return {"state": run.state, "page_ms": page * 1000, "worker_ms": worker * 1000}
+
+
+def handover(block: float = 0.3) -> dict:
+    executor = RunExecutor(workers=2)
+    in_call = threading.Event()
+    call_over = threading.Event()
+
+    def blocking(run: RunHandle):
+        yield "Partial answer"
+        in_call.set()
+        # A model call, the stop is only seen at the next chunk
+        call_over.wait()
+        yield "never shown"
+
+    executor.submit("session", blocking)
+    in_call.wait()
+    # What the page does on a new prompt
+    stop_run(executor, "session")
+    run = executor.submit("session", answer)
+    threading.Timer(block, call_over.set).start()
+    time.sleep(block / 2)
+    state_during_call = run.state
+    drain(run)
+    executor.close()
+    assert state_during_call == "queued", f"the new run started during the stopped run's call ({state_during_call})"
+    assert run.state == "done", run.state
+    return {"wait_ms": (run.started_at - run.submitted_at) * 1000, "block_ms": block * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8, 16])
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub time to first token, in seconds")
+    parser.add_argument("--tokens", type=int, default=100, help="Tokens streamed by every stub call")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Seconds between two streamed tokens")
+    args = parser.parse_args()
+
+    stub = StubOpenAIServer(latency=args.latency, tokens=args.tokens, token_delay=args.token_delay)
+    with stub as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-stub")
+        # Warm the imports and the tokenizer up
+        stop_latency(args.token_delay)
+
+        print(f"{args.sessions} runs submitted at once")
+        print(f"{'workers':>8} {'wait p50':>9} {'wait p95':>9} {'last answer':>12} {'busiest':>8}")
+        for workers in args.workers:
+            result = concurrency(args.sessions, workers)
+            print(
+                f"{workers:>8} {result['wait_p50_ms']:>7.0f}ms {result['wait_p95_ms']:>7.0f}ms "
+                f"{result['elapsed']:>11.2f}s {result['busiest']:>8.0%}"
+            )
+
+        result = stop_latency(args.token_delay)
+        print(
+            f"\nStop: the page stopped waiting after {result['page_ms']:.1f}ms, "
+            f"the worker let go after {result['worker_ms']:.1f}ms ({result['state']})"
+        )
+
+        result = handover()
+        print(
+            f"Next prompt: started {result['wait_ms']:.0f}ms after its submission, "
+            f"once the stopped run's {result['block_ms']:.0f}ms call returned"
+        )
+
+
+if __name__ == "__main__":
+    main()
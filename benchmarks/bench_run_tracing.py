@@ -0,0 +1,104 @@
+"""Span tree of a traced Level 4 team run, and the overhead of tracing.
+
+Runs the Level 4 content team (coordinate mode) against a local OpenAI stub (every
+call waits `--latency` then streams `--tokens` tokens) with utils.tracing's
+TracedOpenAIChat models inside `RunTracer.trace`. Prints the spans of one run as an
+indented tree (what the page's waterfall shows), then the wall-clock of `--runs`
+runs with and without a trace around them.
+
+Usage:
+    python -m benchmarks.bench_run_tracing [--latency 0.2] [--tokens 100] [--runs 10]
+"""
+
+import argparse
+import os
+import statistics
+import time
+from typing import Optional
+
+from agno.agent import Agent
+from agno.team import Team
+
+from benchmarks.stubs import StubOpenAIServer
+from utils.tracing import RunTracer, TracedOpenAIChat
+
+PROMPT = "Provide a concise summary of 2025 investment trends"
+# The coordinator delegates to the Researcher, then to the Writer, then answers
+TRANSFERS = [
+    {"member_id": "researcher", "task_description": "Research the topic", "expected_output": "A Knowledge Report"},
+    {"member_id": "writer", "task_description": "Write the article", "expected_output": "The article"},
+]
+
+
+def create_team() -> Team:
+    return Team(
+        name="Content Team",
+        mode="coordinate",
+        model=TracedOpenAIChat(id="gpt-4.1-mini"),
+        members=[
+            Agent(name="Researcher", role="Finds financial information", model=TracedOpenAIChat(id="gpt-4.1-mini")),
+            Agent(name="Writer", role="Writes financial articles", model=TracedOpenAIChat(id="gpt-4.1-mini")),
+        ],
+    )
+
+
+def run(tracer: Optional[RunTracer] = None) -> float:
+    team = create_team()
+    start = time.perf_counter()
+    if tracer is None:
+        for _ in team.run(PROMPT, stream=True):
+            pass
+    else:
+        with tracer.trace("coordinate") as trace:
+            for chunk in team.run(PROMPT, stream=True):
+                if chunk.content:
+                    trace.first_token()
+    return time.perf_counter() - start
+
+
+def print_tree(trace: dict) -> None:
+    depths = {}
+    print(f"{'span':<44} {'start':>8} {'duration':>9} {'ttft':>8} {'tokens in/out':>14} {'cost':>9}")
+    for span in trace["spans"]:
+        depth = depths[span["span_id"]] = depths.get(span["parent_id"], -1) + 1
+        label = f"{'  ' * depth}{span['kind']}: {span['name']}"
+        ttft = f"{span['ttft_ms']:.0f}ms" if span["ttft_ms"] is not None else "-"
+        tokens = f"{span['input_tokens']}/{span['output_tokens']}" if span["kind"] == "model" else "-"
+        print(
+            f"{label:<44} {span['start_ms']:>6.0f}ms {span['end_ms'] - span['start_ms']:>7.0f}ms {ttft:>8} "
+            f"{tokens:>14} {span['cost_usd']:>9.6f}"
+        )
+    print(f"total: {trace['input_tokens']} input, {trace['output_tokens']} output tokens, ${trace['cost_usd']:.6f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub time to first token, in seconds")
+    parser.add_argument("--tokens", type=int, default=100, help="Tokens streamed by every stub call")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    stub = StubOpenAIServer(
+        latency=args.latency, tokens=args.tokens, tool_calls={"transfer_task_to_member": TRANSFERS}
+    )
+    with stub as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-stub")
+        tracer = RunTracer(path=None)
+        run(tracer)
+        print_tree(tracer.traces[-1])
+
+        untraced = [run() for _ in range(args.runs)]
+        traced = [run(tracer) for _ in range(args.runs)]
+        print(f"\n{'mode':>9} {'median':>9}")
+        print(f"{'untraced':>9} {statistics.median(untraced):>8.3f}s")
+        print(f"{'traced':>9} {statistics.median(traced):>8.3f}s")
+
+        print(f"\n{'span':<22} {'count':>6} {'p50':>8} {'p95':>8} {'ttft p50':>9}")
+        for row in tracer.summary():
+            ttft = f"{row['ttft_p50_ms']}ms" if row["ttft_p50_ms"] is not None else "-"
+            print(f"{row['span']:<22} {row['count']:>6} {row['p50_ms']:>6}ms {row['p95_ms']:>6}ms {ttft:>9}")
+
+
+if __name__ == "__main__":
+    main()
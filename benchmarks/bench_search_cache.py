@@ -0,0 +1,117 @@
+"""Web search latency with and without the shared search cache.
+
+Simulates users of several pages asking overlapping questions at the same time: each
+search picks a query from a small Zipf-like pool of topics, written with random case,
+punctuation and spacing ("What is Agno?" / "what is agno"). DuckDuckGo is replaced by
+a fake search of fixed latency; "uncached" searches with Agno's DuckDuckGoTools,
+"cached" with utils.search_cache.CachedDuckDuckGoTools.
+
+Reports the searches that reached the network, the hit rate (coalesced searches
+included), the latency per search and the search time saved.
+
+Usage:
+    python -m benchmarks.bench_search_cache [--searches 500] [--users 20] [--latency 0.3]
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+import agno.tools.duckduckgo
+from agno.tools.duckduckgo import DuckDuckGoTools
+
+from utils.search_cache import CachedDuckDuckGoTools, SearchCache
+
+TOPICS = [
+    "what is agno",
+    "agno vs langgraph",
+    "latest ai agent frameworks",
+    "openai gpt-4o pricing",
+    "lancedb hybrid search",
+    "streamlit session state",
+    "how do multi agent teams work",
+    "rag best practices",
+    "duckduckgo search api limits",
+    "python 3.13 release notes",
+]
+
+
+def variant(topic: str, rng: random.Random) -> str:
+    """The same question the way a user might type it."""
+    words = [word.capitalize() if rng.random() < 0.3 else word for word in topic.split()]
+    return "  ".join(words) if rng.random() < 0.2 else " ".join(words) + rng.choice(["", "?", " ?", "!"])
+
+
+class FakeDDGS:
+    """Stands in for duckduckgo_search.DDGS: every search sleeps for `latency` seconds."""
+
+    latency = 0.3
+    requests = 0
+    lock = threading.Lock()
+
+    def __init__(self, **kwargs):
+        pass
+
+    def text(self, keywords: str, max_results: int = 5) -> List[Dict]:
+        with FakeDDGS.lock:
+            FakeDDGS.requests += 1
+        time.sleep(self.latency)
+        return [{"title": keywords, "href": "https://example.com", "body": "..."}] * max_results
+
+
+def run(mode: str, queries: List[str], users: int) -> Dict:
+    FakeDDGS.requests = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SearchCache(Path(tmp) / "search_cache.db")
+        tools = CachedDuckDuckGoTools(cache=cache) if mode == "cached" else DuckDuckGoTools()
+
+        def search(query: str) -> float:
+            start = time.perf_counter()
+            tools.duckduckgo_search(query)
+            return time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=users) as executor:
+            latencies = list(executor.map(search, queries))
+        stats = cache.snapshot()
+        cache.close()
+    return {
+        "mode": mode,
+        "requests": FakeDDGS.requests,
+        "hit_rate": stats["hit_rate"],
+        "coalesced": stats["coalesced"],
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p95_ms": statistics.quantiles(latencies, n=20)[-1] * 1000,
+        "saved_s": stats["saved_seconds"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=500)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per network search")
+    args = parser.parse_args()
+    FakeDDGS.latency = args.latency
+    agno.tools.duckduckgo.DDGS = FakeDDGS
+
+    rng = random.Random(0)
+    weights = [1 / (rank + 1) for rank in range(len(TOPICS))]
+    queries = [variant(rng.choices(TOPICS, weights)[0], rng) for _ in range(args.searches)]
+
+    print(f"{'mode':>9} {'requests':>9} {'hit rate':>9} {'coalesced':>10} {'mean':>9} {'p95':>9} {'saved':>8}")
+    for mode in ("uncached", "cached"):
+        r = run(mode, queries, args.users)
+        print(
+            f"{r['mode']:>9} {r['requests']:>9} {r['hit_rate']:>9.0%} {r['coalesced']:>10} "
+            f"{r['mean_ms']:>7.1f}ms {r['p95_ms']:>7.1f}ms {r['saved_s']:>7.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Per-turn storage cost of a chat session as it grows to hundreds of runs.
+
+Replays what Agent.run does with `add_history_to_messages=True`: read the session, load
+its runs, append the new run and upsert the session. Compares Agno's stock
+SqliteStorage (every run in the session row, read and rewritten every turn) with the
+windowed layout of utils.storage (one row per run, only the last `--history-runs` read,
+new runs appended).
+
+Reports, at a few session lengths, the median turn time (read + load + commit) and the
+bytes sent to SQLite per turn.
+
+Usage:
+    python -m benchmarks.bench_session_history [--runs 500] [--history-runs 3]
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+from agno.models.message import Message
+from agno.run.response import RunResponse
+from agno.storage.session.agent import AgentSession
+from agno.storage.sqlite import SqliteStorage as StockSqliteStorage
+from sqlalchemy import event
+
+from utils.storage import SqliteStorage, SqliteWriter, create_sqlite_engine
+
+# A question, an answer with some markdown and a tool call, a few KB of JSON
+ANSWER = "Agno agents combine a model, tools, knowledge and storage. " * 40
+# Turns timed before each checkpoint
+SAMPLE_TURNS = 10
+
+
+def make_run(session_id: str, turn: int) -> Dict:
+    messages = [
+        Message(role="user", content=f"Question {turn}: how do I give an agent memory?"),
+        Message(
+            role="assistant",
+            tool_calls=[
+                {"id": f"call{turn}", "type": "function", "function": {"name": "search_knowledge", "arguments": "{}"}}
+            ],
+        ),
+        Message(role="tool", tool_call_id=f"call{turn}", content=ANSWER[:800]),
+        Message(role="assistant", content=ANSWER),
+    ]
+    run = RunResponse(run_id=str(uuid.uuid4()), session_id=session_id, agent_id="agent", content=ANSWER)
+    run.messages = messages
+    return run.to_dict()
+
+
+def count_bytes(engine, sent: List[int]) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        rows = parameters if executemany else [parameters]
+        sent.append(sum(len(str(value)) for row in rows for value in (row or ())))
+
+
+def run(mode: str, total_runs: int, history_runs: int, checkpoints: List[int]) -> List[Dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = str(Path(tmp) / "agent.db")
+        writer = None
+        if mode == "stock":
+            storage = StockSqliteStorage(table_name="agent_sessions", db_file=db_file)
+            engine = storage.db_engine
+        else:
+            engine = create_sqlite_engine(db_file)
+            # No batch window: the turn waits for its commit, to time the I/O itself
+            writer = SqliteWriter(engine, batch_window=0)
+            storage = SqliteStorage(
+                table_name="agent_sessions", db_engine=engine, writer=writer, history_runs=history_runs
+            )
+        storage.create()
+        sent: List[int] = []
+        count_bytes(engine, sent)
+
+        session_id = str(uuid.uuid4())
+        timings, turn_bytes = [], []
+        for turn in range(total_runs):
+            new_run = make_run(session_id, turn)
+            sent.clear()
+            start = time.perf_counter()
+            session = storage.read(session_id)
+            stored_runs = session.memory["runs"] if session is not None else []
+            # Agent.load_agent_session turns every stored run back into a RunResponse
+            runs = [RunResponse.from_dict(dict(stored_run)) for stored_run in stored_runs]
+            memory = {"runs": [r.to_dict() for r in runs] + [new_run]}
+            storage.upsert(AgentSession(session_id=session_id, agent_id="agent", memory=memory))
+            if writer is not None:
+                writer.flush()
+            timings.append((time.perf_counter() - start) * 1000)
+            turn_bytes.append(sum(sent))
+
+            if turn + 1 in checkpoints:
+                results.append(
+                    {
+                        "runs": turn + 1,
+                        "turn_ms": statistics.median(timings[-SAMPLE_TURNS:]),
+                        "bytes_per_turn": statistics.median(turn_bytes[-SAMPLE_TURNS:]),
+                    }
+                )
+        if writer is not None:
+            writer.close()
+        engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--history-runs", type=int, default=3)
+    args = parser.parse_args()
+    checkpoints = [n for n in (10, 50, 100, 250, 500, 1000) if n <= args.runs]
+
+    print(f"{'mode':>9} {'runs':>6} {'turn':>10} {'sent/turn':>11}")
+    for mode in ("stock", "windowed"):
+        for result in run(mode, args.runs, args.history_runs, checkpoints):
+            print(
+                f"{mode:>9} {result['runs']:>6} {result['turn_ms']:>8.2f}ms "
+                f"{result['bytes_per_turn'] / 1024:>9.1f}KB"
+            )
+
+
+if __name__ == "__main__":
+    main()
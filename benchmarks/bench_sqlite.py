@@ -0,0 +1,148 @@
+"""Multi-threaded load test of the session storage and memory DB sharing tmp/agent.db.
+
+Every thread plays a chat session: read the session, append a run to it and upsert it
+(like Agent.write_to_storage after each turn), and every few turns store a user memory
+and read the memories back. Compares Agno's stock SqliteStorage / SqliteMemoryDb (one
+engine each on the same file, rollback journal) with the WAL + single-writer layer
+from utils.storage.
+
+Reports turn and committed row write throughput, p50/p99 time spent in write calls
+(the lock wait a chat turn sees), read latency and failed writes ("database is locked").
+
+Usage:
+    python -m benchmarks.bench_sqlite [--threads 16] [--seconds 10]
+"""
+
+import argparse
+import logging
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+from agno.memory.v2.db.schema import MemoryRow
+from agno.memory.v2.db.sqlite import SqliteMemoryDb as StockSqliteMemoryDb
+from agno.storage.session.agent import AgentSession
+from agno.storage.sqlite import SqliteStorage as StockSqliteStorage
+from agno.utils.log import logger
+
+from benchmarks.bench_retrieval import percentiles
+from utils.storage import SqliteMemoryDb, SqliteStorage, SqliteWriter, create_sqlite_engine
+
+# A run with a question, an answer and some tool calls is a few KB of JSON
+RUN_PAYLOAD = "x" * 4000
+MEMORY_EVERY = 5
+
+
+def build_stock(db_file: str):
+    storage = StockSqliteStorage(table_name="agent_sessions", db_file=db_file)
+    memory_db = StockSqliteMemoryDb(table_name="user_memories", db_file=db_file)
+    return storage, memory_db
+
+
+def build_shared(db_file: str):
+    engine = create_sqlite_engine(db_file)
+    writer = SqliteWriter(engine)
+    storage = SqliteStorage(table_name="agent_sessions", db_engine=engine, writer=writer)
+    memory_db = SqliteMemoryDb(table_name="user_memories", db_engine=engine, writer=writer)
+    return storage, memory_db, writer
+
+
+def chat_session(storage, memory_db, stop: threading.Event, timings: Dict[str, List[float]], failures: List[int]):
+    session_id, user_id = str(uuid.uuid4()), str(uuid.uuid4())
+    turn = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        session = storage.read(session_id)
+        timings["read"].append((time.perf_counter() - start) * 1000)
+        runs = session.memory["runs"] if session is not None else []
+        # Keep the blob size steady, this test is about locking, not blob growth
+        runs = (runs + [{"turn": turn, "content": RUN_PAYLOAD}])[-3:]
+
+        start = time.perf_counter()
+        result = storage.upsert(
+            AgentSession(session_id=session_id, agent_id="agent", user_id=user_id, memory={"runs": runs})
+        )
+        timings["upsert"].append((time.perf_counter() - start) * 1000)
+        if result is None:
+            failures.append(1)
+
+        if turn % MEMORY_EVERY == 0:
+            start = time.perf_counter()
+            try:
+                memory_db.upsert_memory(MemoryRow(id=str(uuid.uuid4()), user_id=user_id, memory={"turn": turn}))
+            except Exception:
+                failures.append(1)
+            timings["memory_write"].append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            memory_db.read_memories(user_id=user_id)
+            timings["memory_read"].append((time.perf_counter() - start) * 1000)
+        turn += 1
+
+
+def run(mode: str, threads: int, seconds: float) -> Dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = str(Path(tmp) / "agent.db")
+        writer = None
+        if mode == "stock":
+            storage, memory_db = build_stock(db_file)
+        else:
+            storage, memory_db, writer = build_shared(db_file)
+        storage.create()
+        memory_db.create()
+
+        stop = threading.Event()
+        timings: Dict[str, List[float]] = {"read": [], "upsert": [], "memory_write": [], "memory_read": []}
+        failures: List[int] = []
+        workers = [
+            threading.Thread(target=chat_session, args=(storage, memory_db, stop, timings, failures))
+            for _ in range(threads)
+        ]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        time.sleep(seconds)
+        stop.set()
+        for worker in workers:
+            worker.join()
+        if writer is not None:
+            # Only count writes once they are committed
+            writer.close()
+        elapsed = time.perf_counter() - start
+
+    writes = len(timings["upsert"]) + len(timings["memory_write"]) - len(failures)
+    # Coalesced upserts of a session only cost one write
+    committed = writer.stats["written"] if writer is not None else writes
+    return {
+        "mode": mode,
+        "turns_per_second": len(timings["upsert"]) / elapsed,
+        "commits_per_second": committed / elapsed,
+        "failures": len(failures),
+        **{name: percentiles(values) for name, values in timings.items() if values},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+    # Stock upserts log every "database is locked" failure, they are counted instead
+    logger.setLevel(logging.ERROR)
+
+    print(f"{args.threads} chat sessions for {args.seconds:.0f}s each run")
+    for mode in ("stock", "shared"):
+        result = run(mode, args.threads, args.seconds)
+        print(
+            f"{mode:>7}: {result['turns_per_second']:>7.0f} turns/s, "
+            f"{result['commits_per_second']:>7.0f} row writes/s, {result['failures']} failed writes"
+        )
+        for name in ("upsert", "memory_write", "read", "memory_read"):
+            if name in result:
+                print(f"{name:>20}: p50 {result[name]['p50_ms']:>8.2f}ms  p99 {result[name]['p99_ms']:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Server CPU time and websocket bytes of streaming one answer into the chat.
+
+Streams a `--words`-word answer (in 4-character tokens, the size of a Level 4
+article) arriving at `--tokens-per-second`, into a placeholder that builds and
+serializes the ForwardMsg Streamlit sends over the websocket for each redraw:
+
+- per-chunk: what the views did, `full_response += chunk` and a redraw per chunk
+- renderer: utils.streaming.StreamRenderer, chunks buffered and redrawn at most
+  STREAM_FPS times per second
+
+Token arrival is simulated with a fake clock, so only the rendering work is timed.
+
+Usage:
+    python -m benchmarks.bench_streaming_render [--words 1500] [--tokens-per-second 60]
+"""
+
+import argparse
+import random
+import time
+
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.string_util import clean_text
+
+from utils.streaming import CURSOR, StreamRenderer
+
+
+class WebsocketPlaceholder:
+    """Counts the redraws of a placeholder and the bytes of the messages they send."""
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    def markdown(self, body: str) -> None:
+        message = ForwardMsg()
+        message.metadata.delta_path[:] = [0, 3, 1, 0]
+        message.delta.new_element.markdown.body = clean_text(body)
+        self.frames += 1
+        self.bytes += len(message.SerializeToString())
+
+
+def make_chunks(words: int) -> list:
+    rng = random.Random(0)
+    text = " ".join(rng.choice(["market", "investors", "2025", "growth", "rates", "the", "and"]) for _ in range(words))
+    # Roughly one token per 4 characters, as the model streams them
+    return [text[i : i + 4] for i in range(0, len(text), 4)]
+
+
+def per_chunk(chunks: list, placeholder: WebsocketPlaceholder, tokens_per_second: float) -> str:
+    full_response = ""
+    for chunk in chunks:
+        full_response += chunk
+        placeholder.markdown(full_response + CURSOR)
+    placeholder.markdown(full_response)
+    return full_response
+
+
+def renderer(chunks: list, placeholder: WebsocketPlaceholder, tokens_per_second: float) -> str:
+    now = [0.0]
+    with StreamRenderer(placeholder, clock=lambda: now[0]) as stream:
+        for chunk in chunks:
+            now[0] += 1 / tokens_per_second
+            stream.write(chunk)
+    return stream.text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=1500)
+    parser.add_argument("--tokens-per-second", type=float, default=60)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.words)
+    print(f"{len(chunks)} chunks, {sum(map(len, chunks))} characters")
+    print(f"{'mode':>10} {'redraws':>8} {'cpu':>9} {'websocket':>11}")
+    expected = "".join(chunks)
+    for mode, render in (("per-chunk", per_chunk), ("renderer", renderer)):
+        placeholder = WebsocketPlaceholder()
+        start = time.process_time()
+        text = render(chunks, placeholder, args.tokens_per_second)
+        cpu = time.process_time() - start
+        assert text == expected
+        print(f"{mode:>10} {placeholder.frames:>8} {cpu * 1000:>7.1f}ms {placeholder.bytes / 1e6:>9.2f}MB")
+
+
+if __name__ == "__main__":
+    main()
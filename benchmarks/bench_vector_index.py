@@ -0,0 +1,139 @@
+"""Measure recall@k against p50/p99 query latency of LanceDB vector index settings.
+
+Builds synthetic corpora (clustered unit vectors, like sentence embeddings) of
+increasing size, computes the exact neighbours of held-out queries with numpy, and
+compares a brute-force scan with IVF_PQ indexes over a grid of nprobes and
+refine factors. Use it to pick `nprobes` / `refine_factor` for `IndexedLanceDb`.
+
+Usage:
+    python -m benchmarks.bench_vector_index [--sizes 10000 100000 1000000] [--dim 1536] [--json results.json]
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import lancedb
+import numpy as np
+import pyarrow as pa
+
+NPROBES = [5, 10, 20, 50]
+REFINE_FACTORS = [None, 5, 20]
+
+
+def make_corpus(size: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors scattered around `sqrt(size)` cluster centres."""
+    rng = np.random.default_rng(seed)
+    num_clusters = max(1, int(size**0.5))
+    centres = rng.normal(size=(num_clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(num_clusters, size=size)] + 0.5 * rng.normal(size=(size, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_neighbours(corpus: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    neighbours = []
+    for query in queries:
+        scores = corpus @ query
+        neighbours.append(set(np.argpartition(-scores, k)[:k].tolist()))
+    return neighbours
+
+
+def create_table(db, corpus: np.ndarray) -> "lancedb.table.LanceTable":
+    dim = corpus.shape[1]
+    table = None
+    # Write in batches to keep the Arrow buffers small on large corpora
+    for start in range(0, len(corpus), 100_000):
+        batch = corpus[start : start + 100_000]
+        data = pa.table(
+            {
+                "vector": pa.FixedSizeListArray.from_arrays(pa.array(batch.ravel()), dim),
+                "id": pa.array(range(start, start + len(batch)), pa.int64()),
+            }
+        )
+        if table is None:
+            table = db.create_table("bench", data)
+        else:
+            table.add(data)
+    return table
+
+
+def measure(table, queries: np.ndarray, truth: List[set], k: int, nprobes: Optional[int], refine: Optional[int]):
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        search = table.search(query).metric("cosine").select(["id"]).limit(k)
+        if nprobes:
+            search = search.nprobes(nprobes)
+        if refine:
+            search = search.refine_factor(refine)
+        start = time.perf_counter()
+        found = search.to_arrow()["id"].to_pylist()
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(expected & set(found)) / k)
+    latencies.sort()
+    return {
+        "recall": statistics.mean(recalls),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+
+def bench_size(size: int, dim: int, num_queries: int, k: int) -> List[Dict]:
+    corpus = make_corpus(size, dim)
+    rng = np.random.default_rng(1)
+    # Queries close to (but not exactly) corpus points, like a question about a chunk
+    queries = corpus[rng.integers(size, size=num_queries)] + 0.1 * rng.normal(size=(num_queries, dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = exact_neighbours(corpus, queries, k)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        table = create_table(lancedb.connect(tmp), corpus)
+        flat = measure(table, queries, truth, k, None, None)
+        results.append({"size": size, "index": "flat", "nprobes": None, "refine_factor": None, "build_s": 0.0, **flat})
+
+        start = time.perf_counter()
+        table.create_index(metric="cosine", vector_column_name="vector", index_type="IVF_PQ")
+        build_seconds = time.perf_counter() - start
+        for nprobes in NPROBES:
+            for refine in REFINE_FACTORS:
+                results.append(
+                    {
+                        "size": size,
+                        "index": "IVF_PQ",
+                        "nprobes": nprobes,
+                        "refine_factor": refine,
+                        "build_s": round(build_seconds, 2),
+                        **measure(table, queries, truth, k, nprobes, refine),
+                    }
+                )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=1536, help="text-embedding-3-small has 1536 dimensions")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'rows':>8} {'index':>7} {'nprobes':>8} {'refine':>7} {'build':>7} {f'recall@{args.k}':>10} {'p50':>8} {'p99':>8}")
+    for size in args.sizes:
+        for row in bench_size(size, args.dim, args.queries, args.k):
+            results.append(row)
+            print(
+                f"{row['size']:>8} {row['index']:>7} {row['nprobes'] or '-':>8} {row['refine_factor'] or '-':>7} "
+                f"{row['build_s']:>6.1f}s {row['recall']:>10.3f} {row['p50_ms']:>6.2f}ms {row['p99_ms']:>6.2f}ms"
+            )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"k": args.k, "dim": args.dim, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""Local stub servers used by the benchmarks, so they run without network access."""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Union
+
+
+class StubHackerNewsServer:
+    """Minimal HackerNews API stub with a fixed per-request latency.
+
+    Serves `/v0/topstories.json` and `/v0/item/<id>.json` on a random local port.
+
+    Args:
+        num_stories: Number of stories in the top list
+        latency: Simulated server round-trip in seconds, added to every request
+    """
+
+    def __init__(self, num_stories: int = 500, latency: float = 0.05):
+        self.latency = latency
+        self.story_ids = list(range(1000, 1000 + num_stories))
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                time.sleep(stub.latency)
+
+                body = stub.route(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}/v0"
+
+    def item(self, item_id: int) -> dict:
+        return {
+            "by": f"user{item_id % 97}",
+            "descendants": item_id % 300,
+            "id": item_id,
+            "kids": list(range(item_id * 10, item_id * 10 + 20)),
+            "score": 1000 - (item_id % 1000),
+            "time": 1_700_000_000 + item_id,
+            "title": f"Stub story number {item_id}",
+            "type": "story",
+            "url": f"https://example.com/stories/{item_id}",
+        }
+
+    def route(self, path: str):
+        if path == "/v0/topstories.json":
+            return self.story_ids
+        if path == "/v0/updates.json":
+            return {"items": self.story_ids[::7], "profiles": []}
+        match = re.fullmatch(r"/v0/item/(\d+)\.json", path)
+        if match:
+            return self.item(int(match.group(1)))
+        return None
+
+    def __enter__(self) -> "StubHackerNewsServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubOpenAIServer:
+    """Minimal OpenAI chat completions stub, streaming and non-streaming.
+
+    Serves `POST /v1/chat/completions` on a random local port and answers every request
+    with the same short completion. Point the OpenAI client at it with `base_url` (or
+    the OPENAI_BASE_URL environment variable).
+
+    Args:
+        latency: Simulated time to first token in seconds
+        tokens: Number of tokens in every completion
+        token_delay: Seconds between two streamed tokens
+        tool_calls: Tool name -> arguments. When a request offers one of these tools and
+            doesn't end with a tool result, the stub calls that tool instead of answering.
+            With a list of arguments, the n-th call (after n - 1 tool results) uses the
+            n-th arguments, and the stub answers once they are used up
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.2,
+        tokens: int = 40,
+        token_delay: float = 0.005,
+        tool_calls: Optional[Dict[str, Union[dict, List[dict]]]] = None,
+    ):
+        self.latency = latency
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.tool_calls = tool_calls or {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                time.sleep(stub.latency)
+
+                if not request.get("stream"):
+                    payload = json.dumps(stub.completion(request)).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for chunk in stub.chunks(request):
+                    self.write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+                    time.sleep(stub.token_delay)
+                self.write_chunk(b"data: [DONE]\n\n")
+                self.write_chunk(b"")
+
+            def write_chunk(self, data: bytes) -> None:
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}/v1"
+
+    def words(self):
+        return [f"word{i} " for i in range(self.tokens)]
+
+    def usage(self) -> dict:
+        return {"prompt_tokens": 100, "completion_tokens": self.tokens, "total_tokens": 100 + self.tokens}
+
+    def tool_call(self, request: dict) -> Optional[dict]:
+        messages = request.get("messages") or [{}]
+        offered = [tool["function"]["name"] for tool in request.get("tools") or []]
+        name = next((name for name in offered if name in self.tool_calls), None)
+        if name is None:
+            return None
+        arguments = self.tool_calls[name]
+        if isinstance(arguments, list):
+            done = sum(message.get("role") == "tool" for message in messages)
+            if done >= len(arguments):
+                return None
+            arguments = arguments[done]
+        elif messages[-1].get("role") == "tool":
+            return None
+        with self._lock:
+            call_id = f"call_{self.requests}"
+        arguments = json.dumps(arguments)
+        return {"id": call_id, "type": "function", "function": {"name": name, "arguments": arguments}}
+
+    def completion(self, request: dict) -> dict:
+        tool_call = self.tool_call(request)
+        if tool_call is not None:
+            message = {"role": "assistant", "content": None, "tool_calls": [tool_call]}
+        else:
+            message = {"role": "assistant", "content": "".join(self.words())}
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [
+                {"index": 0, "message": message, "finish_reason": "tool_calls" if tool_call else "stop"}
+            ],
+            "usage": self.usage(),
+        }
+
+    def chunks(self, request: dict):
+        base = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+        }
+        tool_call = self.tool_call(request)
+        if tool_call is not None:
+            delta = {"role": "assistant", "tool_calls": [{"index": 0, **tool_call}]}
+            yield {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            done = {"index": 0, "delta": {}, "finish_reason": "tool_calls"}
+            yield {**base, "choices": [done], "usage": self.usage()}
+            return
+        for word in self.words():
+            yield {**base, "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+        yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": self.usage()}
+
+    def __enter__(self) -> "StubOpenAIServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Generic, TypeVar
+
+import streamlit as st
+from agno.utils.log import log_debug
+
+# Maximum number of agents kept per page, the least recently used one is evicted first
+MAX_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "64"))
+# Seconds an agent can stay unused before it is evicted
+IDLE_TTL = 30 * 60
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Pooled(Generic[T]):
+    agent: T
+    last_used: float
+
+
+class AgentPool(Generic[T]):
+    """LRU pool of agents (or teams), one per browser session.
+
+    Each session gets its own agent built by `factory(session_id)`, so the run state,
+    session_id and memory of one user never leak into another user's run, and sessions
+    run concurrently instead of queueing on a single agent. The factory should only
+    build the lightweight parts (the Agent, its model and tools) and reuse the shared
+    ones (HTTP client, knowledge base, storage) from the registry.
+
+    Agents unused for `idle_ttl` seconds are evicted, and so is the least recently used
+    one when the pool is full. An evicted session just gets a new agent on its next
+    run, which reloads its history from storage.
+
+    Args:
+        factory: Builds the agent of a session
+        max_size: Maximum number of agents kept
+        idle_ttl: Seconds after which an unused agent is evicted
+    """
+
+    def __init__(self, factory: Callable[[str], T], max_size: int = MAX_POOL_SIZE, idle_ttl: float = IDLE_TTL):
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._agents: "OrderedDict[str, _Pooled[T]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "created": 0, "evicted_idle": 0, "evicted_lru": 0}
+
+    def get(self, session_id: str) -> T:
+        """Return the agent of a session, creating it if needed."""
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            pooled = self._agents.get(session_id)
+            if pooled is not None:
+                pooled.last_used = now
+                self._agents.move_to_end(session_id)
+                self.stats["hits"] += 1
+                return pooled.agent
+
+        # Built outside the lock, so a slow factory doesn't hold up the other sessions
+        agent = self.factory(session_id)
+        with self._lock:
+            pooled = self._agents.get(session_id)
+            if pooled is not None:
+                # Another run of this session built one first
+                return pooled.agent
+            self._agents[session_id] = _Pooled(agent=agent, last_used=now)
+            self.stats["created"] += 1
+            while len(self._agents) > self.max_size:
+                evicted, _ = self._agents.popitem(last=False)
+                self.stats["evicted_lru"] += 1
+                log_debug(f"Evicted the agent of session {evicted} (pool full)")
+        return agent
+
+    def discard(self, session_id: str) -> None:
+        """Drop the agent of a session, its next run gets a new one."""
+        with self._lock:
+            self._agents.pop(session_id, None)
+
+    def _evict_idle(self, now: float) -> None:
+        # Least recently used first, so only the idle ones at the front are looked at
+        while self._agents:
+            session_id, pooled = next(iter(self._agents.items()))
+            if now - pooled.last_used < self.idle_ttl:
+                break
+            del self._agents[session_id]
+            self.stats["evicted_idle"] += 1
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Return the pool size and its hit/creation/eviction counters."""
+        with self._lock:
+            return {"size": len(self._agents), "max_size": self.max_size, **self.stats}
+
+
+def session_agent(pool: AgentPool[T], key: str) -> T:
+    """Return the pooled agent of the current browser session.
+
+    Args:
+        pool: The page's agent pool
+        key: Session state key holding the page's agent session_id
+    """
+    if key not in st.session_state:
+        # One agent session per browser session and page, kept across reruns
+        st.session_state[key] = str(uuid.uuid4())
+    return pool.get(st.session_state[key])
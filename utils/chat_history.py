@@ -0,0 +1,55 @@
+import os
+from typing import Dict, List
+
+import streamlit as st
+
+# Messages drawn on a rerun, the latest ones, older turns are behind a "Show earlier" button
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "20"))
+# Messages added to the window by each click on "Show earlier"
+HISTORY_PAGE = int(os.getenv("HISTORY_PAGE", "20"))
+
+
+def _window_key(key: str) -> str:
+    return f"{key}_history_window"
+
+
+def _show_earlier(key: str) -> None:
+    st.session_state[_window_key(key)] = st.session_state.get(_window_key(key), HISTORY_WINDOW) + HISTORY_PAGE
+
+
+def render_history(messages: List[Dict[str, str]], key: str) -> None:
+    """Draw the chat history, the latest HISTORY_WINDOW messages only.
+
+    Every rerun (each message sent, each button clicked) used to redraw the whole
+    transcript, so a long chat got slower with every turn. Only the latest messages are
+    drawn now, older ones are a "Show earlier" click away, so a rerun costs the same at
+    turn 10 and at turn 1000.
+
+    The messages drawn are sent as is from one rerun to the next, and Streamlit keeps
+    them in the browser by content hash: the long ones (over `global.minCachedMessageSize`,
+    see .streamlit/config.toml) are sent once, then only referenced.
+
+    Args:
+        messages: The page's chat history, `{"role": ..., "content": ...}` dicts
+        key: Prefix of the page's widget and session state keys, e.g. "level1"
+    """
+    if not messages:
+        # Cleared chat, the next one starts with the default window
+        st.session_state.pop(_window_key(key), None)
+        return
+
+    window = st.session_state.get(_window_key(key), HISTORY_WINDOW)
+    hidden = max(len(messages) - window, 0)
+    if hidden:
+        st.button(
+            f"Show {min(hidden, HISTORY_PAGE)} earlier messages ({hidden} hidden)",
+            key=f"{key}_show_earlier",
+            on_click=_show_earlier,
+            args=(key,),
+            type="tertiary",
+            use_container_width=True,
+        )
+
+    for message in messages[hidden:]:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
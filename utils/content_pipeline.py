@@ -0,0 +1,159 @@
+import contextvars
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+from agno.agent import Agent
+from agno.utils.log import logger
+
+from utils.tracing import span
+
+# Independent research sub-queries, each run by its own Researcher instance
+RESEARCH_ASPECTS = [
+    "the latest data, statistics and market trends",
+    "expert opinions, outlooks and what reputable institutions say",
+    "risks, criticism and contradicting viewpoints",
+]
+# Characters of the draft so far shown to the Writer when it continues the article
+DRAFT_CONTEXT_CHARS = 2000
+
+
+@dataclass
+class PipelineEvent:
+    """One step of a pipelined run, in the order the UI should show them.
+
+    `stage` is "research" (a sub-query finished), "draft" (a chunk of the article),
+    "review" (the editor's notes on a part of the draft) or "error".
+    """
+
+    stage: str
+    content: str
+    part: Optional[int] = None
+    at: float = field(default_factory=time.perf_counter)
+
+
+class ContentPipeline:
+    """Pipelined research -> writing -> review, instead of the Team's coordinate mode.
+
+    In coordinate mode the coordinator hands the topic to the Researcher, waits for the
+    whole report, hands it to the Writer, waits for the whole article and edits it: the
+    first visible token comes after every stage. Here:
+
+    - The topic is split into independent sub-queries (`aspects`), researched
+      concurrently by separate Researcher instances.
+    - Each research section goes to the Writer as soon as it is done. The Writer streams
+      one part of the article per section, continuing the draft so far, while the
+      remaining research runs.
+    - Each finished part is reviewed by the editor in the background, while the Writer
+      streams the next one. The notes are yielded once the draft is complete.
+
+    Agents are built per run by the factories, so concurrent runs share no run state.
+
+    Args:
+        researcher: Builds a Researcher agent
+        writer: Builds the Writer agent
+        editor: Builds the agent reviewing the draft (the Team's coordinator role)
+        aspects: Research sub-queries, formatted with the topic
+    """
+
+    def __init__(
+        self,
+        researcher: Callable[[], Agent],
+        writer: Callable[[], Agent],
+        editor: Callable[[], Agent],
+        aspects: Optional[List[str]] = None,
+    ):
+        self.researcher = researcher
+        self.writer = writer
+        self.editor = editor
+        self.aspects = aspects or RESEARCH_ASPECTS
+
+    def run(self, topic: str) -> Iterator[PipelineEvent]:
+        """Run the pipeline on a topic, yielding the research, draft and review events."""
+        executor = ThreadPoolExecutor(max_workers=len(self.aspects) + 1, thread_name_prefix="content-pipeline")
+        try:
+            # Each task runs in a copy of the caller's context, so its spans land in the caller's trace
+            research: Dict[Future, str] = {
+                executor.submit(contextvars.copy_context().run, self._research, topic, aspect): aspect
+                for aspect in self.aspects
+            }
+            reviews: List[Future] = []
+            draft = ""
+            unread = set(research)
+            # The last part written, and whether it ended the article
+            written, concluded = 0, False
+            for part, future in enumerate(as_completed(research)):
+                unread.discard(future)
+                aspect = research[future]
+                try:
+                    section = future.result()
+                except Exception as e:
+                    logger.warning(f"Research on {aspect} failed: {e}")
+                    yield PipelineEvent("error", f"Research on {aspect} failed: {e}", part)
+                    continue
+                yield PipelineEvent("research", aspect, part)
+
+                text = ""
+                # The last section, unless some research still running (or not read yet) succeeds
+                last = all(other.done() and other.exception() is not None for other in unread)
+                written, concluded = part, last
+                with span("member", f"writer: part {part + 1}"):
+                    for chunk in self.writer().run(self._writer_prompt(topic, section, draft, last), stream=True):
+                        if chunk.content:
+                            text += chunk.content
+                            yield PipelineEvent("draft", chunk.content, part)
+                draft += text + "\n\n"
+                yield PipelineEvent("draft", "\n\n", part)
+                reviews.append(executor.submit(contextvars.copy_context().run, self._review, topic, text, part))
+
+            if draft and not concluded:
+                # The research after the last part written failed, the article still needs its ending
+                with span("member", "writer: conclusion"):
+                    for chunk in self.writer().run(self._conclusion_prompt(topic, draft), stream=True):
+                        if chunk.content:
+                            yield PipelineEvent("draft", chunk.content, written)
+                yield PipelineEvent("draft", "\n\n", written)
+
+            for part, future in enumerate(reviews):
+                try:
+                    yield PipelineEvent("review", future.result(), part)
+                except Exception as e:
+                    yield PipelineEvent("error", f"Review failed: {e}", part)
+        finally:
+            # Don't keep researching for a run whose page went away
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _research(self, topic: str, aspect: str) -> str:
+        prompt = f"Research {aspect} on: {topic}\nReturn a focused Knowledge Report section with cited sources."
+        with span("member", f"researcher: aspect {self.aspects.index(aspect) + 1}"):
+            return self.researcher().run(prompt).content or ""
+
+    def _writer_prompt(self, topic: str, section: str, draft: str, last: bool) -> str:
+        if not draft:
+            task = (
+                "Write the headline, a short introduction and the first section of the article, "
+                "using this research. Stop after that section, more sections will follow."
+            )
+        else:
+            task = (
+                "Continue the article with the next section, using this new research. Don't repeat "
+                f"the draft so far, which ends with:\n\n{draft[-DRAFT_CONTEXT_CHARS:]}"
+            )
+        if last:
+            task += "\nThis is the last section: end the article with a conclusion and key takeaways."
+        return f"Topic: {topic}\n\n{task}\n\n<research>\n{section}\n</research>"
+
+    def _conclusion_prompt(self, topic: str, draft: str) -> str:
+        return (
+            f"Topic: {topic}\n\nEnd the article with a conclusion and key takeaways. Don't repeat "
+            f"the draft so far, which ends with:\n\n{draft[-DRAFT_CONTEXT_CHARS:]}"
+        )
+
+    def _review(self, topic: str, text: str, part: int) -> str:
+        prompt = (
+            f"Review this part of the article on {topic} for accuracy, clarity and attribution of sources. "
+            f"List only the concrete edits it needs, briefly.\n\n<draft>\n{text}\n</draft>"
+        )
+        with span("member", f"editor: part {part + 1}"):
+            return self.editor().run(prompt).content or ""
@@ -0,0 +1,98 @@
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from utils.tokens import count_tokens, truncate_to_tokens
+
+# Story fields sent to the model, everything else (type, kids, raw epoch...) is dropped
+STORY_FIELDS = ("title", "score", "descendants", "by", "time", "url")
+# Hard cap on the tokens the stories may add to the instructions
+STORY_TOKEN_BUDGET = 400
+# Titles longer than this are truncated before the budget is even considered
+MAX_TITLE_CHARS = 120
+
+
+class LiveContext:
+    """Agent context value that is re-rendered every time the instructions are built.
+
+    Agno resolves callables in `Agent.context` once and stores the result back in the
+    dict, so a cached Agent would keep the value of its first run forever. This wrapper
+    is not callable, so Agno leaves it in place, and it renders `render()` whenever the
+    instructions are formatted (via `add_state_in_messages`) or the context is dumped.
+
+    Args:
+        render: Function returning the current value of the context entry
+    """
+
+    def __init__(self, render: Callable[[], str]):
+        self.render = render
+
+    def __format__(self, format_spec: str) -> str:
+        return format(self.render(), format_spec)
+
+    def __str__(self) -> str:
+        return self.render()
+
+
+def _format_age(timestamp: int, now: float) -> str:
+    minutes = max(int(now - timestamp) // 60, 0)
+    if minutes < 60:
+        return f"{minutes}m ago"
+    if minutes < 60 * 24:
+        return f"{minutes // 60}h ago"
+    return f"{minutes // (60 * 24)}d ago"
+
+
+def format_story_line(rank: int, story: Dict[str, Any], fields: Sequence[str] = STORY_FIELDS, now: Optional[float] = None) -> str:
+    """Render one story as a single compact line, e.g.
+    `1. Some title | 512 pts | 230 comments | by pg | 3h ago | https://...`
+    """
+    now = now or time.time()
+    parts = []
+    for field in fields:
+        value = story.get(field)
+        if value is None:
+            continue
+        if field == "title":
+            value = value if len(value) <= MAX_TITLE_CHARS else value[: MAX_TITLE_CHARS - 1].rstrip() + "…"
+        elif field == "score":
+            value = f"{value} pts"
+        elif field == "descendants":
+            value = f"{value} comments"
+        elif field == "by":
+            value = f"by {value}"
+        elif field == "time":
+            value = _format_age(value, now)
+        parts.append(str(value))
+    return f"{rank}. " + " | ".join(parts)
+
+
+def compact_stories(
+    stories: List[Dict[str, Any]],
+    fields: Sequence[str] = STORY_FIELDS,
+    max_tokens: int = STORY_TOKEN_BUDGET,
+) -> str:
+    """Serialize stories as one line each, within a hard token budget.
+
+    Only `fields` are kept, and stories are added in rank order until the budget is
+    reached: the first story that doesn't fit is truncated if at least half of it
+    fits, and every story after it is dropped.
+    """
+    now = time.time()
+    lines: List[str] = []
+    used = 0
+    for rank, story in enumerate(stories, start=1):
+        line = format_story_line(rank, story, fields=fields, now=now)
+        # Lines are joined with a newline, count it as part of the line
+        cost = count_tokens(line + "\n")
+        if used + cost > max_tokens:
+            # Truncate the story if most of it still fits, otherwise drop it
+            remaining = max_tokens - used - 1
+            if remaining >= cost // 2:
+                truncated = truncate_to_tokens(line, remaining)
+                # None when not even the suffix fits
+                if truncated is not None:
+                    lines.append(truncated)
+            break
+        lines.append(line)
+        used += cost
+    return "\n".join(lines)
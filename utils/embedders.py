@@ -0,0 +1,48 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from agno.embedder.base import Embedder
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+@dataclass
+class HashingEmbedder(Embedder):
+    """Deterministic, offline embedder based on feature hashing.
+
+    Every lower-cased word and word bigram is hashed to a dimension and a sign, and the
+    resulting bag-of-features vector is L2 normalized. Texts sharing words get similar
+    vectors, which is enough to exercise vector and hybrid search without the network
+    (e.g. in CI and benchmarks). Same dimensionality as text-embedding-3-small, so it can
+    stand in for OpenAIEmbedder in the LanceDb config.
+
+    Args:
+        dimensions: Size of the vectors
+        bigrams: Also hash pairs of consecutive words, which captures some word order
+    """
+
+    id: str = "hashing"
+    dimensions: int = 1536
+    bigrams: bool = True
+
+    def _features(self, text: str) -> List[str]:
+        words = TOKEN_PATTERN.findall(text.lower())
+        if not self.bigrams:
+            return words
+        return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+    def get_embedding(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in self._features(text):
+            digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+            vector[digest % self.dimensions] += 1.0 if (digest >> 63) else -1.0
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
@@ -0,0 +1,270 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from agno.embedder.base import Embedder
+from agno.embedder.openai import OpenAIEmbedder
+from agno.utils.log import log_debug, logger
+
+EMBEDDING_CACHE_PATH = Path("tmp/embeddings.db")
+# Maximum number of embeddings kept on disk, least recently used ones are evicted first
+MAX_CACHE_ENTRIES = 100_000
+# Embeddings also kept in process memory, for repeated questions
+MEMORY_CACHE_ENTRIES = 2048
+# How long (in seconds) a cache miss waits for other misses to share its request
+BATCH_WINDOW = 0.01
+# Maximum number of texts in one embeddings request
+MAX_BATCH_SIZE = 256
+
+
+def normalize_text(text: str) -> str:
+    """Normalize the unicode form and the whitespace, so trivially different texts share an entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingStore:
+    """SQLite-backed embedding store with LRU eviction and a size cap.
+
+    Vectors are stored as float32 blobs keyed by a hash of (model id, normalized text).
+    Last-use timestamps are kept in memory and flushed with the next write, so cache hits
+    don't write to disk.
+    """
+
+    def __init__(self, path: Path = EMBEDDING_CACHE_PATH, max_entries: int = MAX_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        # Lets maintenance return the pages of evicted entries to the disk (only applies to new files)
+        self.connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self.connection.commit()
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        # Running number of entries, counted once here rather than after every write. Maintenance
+        # deletes entries too, so it can only be too high, and is counted again before evicting
+        (self._count,) = self.connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        now = time.time()
+        with self._lock:
+            # Stay well below SQLite's limit on the number of query parameters
+            for i in range(0, len(keys), 500):
+                batch = keys[i : i + 500]
+                rows = self.connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+                    self._touched[key] = now
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        now = time.time()
+        with self._lock:
+            with self.connection:
+                keys = list(items)
+                existing = 0
+                for i in range(0, len(keys), 500):
+                    batch = keys[i : i + 500]
+                    (found,) = self.connection.execute(
+                        f"SELECT COUNT(*) FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                    ).fetchone()
+                    existing += found
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                    [(key, vector.astype(np.float32).tobytes(), now) for key, vector in items.items()],
+                )
+                self.connection.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(last_used, key) for key, last_used in self._touched.items() if key not in items],
+                )
+                self._touched.clear()
+                self._count += len(items) - existing
+                self._evict()
+
+    def _evict(self) -> None:
+        if self._count <= self.max_entries:
+            return
+        (self._count,) = self.connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if self._count <= self.max_entries:
+            return
+        # Evict down to 90% of the cap, so eviction doesn't run on every write
+        excess = self._count - int(self.max_entries * 0.9)
+        self.connection.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._count -= excess
+        log_debug(f"Evicted {excess} embeddings from the cache")
+
+    def close(self) -> None:
+        with self._lock:
+            self.connection.close()
+
+
+@dataclass
+class CachedEmbedder(Embedder):
+    """Embedder wrapper that caches embeddings on disk and batches concurrent misses.
+
+    Lookups go through an in-memory LRU, then the on-disk store, and misses that arrive
+    within `batch_window` seconds of each other are sent as a single embeddings request.
+    Drop-in for the `embedder=` argument of `LanceDb`.
+
+    Args:
+        embedder: The embedder computing the embeddings on a cache miss
+        cache_path: SQLite file holding the cached embeddings
+        max_entries: Maximum number of embeddings kept on disk
+        batch_window: Seconds a miss waits for other misses to share its request
+    """
+
+    embedder: Embedder = field(default_factory=OpenAIEmbedder)
+    cache_path: Path = EMBEDDING_CACHE_PATH
+    max_entries: int = MAX_CACHE_ENTRIES
+    batch_window: float = BATCH_WINDOW
+
+    def __post_init__(self):
+        self.dimensions = self.embedder.dimensions
+        # Same model with other dimensions gives other vectors
+        self.model_id = f"{getattr(self.embedder, 'id', type(self.embedder).__name__)}:{self.dimensions}"
+        self.store = EmbeddingStore(Path(self.cache_path), max_entries=self.max_entries)
+        self.memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, str, Future]] = []
+        self._has_pending = threading.Condition(self._lock)
+        # Set by close, the batcher then embeds what is pending and exits
+        self._stopping = threading.Event()
+        self._batcher = threading.Thread(target=self._batch_loop, name="embedding-batcher", daemon=True)
+        self._batcher.start()
+
+    def cache_key(self, text: str) -> str:
+        # Normalized for the key only, the embedder gets the text as it was given
+        return hashlib.sha256(f"{self.model_id}\0{normalize_text(text)}".encode()).hexdigest()
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embeddings([text])[0]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        # Usage is not tracked per text once requests are cached and batched
+        return self.get_embedding(text), None
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts, only sending the ones missing from the cache (in one request)."""
+        keys = [self.cache_key(text) for text in texts]
+        vectors = self._lookup(keys)
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            futures = self._enqueue(missing)
+            for key, future in futures.items():
+                vectors[key] = future.result()
+        return [vectors[key].tolist() for key in keys]
+
+    def _lookup(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        vectors: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    vectors[key] = self.memory[key]
+        remaining = [key for key in keys if key not in vectors]
+        if remaining:
+            stored = self.store.get_many(remaining)
+            self._remember(stored)
+            vectors.update(stored)
+        with self._lock:
+            self.hits += len(vectors)
+            self.misses += len(set(keys) - set(vectors))
+        return vectors
+
+    def _remember(self, vectors: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            for key, vector in vectors.items():
+                self.memory[key] = vector
+                self.memory.move_to_end(key)
+            while len(self.memory) > MEMORY_CACHE_ENTRIES:
+                self.memory.popitem(last=False)
+
+    def _enqueue(self, missing: Dict[str, str]) -> Dict[str, Future]:
+        futures: Dict[str, Future] = {}
+        with self._lock:
+            if self._stopping.is_set():
+                raise RuntimeError("CachedEmbedder is closed")
+            for key, text in missing.items():
+                future: Future = Future()
+                self._pending.append((key, text, future))
+                futures[key] = future
+            self._has_pending.notify()
+        return futures
+
+    def _batch_loop(self) -> None:
+        while True:
+            with self._lock:
+                while not self._pending and not self._stopping.is_set():
+                    self._has_pending.wait()
+                if not self._pending:
+                    return
+            if not self._stopping.is_set():
+                # Give concurrent misses a moment to join this batch
+                time.sleep(self.batch_window)
+            with self._lock:
+                batch, self._pending = self._pending[:MAX_BATCH_SIZE], self._pending[MAX_BATCH_SIZE:]
+            self._embed_batch(batch)
+
+    def _embed_batch(self, batch: List[Tuple[str, str, Future]]) -> None:
+        # The same text can be requested by several callers at once, embed it once
+        unique: Dict[str, str] = {}
+        for key, text, _ in batch:
+            unique.setdefault(key, text)
+        try:
+            embeddings = self._embed_texts(list(unique.values()))
+            vectors = {key: np.asarray(embedding, dtype=np.float32) for key, embedding in zip(unique, embeddings)}
+            self.store.put_many(vectors)
+            self._remember(vectors)
+        except Exception as e:
+            logger.warning(f"Embedding request failed: {e}")
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        log_debug(f"Embedded {len(unique)} texts in one request")
+        for key, _, future in batch:
+            future.set_result(vectors[key])
+
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if isinstance(self.embedder, OpenAIEmbedder):
+            request = {"input": texts, "model": self.embedder.id, "encoding_format": "float"}
+            if self.embedder.user is not None:
+                request["user"] = self.embedder.user
+            if self.embedder.id.startswith("text-embedding-3"):
+                request["dimensions"] = self.embedder.dimensions
+            if self.embedder.request_params:
+                request.update(self.embedder.request_params)
+            response = self.embedder.client.embeddings.create(**request)
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        if isinstance(self.embedder, CachedEmbedder):
+            return self.embedder.get_embeddings(texts)
+        return [self.embedder.get_embedding(text) for text in texts]
+
+    def close(self) -> None:
+        """Embed and store the pending misses, stop the batcher, then close the store."""
+        with self._lock:
+            self._stopping.set()
+            self._has_pending.notify()
+        self._batcher.join()
+        self.store.close()
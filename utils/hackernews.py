@@ -0,0 +1,323 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+import httpx
+from agno.utils.log import log_debug, logger
+
+HN_API_URL = "https://hacker-news.firebaseio.com/v0"
+
+# Maximum number of item requests in flight at the same time
+MAX_CONCURRENCY = 10
+# Timeout (in seconds) applied to every single request
+REQUEST_TIMEOUT = 5.0
+# Overall budget (in seconds) for fetching all the items of one call
+FETCH_DEADLINE = 8.0
+
+# Where the story snapshot is persisted so restarts come up warm
+SNAPSHOT_PATH = Path("tmp/hackernews_snapshot.json")
+# Seconds between two background refreshes of the snapshot
+REFRESH_INTERVAL = 60.0
+# Stories not re-polled for this many seconds are re-polled even if not reported as updated
+MAX_ITEM_AGE = 600.0
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package, fall back to HTTP/1.1 keep-alive without it."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HackerNewsClient:
+    """Pooled HackerNews API client that fetches story items concurrently.
+
+    A single `httpx.Client` is kept open so connections (and TLS sessions) are reused
+    between calls, and item requests are fanned out on a bounded thread pool so a
+    cache miss costs roughly one round-trip for the items, whatever the story count.
+
+    Args:
+        base_url: Root of the HackerNews API (overridable for local benchmarks)
+        max_concurrency: Maximum number of item requests in flight at once
+        timeout: Per-request timeout in seconds
+        deadline: Overall time budget in seconds for fetching the items of one call
+    """
+
+    def __init__(
+        self,
+        base_url: str = HN_API_URL,
+        max_concurrency: int = MAX_CONCURRENCY,
+        timeout: float = REQUEST_TIMEOUT,
+        deadline: float = FETCH_DEADLINE,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.deadline = deadline
+        self.client = httpx.Client(
+            base_url=self.base_url,
+            http2=_http2_available(),
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+                keepalive_expiry=60.0,
+            ),
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="hackernews"
+        )
+
+    def get_json(self, path: str) -> Any:
+        response = self.client.get(path)
+        response.raise_for_status()
+        return response.json()
+
+    def get_top_story_ids(self) -> List[int]:
+        return self.get_json("/topstories.json")
+
+    def get_item(self, item_id: int) -> Optional[Dict[str, Any]]:
+        return self.get_json(f"/item/{item_id}.json")
+
+    def get_updated_item_ids(self) -> Set[int]:
+        """Return the IDs of items that changed recently (new votes, new comments, edits)."""
+        return set(self.get_json("/updates.json").get("items", []))
+
+    def get_items(self, item_ids: List[int]) -> List[Dict[str, Any]]:
+        """Fetch several items concurrently, keeping the order of `item_ids`.
+
+        Items that fail or don't finish within the deadline are skipped, so the caller
+        always gets the partial result instead of an exception.
+        """
+        futures = [self.executor.submit(self.get_item, item_id) for item_id in item_ids]
+        done, not_done = wait(futures, timeout=self.deadline)
+        for future in not_done:
+            future.cancel()
+
+        items = []
+        for item_id, future in zip(item_ids, futures):
+            if future not in done:
+                logger.warning(f"HackerNews item {item_id} timed out, skipping it")
+                continue
+            try:
+                item = future.result()
+            except Exception as e:
+                logger.warning(f"Failed to fetch HackerNews item {item_id}: {e}")
+                continue
+            if item is not None:
+                items.append(item)
+        return items
+
+    def get_top_stories(self, num_stories: int = 5) -> List[Dict[str, Any]]:
+        """Return the top `num_stories` stories, without the 'kids' (comment IDs) field."""
+        start = time.perf_counter()
+        top_story_ids = self.get_top_story_ids()[:num_stories]
+        stories = [
+            {key: value for key, value in story.items() if key != "kids"}
+            for story in self.get_items(top_story_ids)
+        ]
+        log_debug(
+            f"Fetched {len(stories)}/{len(top_story_ids)} HackerNews stories "
+            f"in {time.perf_counter() - start:.3f}s"
+        )
+        return stories
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.client.close()
+
+
+_client: Optional[HackerNewsClient] = None
+_client_lock = threading.Lock()
+
+
+def get_hackernews_client() -> HackerNewsClient:
+    """Return the process-wide HackerNews client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HackerNewsClient()
+        return _client
+
+
+class StoryRefresher:
+    """Keeps a snapshot of the top HackerNews stories warm in a background thread.
+
+    Readers always get the latest snapshot immediately (stale-while-revalidate): a
+    refresh never blocks them, and a stale snapshot is served while it runs. Refreshes
+    are incremental, only stories that are new to the top list are fetched, and known
+    stories are re-polled only when HackerNews reports them as updated or when they
+    haven't been polled for `max_item_age` seconds. The snapshot is persisted to disk
+    so a restart serves the previous stories right away.
+
+    Args:
+        client: HackerNews client used for the refreshes
+        num_stories: Number of top stories to keep in the snapshot
+        interval: Seconds between two background refreshes
+        max_item_age: Seconds after which a story is re-polled regardless of updates
+        snapshot_path: File the snapshot is persisted to
+    """
+
+    def __init__(
+        self,
+        client: HackerNewsClient,
+        num_stories: int = 5,
+        interval: float = REFRESH_INTERVAL,
+        max_item_age: float = MAX_ITEM_AGE,
+        snapshot_path: Path = SNAPSHOT_PATH,
+    ):
+        self.client = client
+        self.num_stories = num_stories
+        self.interval = interval
+        self.max_item_age = max_item_age
+        self.snapshot_path = Path(snapshot_path)
+
+        # Current snapshot: story IDs in top order, the stories and when each one was polled
+        self.top_ids: List[int] = []
+        self.stories: Dict[int, Dict[str, Any]] = {}
+        self.polled_at: Dict[int, float] = {}
+        self.refreshed_at: Optional[float] = None
+
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._load_snapshot()
+
+    def start(self) -> "StoryRefresher":
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="hackernews-refresher", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+
+    def get_stories(self, num_stories: Optional[int] = None, wait: float = FETCH_DEADLINE) -> List[Dict[str, Any]]:
+        """Return the latest snapshot of the top stories.
+
+        Only the very first call of a process without a persisted snapshot waits (up to
+        `wait` seconds) for the first refresh; every other call returns immediately.
+        """
+        if not self._ready.is_set():
+            self._wake.set()
+            self._ready.wait(timeout=wait)
+        elif self.is_stale():
+            # Serve the stale snapshot and let the refresher catch up in the background
+            self._wake.set()
+
+        with self._lock:
+            top_ids = self.top_ids[: num_stories or self.num_stories]
+            return [dict(self.stories[story_id]) for story_id in top_ids if story_id in self.stories]
+
+    def is_stale(self) -> bool:
+        return self.refreshed_at is None or time.time() - self.refreshed_at > self.interval
+
+    def refresh(self) -> None:
+        """Incrementally refresh the snapshot, keeping the current one if anything fails."""
+        start = time.perf_counter()
+        top_ids = self.client.get_top_story_ids()[: self.num_stories]
+
+        now = time.time()
+        with self._lock:
+            new_ids = [story_id for story_id in top_ids if story_id not in self.stories]
+            known_ids = [story_id for story_id in top_ids if story_id in self.stories]
+            expired_ids = {
+                story_id
+                for story_id in known_ids
+                if now - self.polled_at.get(story_id, 0) > self.max_item_age
+            }
+
+        updated_ids: Set[int] = set()
+        if known_ids:
+            try:
+                updated_ids = self.client.get_updated_item_ids()
+            except Exception as e:
+                logger.warning(f"Failed to fetch HackerNews updates, re-polling all stories: {e}")
+                updated_ids = set(known_ids)
+
+        to_fetch = new_ids + [
+            story_id for story_id in known_ids if story_id in updated_ids or story_id in expired_ids
+        ]
+        fetched = {story["id"]: story for story in self.client.get_items(to_fetch)} if to_fetch else {}
+
+        with self._lock:
+            for story_id, story in fetched.items():
+                self.stories[story_id] = {key: value for key, value in story.items() if key != "kids"}
+                self.polled_at[story_id] = now
+            # Forget the stories that dropped out of the top list
+            self.top_ids = top_ids
+            self.stories = {story_id: self.stories[story_id] for story_id in top_ids if story_id in self.stories}
+            self.polled_at = {story_id: self.polled_at[story_id] for story_id in self.stories}
+            self.refreshed_at = now
+
+        self._ready.set()
+        self._save_snapshot()
+        log_debug(
+            f"Refreshed HackerNews snapshot: {len(new_ids)} new, {len(fetched) - len(new_ids)} re-polled, "
+            f"{len(top_ids) - len(to_fetch)} unchanged in {time.perf_counter() - start:.3f}s"
+        )
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"HackerNews refresh failed, serving the previous snapshot: {e}")
+            self._wake.wait(timeout=self.interval)
+
+    def _load_snapshot(self) -> None:
+        try:
+            snapshot = json.loads(self.snapshot_path.read_text())
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable HackerNews snapshot {self.snapshot_path}: {e}")
+            return
+
+        self.top_ids = snapshot["top_ids"]
+        self.stories = {story["id"]: story for story in snapshot["stories"]}
+        self.polled_at = {int(story_id): polled for story_id, polled in snapshot["polled_at"].items()}
+        self.refreshed_at = snapshot["refreshed_at"]
+        self._ready.set()
+
+    def _save_snapshot(self) -> None:
+        with self._lock:
+            snapshot = {
+                "top_ids": self.top_ids,
+                "stories": [self.stories[story_id] for story_id in self.top_ids if story_id in self.stories],
+                "polled_at": self.polled_at,
+                "refreshed_at": self.refreshed_at,
+            }
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so a crash never leaves a truncated snapshot
+            tmp_path = self.snapshot_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(snapshot))
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"Failed to persist HackerNews snapshot: {e}")
+
+
+_refresher: Optional[StoryRefresher] = None
+_refresher_lock = threading.Lock()
+
+
+def get_story_refresher(num_stories: int = 5) -> StoryRefresher:
+    """Return the process-wide story refresher, starting it on first use."""
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = StoryRefresher(get_hackernews_client(), num_stories=num_stories).start()
+        return _refresher
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import md5
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+import httpx
+from agno.document import Document
+from agno.knowledge.url import UrlKnowledge
+from agno.utils.log import log_debug, log_info, logger
+
+from utils.embedding_cache import CachedEmbedder
+from utils.vectordb import IndexedLanceDb
+
+# Per-document and per-chunk hashes of what is stored in the vector db
+MANIFEST_PATH = Path("tmp/ingest_manifest.json")
+# Maximum number of documents fetched at the same time
+MAX_CONCURRENT_FETCHES = 8
+# Timeout (in seconds) of a single document fetch
+FETCH_TIMEOUT = 30.0
+
+
+def chunk_id(document: Document) -> str:
+    """Row id LanceDb uses for a chunk (md5 of its cleaned content)."""
+    return md5(document.content.replace("\x00", "\ufffd").encode()).hexdigest()
+
+
+class IncrementalUrlKnowledge(UrlKnowledge):
+    """UrlKnowledge that only re-embeds what changed since the last load.
+
+    A manifest records, for every URL, its HTTP validators (ETag / Last-Modified), the
+    hash of its content and the ids of its chunks. On load, every URL is re-fetched
+    conditionally: a 304 or an identical content hash costs nothing more, and a changed
+    document only embeds the chunks that are new and deletes the rows of the chunks that
+    disappeared. URLs removed from `urls` have their rows deleted too.
+    """
+
+    manifest_path: Path = MANIFEST_PATH
+
+    def load(self, recreate: bool = False, upsert: bool = False, skip_existing: bool = True) -> Dict[str, int]:
+        """Incrementally sync the vector db with `urls`.
+
+        Args:
+            recreate (bool): If True, drops the table and the manifest and re-ingests everything.
+            upsert (bool): Unused, rows are always inserted or deleted by content hash.
+            skip_existing (bool): Unused, existing chunks are always skipped.
+        Returns:
+            Counts of fetched, not modified and unchanged documents, added and deleted chunks
+        """
+        stats = {"fetched": 0, "not_modified": 0, "unchanged": 0, "failed": 0, "chunks_added": 0, "chunks_deleted": 0}
+        if self.vector_db is None:
+            logger.warning("No vector db provided")
+            return stats
+
+        start = time.perf_counter()
+        manifest = {} if recreate else self._read_manifest()
+        if recreate:
+            log_info("Dropping collection")
+            self.vector_db.drop()
+        if not self.vector_db.exists():
+            log_info("Creating collection")
+            self.vector_db.create()
+        # The table was dropped or rebuilt behind our back, the manifest can't be trusted
+        if manifest and self.vector_db.get_count() == 0:
+            manifest = {}
+
+        # Conditional requests for every URL at once, so a no-change reload is one round-trip
+        with httpx.Client(timeout=FETCH_TIMEOUT, follow_redirects=True) as client:
+            with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FETCHES) as executor:
+                fetched = executor.map(lambda url: self._fetch(client, url, manifest.get(url)), self.urls)
+                responses = dict(zip(self.urls, fetched))
+
+        stale_ids: Set[str] = set()
+        for url in self.urls:
+            response = responses[url]
+            entry = manifest.get(url)
+            if response is None:
+                stats["failed"] += 1
+                continue
+            if response.status_code == 304:
+                stats["not_modified"] += 1
+                continue
+
+            stats["fetched"] += 1
+            content_hash = hashlib.sha256(response.content).hexdigest()
+            validators = {
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+            }
+            if entry is not None and entry["content_hash"] == content_hash:
+                stats["unchanged"] += 1
+                entry.update(validators)
+                continue
+
+            chunks = self._chunk(url, response.text)
+            old_ids = set(entry["chunk_ids"]) if entry else set()
+            # Keep one chunk per id, and only the ids that are not stored yet
+            chunks_by_id = {chunk_id(chunk): chunk for chunk in reversed(chunks)}
+            new_ids = set(chunks_by_id)
+            new_chunks = [chunk for cid, chunk in reversed(chunks_by_id.items()) if cid not in old_ids]
+            if new_chunks:
+                if isinstance(self.vector_db.embedder, CachedEmbedder):
+                    # Embed the whole document in one request, the inserts below then hit the cache
+                    self.vector_db.embedder.get_embeddings([chunk.content for chunk in new_chunks])
+                # LanceDb.insert still skips rows that exist (e.g. on the first run without a manifest)
+                self.vector_db.insert(documents=new_chunks)
+                stats["chunks_added"] += len(new_chunks)
+            stale_ids |= old_ids - new_ids
+
+            manifest[url] = {**validators, "content_hash": content_hash, "chunk_ids": sorted(new_ids)}
+
+        # Forget the URLs that are no longer part of the knowledge base
+        for url in list(manifest):
+            if url not in self.urls:
+                stale_ids |= set(manifest.pop(url)["chunk_ids"])
+
+        # Identical chunks can be shared by several documents, only delete unreferenced rows
+        referenced_ids = {cid for entry in manifest.values() for cid in entry["chunk_ids"]}
+        stale_ids -= referenced_ids
+        if stale_ids:
+            self._delete_rows(stale_ids)
+            stats["chunks_deleted"] = len(stale_ids)
+
+        if isinstance(self.vector_db, IndexedLanceDb):
+            # Builds the indexes once the table is big enough, then folds new rows into them
+            self.vector_db.ensure_indexes()
+
+        self._write_manifest(manifest)
+        log_info(f"Knowledge base synced in {time.perf_counter() - start:.2f}s: {stats}")
+        return stats
+
+    def _fetch(self, client: httpx.Client, url: str, entry: Optional[Dict[str, Any]]) -> Optional[httpx.Response]:
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            response = client.get(url, headers=headers)
+            if response.status_code != 304:
+                response.raise_for_status()
+            log_debug(f"Fetched {url}: {response.status_code}")
+            return response
+        except httpx.HTTPError as e:
+            logger.error(f"Error reading URL {url}: {e}")
+            return None
+
+    def _chunk(self, url: str, content: str) -> List[Document]:
+        document = self.reader._create_document(url, content)
+        if self.reader.chunk:
+            return self.reader.chunk_document(document)
+        return [document]
+
+    def _delete_rows(self, ids: Set[str]) -> None:
+        table = self.vector_db.table
+        id_list = ", ".join(f"'{row_id}'" for row_id in sorted(ids))
+        table.delete(f"{self.vector_db._id} IN ({id_list})")
+        log_info(f"Deleted {len(ids)} stale chunks")
+
+    def _read_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            return json.loads(self.manifest_path.read_text())["documents"]
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable ingestion manifest {self.manifest_path}: {e}")
+            return {}
+
+    def _write_manifest(self, documents: Dict[str, Dict[str, Any]]) -> None:
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"version": 1, "documents": documents}, indent=2))
+        os.replace(tmp_path, self.manifest_path)
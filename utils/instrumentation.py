@@ -0,0 +1,173 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Optional
+
+import altair as alt
+import streamlit as st
+
+# Number of recent searches the histograms are computed over
+WINDOW_SIZE = 1000
+# Upper bounds (in ms) of the histogram buckets
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+# Stages of a knowledge search, in the order they run
+STAGES = ["embed", "vector", "fts", "fusion", "rerank", "total"]
+# Set RETRIEVAL_TRACES_PATH to also append every trace to a JSON lines file
+TRACES_PATH = os.getenv("RETRIEVAL_TRACES_PATH")
+
+
+@dataclass
+class SearchTrace:
+    """Timings and counts of one knowledge search."""
+
+    query: str
+    search_type: str
+    started_at: float = field(default_factory=time.time)
+    # Milliseconds spent in each stage
+    spans: Dict[str, float] = field(default_factory=dict)
+    # Rows returned by each stage, and the documents handed to the agent
+    counts: Dict[str, int] = field(default_factory=dict)
+    # Tokens the retrieved documents add to the prompt
+    injected_tokens: int = 0
+
+
+_current_trace: contextvars.ContextVar[Optional[SearchTrace]] = contextvars.ContextVar("search_trace", default=None)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a stage of the current knowledge search (no-op outside of a search)."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.spans[stage] = trace.spans.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+
+
+def count(stage: str, rows: int) -> None:
+    """Record the number of rows a stage of the current knowledge search returned."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.counts[stage] = rows
+
+
+class RollingHistogram:
+    """Latency distribution over the last `window` values."""
+
+    def __init__(self, window: int = WINDOW_SIZE):
+        self.values: Deque[float] = deque(maxlen=window)
+
+    def add(self, value: float) -> None:
+        self.values.append(value)
+
+    def percentiles(self) -> Dict[str, float]:
+        if not self.values:
+            return {}
+        values = sorted(list(self.values))
+        pick = lambda q: values[min(len(values) - 1, int(len(values) * q))]  # noqa: E731
+        return {"count": len(values), "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": values[-1]}
+
+    def buckets(self) -> Dict[str, int]:
+        """Number of values per bucket, labelled with the bucket's upper bound."""
+        counts = {f"≤{bound}ms": 0 for bound in BUCKETS_MS}
+        counts[f">{BUCKETS_MS[-1]}ms"] = 0
+        labels = list(counts)
+        for value in list(self.values):
+            index = next((i for i, bound in enumerate(BUCKETS_MS) if value <= bound), len(BUCKETS_MS))
+            counts[labels[index]] += 1
+        return counts
+
+
+class RetrievalMetrics:
+    """Rolling window of knowledge search traces, aggregated per stage."""
+
+    def __init__(self, window: int = WINDOW_SIZE, export_path: Optional[str] = TRACES_PATH):
+        self._lock = threading.Lock()
+        self.export_path = Path(export_path) if export_path else None
+        self.traces: Deque[SearchTrace] = deque(maxlen=window)
+        self.histograms: Dict[str, RollingHistogram] = {stage: RollingHistogram(window) for stage in STAGES}
+        self.tokens = RollingHistogram(window)
+
+    @contextmanager
+    def trace(self, query: str, search_type: str) -> Iterator[SearchTrace]:
+        """Trace a knowledge search, `span` and `count` calls inside it are recorded on it."""
+        trace = SearchTrace(query=query, search_type=search_type)
+        token = _current_trace.set(trace)
+        start = time.perf_counter()
+        try:
+            yield trace
+        finally:
+            trace.spans["total"] = (time.perf_counter() - start) * 1000
+            _current_trace.reset(token)
+            self.record(trace)
+
+    def record(self, trace: SearchTrace) -> None:
+        with self._lock:
+            self.traces.append(trace)
+            for stage, milliseconds in trace.spans.items():
+                self.histograms.setdefault(stage, RollingHistogram(self.traces.maxlen)).add(milliseconds)
+            self.tokens.add(trace.injected_tokens)
+            if self.export_path is not None:
+                self.export_path.parent.mkdir(parents=True, exist_ok=True)
+                with self.export_path.open("a") as f:
+                    f.write(json.dumps(asdict(trace)) + "\n")
+
+    def summary(self) -> List[Dict[str, float]]:
+        """Latency percentiles of every stage that ran at least once."""
+        with self._lock:
+            return [
+                {"stage": stage, **{key: round(value, 2) for key, value in histogram.percentiles().items()}}
+                for stage, histogram in self.histograms.items()
+                if histogram.values
+            ]
+
+    def to_jsonl(self) -> str:
+        with self._lock:
+            return "".join(json.dumps(asdict(trace)) + "\n" for trace in self.traces)
+
+
+retrieval_metrics = RetrievalMetrics()
+
+
+def render_retrieval_diagnostics() -> None:
+    """Optional sidebar panel with the latency, result and token stats of knowledge searches."""
+    if not st.sidebar.toggle("Retrieval diagnostics", key="retrieval_diagnostics"):
+        return
+
+    with st.sidebar:
+        traces = list(retrieval_metrics.traces)
+        if not traces:
+            st.caption("No knowledge search yet.")
+            return
+
+        last = traces[-1]
+        st.caption(
+            f"Last search ({last.search_type}): {last.spans.get('total', 0):.0f} ms, "
+            f"{last.counts.get('documents', 0)} documents, {last.injected_tokens} tokens"
+        )
+        st.dataframe(retrieval_metrics.summary(), hide_index=True, use_container_width=True)
+        buckets = retrieval_metrics.histograms["total"].buckets()
+        data = [{"latency": label, "searches": searches} for label, searches in buckets.items()]
+        chart = alt.Chart(alt.Data(values=data)).mark_bar().encode(
+            x=alt.X("latency:N", sort=None, title="Search latency"), y=alt.Y("searches:Q", title=None)
+        )
+        st.altair_chart(chart.properties(height=160), use_container_width=True)
+        tokens = retrieval_metrics.tokens.percentiles()
+        st.caption(f"Injected tokens per search: p50 {tokens['p50']:.0f}, p95 {tokens['p95']:.0f}")
+        st.download_button(
+            "Export traces (JSONL)",
+            data=retrieval_metrics.to_jsonl(),
+            file_name="retrieval_traces.jsonl",
+            mime="application/jsonl",
+            use_container_width=True,
+        )
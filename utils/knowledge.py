@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import streamlit as st
+from agno.utils.log import log_info, logger
+from agno.vectordb.lancedb import SearchType
+
+from utils.ingestion import IncrementalUrlKnowledge
+from utils.registry import get_vector_db, registry
+from utils.run_executor import RunHandle
+from utils.reranker import LocalReranker
+
+# from agno.reranker.cohere import CohereReranker
+
+KNOWLEDGE_URLS = ["https://docs.agno.com/introduction.md"]
+LANCEDB_URI = "tmp/lancedb"
+# Set KNOWLEDGE_EMBEDDER=hashing to use the offline HashingEmbedder (e.g. in CI)
+EMBEDDER_ID = os.getenv("KNOWLEDGE_EMBEDDER", "text-embedding-3-small")
+# Vectors of different embedders can't be mixed, so each one gets its own table
+TABLE_NAME = "agno_docs" if EMBEDDER_ID == "text-embedding-3-small" else f"agno_docs_{EMBEDDER_ID}"
+MANIFEST_PATH = Path(f"tmp/ingest_manifest_{TABLE_NAME}.json")
+# Search results the reranker picks the best documents from
+RERANK_CANDIDATES = 20
+
+# Readiness signal written once the knowledge base is loaded
+READY_PATH = Path("tmp/warmup/ready.json")
+# Time to first token of the first answer asked for after a warm-up, for cold-start reporting
+FIRST_TOKEN_PATH = Path("tmp/warmup/first_token.json")
+
+
+def get_knowledge_base() -> IncrementalUrlKnowledge:
+    """Return the Agno docs knowledge base shared by Level 2 and Level 3 (without loading it)."""
+    return registry.acquire(
+        ("knowledge", tuple(KNOWLEDGE_URLS), LANCEDB_URI, TABLE_NAME),
+        lambda: IncrementalUrlKnowledge(
+            urls=KNOWLEDGE_URLS,
+            manifest_path=MANIFEST_PATH,
+            vector_db=get_vector_db(
+                uri=LANCEDB_URI,
+                table_name=TABLE_NAME,
+                search_type=SearchType.hybrid,
+                embedder_id=EMBEDDER_ID,
+                # Local cosine + BM25 fusion, instead of a remote call on every search
+                # reranker=CohereReranker(model="rerank-multilingual-v3.0"),
+                reranker=LocalReranker(candidate_pool=RERANK_CANDIDATES),
+            ),
+        ),
+    )
+
+
+def knowledge_fingerprint() -> str:
+    """Identify the knowledge config, so a readiness signal from another config is ignored."""
+    config = {"urls": KNOWLEDGE_URLS, "uri": LANCEDB_URI, "table": TABLE_NAME, "embedder": EMBEDDER_ID}
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(data, indent=2))
+    os.replace(tmp_path, path)
+
+
+def read_readiness() -> Optional[Dict[str, Any]]:
+    """Return the readiness signal if the knowledge base was loaded with the current config."""
+    try:
+        readiness = json.loads(READY_PATH.read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+    if readiness.get("fingerprint") != knowledge_fingerprint():
+        return None
+    return readiness
+
+
+def knowledge_is_ready() -> bool:
+    return read_readiness() is not None
+
+
+def warm_up(started_at: Optional[float] = None) -> Dict[str, Any]:
+    """Load the knowledge base (download, chunk, embed, write to LanceDB) and signal readiness.
+
+    Args:
+        started_at: When the deploy/process started, defaults to now
+    Returns:
+        The readiness signal, including how long each stage took
+    """
+    started_at = started_at or time.time()
+    build_start = time.perf_counter()
+    knowledge_base = get_knowledge_base()
+    build_seconds = time.perf_counter() - build_start
+
+    load_start = time.perf_counter()
+    # Only re-embeds the documents and chunks that changed since the last warm-up
+    ingestion = knowledge_base.load(recreate=False)
+    load_seconds = time.perf_counter() - load_start
+
+    readiness = {
+        "fingerprint": knowledge_fingerprint(),
+        "started_at": started_at,
+        "ready_at": time.time(),
+        "build_seconds": round(build_seconds, 3),
+        "load_seconds": round(load_seconds, 3),
+        "rows": knowledge_base.vector_db.get_count(),
+        "ingestion": ingestion,
+    }
+    _write_json(READY_PATH, readiness)
+    log_info(f"Knowledge base ready in {build_seconds + load_seconds:.2f}s ({readiness['rows']} rows)")
+    return readiness
+
+
+_warmup_thread: Optional[threading.Thread] = None
+_warmup_lock = threading.Lock()
+
+
+def start_background_warmup() -> None:
+    """Warm the knowledge base up in a background thread, once per process.
+
+    Used when the server was started without the warm-up step (e.g. `streamlit run`
+    locally), so the pages keep rendering while the index is being built.
+    """
+    global _warmup_thread
+
+    def _run():
+        try:
+            warm_up()
+        except Exception as e:
+            logger.error(f"Knowledge base warm-up failed: {e}")
+
+    with _warmup_lock:
+        if _warmup_thread is None or not _warmup_thread.is_alive():
+            _warmup_thread = threading.Thread(target=_run, name="knowledge-warmup", daemon=True)
+            _warmup_thread.start()
+
+
+def record_first_token(run: RunHandle) -> None:
+    """Record the time to first token of the first answer asked for after the last warm-up.
+
+    Timed from the prompt's submission to the run's first chunk, so neither the warm-up
+    nor the time the app sat idle before the first question is counted. The warm-up
+    duration is recorded next to it.
+
+    Args:
+        run: The run streaming the answer, about to put its first chunk
+    """
+    readiness = read_readiness()
+    if readiness is None:
+        return
+    now = time.time()
+    # RunHandle times are monotonic, as of the wall clock
+    submitted_at = now - (time.monotonic() - run.submitted_at)
+    if submitted_at < readiness["ready_at"]:
+        # Asked for while the index was warming up
+        return
+    try:
+        if json.loads(FIRST_TOKEN_PATH.read_text()).get("started_at") == readiness["started_at"]:
+            return
+    except (FileNotFoundError, ValueError):
+        pass
+    _write_json(
+        FIRST_TOKEN_PATH,
+        {
+            "started_at": readiness["started_at"],
+            "warmup_seconds": round(readiness["ready_at"] - readiness["started_at"], 3),
+            "submitted_at": submitted_at,
+            "first_token_at": now,
+            "seconds_to_first_token": round(now - submitted_at, 3),
+        },
+    )
+
+
+def render_knowledge_status() -> None:
+    """Show a non-blocking "index warming" notice until the knowledge base is ready."""
+    if knowledge_is_ready():
+        return
+    start_background_warmup()
+
+    # Poll the readiness signal without blocking the rest of the page
+    @st.fragment(run_every=2)
+    def knowledge_status():
+        if knowledge_is_ready():
+            st.success("Knowledge index ready.", icon="✅")
+        else:
+            st.info(
+                "The knowledge index is warming up, answers will rely on web search until it's ready.",
+                icon="⏳",
+            )
+
+    knowledge_status()
@@ -0,0 +1,52 @@
+import importlib
+import logging
+import sys
+import threading
+from types import ModuleType
+from typing import Callable, Optional, Set
+
+# agno's logger imports rich, these helpers only use the standard library
+logger = logging.getLogger(__name__)
+
+_started: Set[str] = set()
+_lock = threading.Lock()
+
+
+def loaded(name: str) -> Optional[ModuleType]:
+    """Return a module if something already imported it, without importing it."""
+    module = sys.modules.get(name)
+    # A module being imported by another thread is in sys.modules before it is complete
+    spec = getattr(module, "__spec__", None)
+    if spec is not None and getattr(spec, "_initializing", False):
+        return None
+    return module
+
+
+def import_in_background(*names: str, then: Optional[Callable[[ModuleType], None]] = None) -> None:
+    """Import modules in a background thread, once per process.
+
+    The landing pages need none of agno, lancedb or pyarrow, so app.py doesn't import them
+    before the first paint. They are imported here instead, and are already loaded when a
+    demo page needs them.
+
+    Args:
+        *names: Modules to import, in order
+        then: Called with each module once it is imported
+    """
+    with _lock:
+        names = tuple(name for name in names if name not in _started)
+        _started.update(names)
+    if not names:
+        return
+
+    def _import():
+        for name in names:
+            try:
+                module = importlib.import_module(name)
+                if then is not None:
+                    then(module)
+            except Exception as e:
+                # The page that needs the module imports it again and shows the error
+                logger.warning(f"Background import of {name} failed: {e}")
+
+    threading.Thread(target=_import, name="background-imports", daemon=True).start()
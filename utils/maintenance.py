@@ -0,0 +1,438 @@
+"""Keep tmp/ within its disk budget: expire old sessions, vacuum SQLite, prune LanceDB versions.
+
+The app runs every task in a background thread every MAINTENANCE_INTERVAL seconds, and
+they can be run from the command line (e.g. as a cron job):
+
+Usage:
+    python -m utils.maintenance                 # run every task once and print the report
+    python -m utils.maintenance --vacuum-full   # also fully VACUUM the SQLite files
+    python -m utils.maintenance --report        # print the report of the last run
+
+Settings (environment variables): SESSION_TTL_DAYS, DISK_BUDGET_MB, MAINTENANCE_INTERVAL.
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import lancedb
+from agno.utils.log import log_info, logger
+from sqlalchemy import bindparam, inspect, text
+
+from utils.embedding_cache import EMBEDDING_CACHE_PATH
+from utils.knowledge import LANCEDB_URI
+from utils.registry import get_sqlite_engine, get_sqlite_writer, registry
+from utils.search_cache import SEARCH_CACHE_PATH
+from utils.storage import BUSY_TIMEOUT
+
+TMP_DIR = Path("tmp")
+AGENT_DB_FILE = "tmp/agent.db"
+# Session tables of agent.db, each with its `<table>_runs` table if runs are stored one row each
+SESSION_TABLES = ["agent_sessions"]
+# Sessions not updated for this many days are deleted
+SESSION_TTL_DAYS = float(os.getenv("SESSION_TTL_DAYS", "30"))
+# Total size of tmp/ to stay under, leaves some headroom on a 1GB disk
+DISK_BUDGET_MB = float(os.getenv("DISK_BUDGET_MB", "900"))
+# Seconds between two background runs, and before the first one (after the warm-up)
+MAINTENANCE_INTERVAL = float(os.getenv("MAINTENANCE_INTERVAL", str(6 * 3600)))
+MAINTENANCE_DELAY = 60
+# LanceDB versions older than this are removed, recent ones may still be read by a search
+LANCE_VERSION_RETENTION = timedelta(hours=1)
+# Pages freed per incremental vacuum step, and the pause between steps to let live writes in
+VACUUM_STEP_PAGES = 256
+VACUUM_STEP_PAUSE = 0.05
+# Sessions deleted per write, so live writes aren't held up behind a long delete
+DELETE_BATCH = 500
+# Attempts at getting back under the disk budget before giving up
+BUDGET_ROUNDS = 5
+
+REPORT_PATH = TMP_DIR / "maintenance" / "last_run.json"
+LOCK_PATH = TMP_DIR / "maintenance" / "lock"
+
+
+@dataclass
+class TaskResult:
+    """Outcome of one maintenance task."""
+
+    name: str
+    seconds: float = 0.0
+    bytes_reclaimed: int = 0
+    details: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class MaintenanceReport:
+    """Outcome of a maintenance run, saved to REPORT_PATH."""
+
+    started_at: float
+    budget_bytes: int
+    bytes_before: int = 0
+    bytes_after: int = 0
+    seconds: float = 0.0
+    tasks: List[TaskResult] = field(default_factory=list)
+
+    @property
+    def bytes_reclaimed(self) -> int:
+        return sum(task.bytes_reclaimed for task in self.tasks)
+
+
+def disk_usage(path: Path = TMP_DIR) -> int:
+    """Return the total size in bytes of the files under `path`."""
+    if path.is_file():
+        return path.stat().st_size
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.stat(os.path.join(root, name)).st_size
+            except FileNotFoundError:
+                # Deleted while walking (e.g. a LanceDB version being cleaned up)
+                pass
+    return total
+
+
+def _sqlite_size(db_file: str) -> int:
+    """Size of a SQLite file and its write-ahead log."""
+    paths = [Path(db_file), Path(f"{db_file}-wal")]
+    return sum(path.stat().st_size for path in paths if path.exists())
+
+
+@contextmanager
+def _task(report: MaintenanceReport, name: str, *paths: str) -> Iterator[TaskResult]:
+    """Time a task and measure what it freed in `paths`."""
+    result = TaskResult(name=name)
+    before = sum(disk_usage(Path(path)) for path in paths if Path(path).exists())
+    start = time.perf_counter()
+    try:
+        yield result
+    except Exception as e:
+        logger.warning(f"Maintenance task {name} failed: {e}")
+        result.details["error"] = str(e)
+    finally:
+        result.seconds = round(time.perf_counter() - start, 3)
+        after = sum(disk_usage(Path(path)) for path in paths if Path(path).exists())
+        result.bytes_reclaimed = max(0, before - after)
+        report.tasks.append(result)
+
+
+def _delete_sessions(db_file: str, table_name: str, session_ids: List[str]) -> int:
+    """Delete sessions and their runs through the file's writer, a batch at a time.
+
+    The storages of the table open in this process are told about it: sessions they have
+    a pending write for are kept, and the others' stored runs are forgotten.
+    """
+    engine = get_sqlite_engine(db_file)
+    writer = get_sqlite_writer(db_file)
+    storages = registry.find(("storage", str(Path(db_file).resolve()), table_name))
+    runs_table = f"{table_name}_runs"
+    tables = [table_name] + ([runs_table] if inspect(engine).has_table(runs_table) else [])
+    # Deleted per batch, a batch is written again if the writer retries it
+    deleted: Dict[int, int] = {}
+    for i in range(0, len(session_ids), DELETE_BATCH):
+        statements = [
+            text(f"DELETE FROM {table} WHERE session_id IN :ids").bindparams(bindparam("ids", expanding=True))
+            for table in tables
+        ]
+        batch = session_ids[i : i + DELETE_BATCH]
+
+        def write(connection, statements=statements, batch=batch, i=i) -> None:
+            # On the writer thread, so the writes queued before this one are already in
+            for storage in storages:
+                batch = storage.forget_sessions(batch)
+            for statement in statements:
+                connection.execute(statement, {"ids": batch})
+            deleted[i] = len(batch)
+
+        writer.submit(write).result()
+    return sum(deleted.values())
+
+
+def expire_sessions(db_file: str = AGENT_DB_FILE, ttl_days: float = SESSION_TTL_DAYS) -> Dict[str, int]:
+    """Delete the sessions (and their runs) not updated for `ttl_days` days.
+
+    Returns:
+        The number of sessions deleted per table
+    """
+    engine = get_sqlite_engine(db_file)
+    cutoff = int(time.time() - ttl_days * 86400)
+    deleted = {}
+    for table_name in SESSION_TABLES:
+        if not inspect(engine).has_table(table_name):
+            continue
+        with engine.connect() as connection:
+            session_ids = connection.scalars(
+                text(f"SELECT session_id FROM {table_name} WHERE COALESCE(updated_at, created_at) < :cutoff"),
+                {"cutoff": cutoff},
+            ).all()
+        deleted[table_name] = _delete_sessions(db_file, table_name, list(session_ids))
+    return deleted
+
+
+def evict_oldest_sessions(db_file: str, bytes_to_free: int) -> int:
+    """Delete the least recently updated sessions, about enough of them to free `bytes_to_free`."""
+    engine = get_sqlite_engine(db_file)
+    deleted = 0
+    for table_name in SESSION_TABLES:
+        if not inspect(engine).has_table(table_name):
+            continue
+        with engine.connect() as connection:
+            sessions = connection.scalar(text(f"SELECT COUNT(*) FROM {table_name}"))
+            if not sessions:
+                continue
+            bytes_per_session = max(1, _sqlite_size(db_file) // sessions)
+            limit = min(sessions, -(-bytes_to_free // bytes_per_session))
+            session_ids = connection.scalars(
+                text(
+                    f"SELECT session_id FROM {table_name} "
+                    "ORDER BY COALESCE(updated_at, created_at) LIMIT :limit"
+                ),
+                {"limit": limit},
+            ).all()
+        deleted += _delete_sessions(db_file, table_name, list(session_ids))
+    return deleted
+
+
+def trim_embedding_cache(bytes_to_free: int, path: Path = EMBEDDING_CACHE_PATH) -> int:
+    """Evict the least recently used cached embeddings, about enough of them to free `bytes_to_free`."""
+    if not path.exists():
+        return 0
+    connection = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT)
+    try:
+        (entries,) = connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if not entries:
+            return 0
+        limit = min(entries, -(-bytes_to_free // max(1, _sqlite_size(str(path)) // entries)))
+        with connection:
+            connection.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (limit,),
+            )
+        return limit
+    finally:
+        connection.close()
+
+
+def expire_search_cache(path: Path = SEARCH_CACHE_PATH) -> int:
+    """Delete the cached search results past their TTL."""
+    if not path.exists():
+        return 0
+    connection = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT)
+    try:
+        with connection:
+            return connection.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),)).rowcount
+    finally:
+        connection.close()
+
+
+def vacuum_sqlite(db_file: str, full: bool = False) -> Dict[str, Any]:
+    """Return the free pages of a SQLite file to the filesystem.
+
+    Files in incremental auto-vacuum mode (every file created by `create_sqlite_engine`)
+    are vacuumed a few pages at a time, so live writes only ever wait for one short step.
+    Older files are only converted with a full VACUUM when `full` is set (`--vacuum-full`):
+    it holds the write lock for the whole rewrite, longer than a live write waits for it,
+    so the app's background maintenance never runs it.
+    The write-ahead log is truncated at the end, since vacuumed pages go through it.
+    """
+    if not Path(db_file).exists():
+        return {}
+    connection = sqlite3.connect(db_file, timeout=BUSY_TIMEOUT, isolation_level=None)
+    try:
+        details: Dict[str, Any] = {}
+        (auto_vacuum,) = connection.execute("PRAGMA auto_vacuum").fetchone()
+        # 2 is INCREMENTAL
+        if full:
+            connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            connection.execute("VACUUM")
+            details["full_vacuum"] = True
+        elif auto_vacuum == 2:
+            steps, free_pages = 0, None
+            while True:
+                previous, (free_pages,) = free_pages, connection.execute("PRAGMA freelist_count").fetchone()
+                if not free_pages or free_pages == previous:
+                    break
+                # execute() would only step the pragma once, freeing a single page
+                connection.executescript(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES});")
+                steps += 1
+                time.sleep(VACUUM_STEP_PAUSE)
+            details["vacuum_steps"] = steps
+        else:
+            details["skipped"] = "not in incremental auto-vacuum mode, run with --vacuum-full once"
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        return details
+    finally:
+        connection.close()
+
+
+def compact_lancedb(uri: str = LANCEDB_URI, retention: timedelta = LANCE_VERSION_RETENTION) -> Dict[str, Any]:
+    """Compact the data files of every LanceDB table and remove its old versions.
+
+    Searches read the latest version, so removing old ones doesn't affect them. The
+    indexes are updated with the compacted rows in the same step.
+    """
+    if not Path(uri).exists():
+        return {}
+    connection = lancedb.connect(uri)
+    details = {}
+    for table_name in connection.table_names():
+        table = connection.open_table(table_name)
+        versions = len(table.list_versions())
+        table.optimize(cleanup_older_than=retention)
+        details[table_name] = {"versions_before": versions, "versions_after": len(table.list_versions())}
+    return details
+
+
+def run_maintenance(vacuum_full: bool = False, budget_mb: float = DISK_BUDGET_MB) -> MaintenanceReport:
+    """Run every maintenance task once and save the report.
+
+    Args:
+        vacuum_full: Fully VACUUM the SQLite files, whatever their size
+        budget_mb: Total size of tmp/ to get under, by evicting cached embeddings and then
+            the least recently updated sessions
+    Returns:
+        What each task freed and how long it took
+    """
+    report = MaintenanceReport(started_at=time.time(), budget_bytes=int(budget_mb * 1024 * 1024))
+    start = time.perf_counter()
+    report.bytes_before = disk_usage()
+    sqlite_files = [AGENT_DB_FILE, str(EMBEDDING_CACHE_PATH), str(SEARCH_CACHE_PATH)]
+
+    with _task(report, "expire_sessions", AGENT_DB_FILE) as task:
+        task.details = expire_sessions()
+    with _task(report, "expire_search_cache", str(SEARCH_CACHE_PATH)) as task:
+        task.details = {"expired": expire_search_cache()}
+    for db_file in sqlite_files:
+        with _task(report, f"vacuum:{Path(db_file).name}", db_file) as task:
+            task.details = vacuum_sqlite(db_file, full=vacuum_full)
+    with _task(report, "compact_lancedb", LANCEDB_URI) as task:
+        task.details = compact_lancedb()
+
+    # Cached embeddings can be recomputed, so they go before the sessions
+    for name, evict, db_file in [
+        ("trim_embedding_cache", trim_embedding_cache, str(EMBEDDING_CACHE_PATH)),
+        ("evict_sessions", lambda over: evict_oldest_sessions(AGENT_DB_FILE, over), AGENT_DB_FILE),
+    ]:
+        for _ in range(BUDGET_ROUNDS):
+            over = disk_usage() - report.budget_bytes
+            if over <= 0:
+                break
+            with _task(report, name, db_file) as task:
+                task.details = {"over_budget_bytes": over, "evicted": evict(over)}
+                task.details.update(vacuum_sqlite(db_file))
+            # Nothing left to evict, or the file can't shrink (see vacuum_sqlite)
+            if not task.bytes_reclaimed:
+                break
+
+    report.bytes_after = disk_usage()
+    report.seconds = round(time.perf_counter() - start, 3)
+    if report.bytes_after > report.budget_bytes:
+        logger.warning(f"tmp/ is still over its disk budget: {report.bytes_after / 1e6:.0f}MB")
+    _save_report(report)
+    log_info(
+        f"Maintenance reclaimed {report.bytes_reclaimed / 1e6:.1f}MB in {report.seconds:.1f}s "
+        f"(tmp/ is {report.bytes_after / 1e6:.0f}MB of {report.budget_bytes / 1e6:.0f}MB)"
+    )
+    return report
+
+
+def _save_report(report: MaintenanceReport) -> None:
+    REPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    data = {**asdict(report), "bytes_reclaimed": report.bytes_reclaimed}
+    tmp_path = REPORT_PATH.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(data, indent=2))
+    os.replace(tmp_path, REPORT_PATH)
+
+
+def read_last_report() -> Optional[Dict[str, Any]]:
+    """Return the report of the last maintenance run, if any."""
+    try:
+        return json.loads(REPORT_PATH.read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+@contextmanager
+def _run_lock() -> Iterator[bool]:
+    """Yield whether this process got the maintenance lock (one run at a time across processes)."""
+    LOCK_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with LOCK_PATH.open("w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+_maintenance_thread: Optional[threading.Thread] = None
+_maintenance_lock = threading.Lock()
+
+
+def start_background_maintenance(interval: float = MAINTENANCE_INTERVAL) -> None:
+    """Run the maintenance tasks every `interval` seconds in a background thread, once per process."""
+    global _maintenance_thread
+
+    def _run():
+        time.sleep(MAINTENANCE_DELAY)
+        while True:
+            try:
+                with _run_lock() as acquired:
+                    if acquired:
+                        run_maintenance()
+            except Exception as e:
+                logger.error(f"Maintenance run failed: {e}")
+            time.sleep(interval)
+
+    with _maintenance_lock:
+        if _maintenance_thread is None or not _maintenance_thread.is_alive():
+            _maintenance_thread = threading.Thread(target=_run, name="tmp-maintenance", daemon=True)
+            _maintenance_thread.start()
+
+
+def print_report(report: Optional[Dict[str, Any]]) -> None:
+    if report is None:
+        print("No maintenance run yet.")
+        return
+    print(f"Last run:  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(report['started_at']))}")
+    print(f"tmp/ size: {report['bytes_before'] / 1e6:.1f}MB -> {report['bytes_after'] / 1e6:.1f}MB", end="")
+    print(f" (budget {report['budget_bytes'] / 1e6:.0f}MB)")
+    print(f"Reclaimed: {report['bytes_reclaimed'] / 1e6:.1f}MB in {report['seconds']:.2f}s")
+    for task in report["tasks"]:
+        print(f"  {task['name']:<28} {task['bytes_reclaimed'] / 1e6:>8.2f}MB {task['seconds']:>7.2f}s  {task['details']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--report", action="store_true", help="Print the report of the last run and exit")
+    parser.add_argument("--vacuum-full", action="store_true", help="Fully VACUUM the SQLite files")
+    parser.add_argument("--budget-mb", type=float, default=DISK_BUDGET_MB, help="Disk budget of tmp/ in MB")
+    args = parser.parse_args()
+
+    if args.report:
+        print_report(read_last_report())
+        return 0
+
+    with _run_lock() as acquired:
+        if not acquired:
+            print("Another maintenance run is in progress.", file=sys.stderr)
+            return 1
+        report = run_maintenance(vacuum_full=args.vacuum_full, budget_mb=args.budget_mb)
+    print_report({**asdict(report), "bytes_reclaimed": report.bytes_reclaimed})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
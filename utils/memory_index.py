@@ -0,0 +1,226 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+from agno.embedder.base import Embedder
+from agno.memory.v2.memory import Memory
+from agno.memory.v2.schema import UserMemory
+
+from utils.storage import SqliteMemoryDb
+from utils.tokens import count_tokens
+
+# Most memories added to the system message of a run
+MEMORY_TOP_K = int(os.getenv("MEMORY_TOP_K", "8"))
+# Hard cap on the tokens the memories may add to the system message
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "300"))
+# Score added to a memory updated just now, halved every RECENCY_HALF_LIFE_DAYS
+RECENCY_WEIGHT = 0.1
+RECENCY_HALF_LIFE_DAYS = 30
+# Rows the arrays start with, doubled when full
+INITIAL_CAPACITY = 64
+
+_current_query: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("memory_query", default=None)
+
+
+class _UserIndex:
+    """Embeddings, timestamps and token counts of one user's memories, in numpy arrays.
+
+    Rows live in the first `size` entries of arrays that double when full. A removed row
+    is replaced by the last one, so updates and deletes don't copy the arrays.
+    """
+
+    def __init__(self, dimensions: int):
+        self.version: Optional[int] = None
+        self.size = 0
+        self.vectors = np.zeros((INITIAL_CAPACITY, dimensions), dtype=np.float32)
+        self.updated_at = np.zeros(INITIAL_CAPACITY, dtype=np.float64)
+        self.tokens = np.zeros(INITIAL_CAPACITY, dtype=np.int32)
+        self.memories: List[UserMemory] = []
+        self.rows: Dict[str, int] = {}
+
+    def clear(self) -> None:
+        self.size = 0
+        self.memories.clear()
+        self.rows.clear()
+
+    def remove(self, memory_id: str) -> None:
+        row = self.rows.pop(memory_id, None)
+        if row is None:
+            return
+        last = self.size - 1
+        if row != last:
+            self.vectors[row] = self.vectors[last]
+            self.updated_at[row] = self.updated_at[last]
+            self.tokens[row] = self.tokens[last]
+            self.memories[row] = self.memories[last]
+            self.rows[self.memories[row].memory_id] = row
+        self.memories.pop()
+        self.size = last
+
+    def add(self, memory: UserMemory, vector: np.ndarray, updated_at: float) -> None:
+        if self.size == len(self.vectors):
+            capacity = 2 * len(self.vectors)
+            self.vectors = np.resize(self.vectors, (capacity, self.vectors.shape[1]))
+            self.updated_at = np.resize(self.updated_at, capacity)
+            self.tokens = np.resize(self.tokens, capacity)
+        row = self.size
+        norm = np.linalg.norm(vector)
+        self.vectors[row] = vector / norm if norm > 0 else vector
+        self.updated_at[row] = updated_at
+        self.tokens[row] = count_tokens(f"\n- {memory.memory}")
+        self.memories.append(memory)
+        self.rows[memory.memory_id] = row
+        self.size += 1
+
+
+class MemoryIndex:
+    """In-memory embedding index of the user memories of a memory DB.
+
+    Memories are embedded once (the embedder's on-disk cache keeps their vectors across
+    restarts) and kept per user in numpy arrays. The index follows the memory DB with
+    `SqliteMemoryDb.read_changes`, so a search only embeds the memories written since the
+    previous one.
+
+    A search scores every memory at once: cosine similarity to the query, plus a recency
+    boost that halves every `recency_half_life_days`. The best `top_k` are then added in
+    score order while they fit in `token_budget`.
+
+    Args:
+        memory_db: The memory DB the memories are read from
+        embedder: Embedder of the memories and queries
+        recency_weight: Score added to a memory updated just now
+        recency_half_life_days: Days after which the recency boost is halved
+    """
+
+    def __init__(
+        self,
+        memory_db: SqliteMemoryDb,
+        embedder: Embedder,
+        recency_weight: float = RECENCY_WEIGHT,
+        recency_half_life_days: float = RECENCY_HALF_LIFE_DAYS,
+    ):
+        self.memory_db = memory_db
+        self.embedder = embedder
+        self.recency_weight = recency_weight
+        self.recency_half_life_days = recency_half_life_days
+        self._users: Dict[str, _UserIndex] = {}
+        self._lock = threading.Lock()
+
+    def search(
+        self, user_id: str, query: str, top_k: int = MEMORY_TOP_K, token_budget: int = MEMORY_TOKEN_BUDGET
+    ) -> List[UserMemory]:
+        """Return the memories of a user most relevant to `query`, best first.
+
+        Args:
+            user_id: The user whose memories are searched
+            query: The text the memories should be relevant to (the user's message)
+            top_k: Most memories returned
+            token_budget: Most tokens the returned memories may add to the prompt
+
+        Returns:
+            List[UserMemory]: Up to `top_k` memories, within `token_budget` tokens
+        """
+        with self._lock:
+            index = self._sync(user_id)
+            size = index.size
+            if size == 0:
+                return []
+            tokens = index.tokens[:size]
+            if size <= top_k and int(tokens.sum()) <= token_budget:
+                # Everything fits, no need to embed the query
+                return list(index.memories)
+
+            query_vector = np.asarray(self.embedder.get_embedding(query), dtype=np.float32)
+            norm = np.linalg.norm(query_vector)
+            scores = index.vectors[:size] @ (query_vector / norm if norm > 0 else query_vector)
+            age_days = (time.time() - index.updated_at[:size]) / 86400
+            scores += self.recency_weight * np.exp2(-np.maximum(age_days, 0) / self.recency_half_life_days)
+
+            # Only the best candidates are sorted, however many memories the user has
+            candidates = min(size, max(4 * top_k, top_k + 16))
+            best = np.argpartition(-scores, candidates - 1)[:candidates]
+            best = best[np.argsort(-scores[best])]
+
+            selected, used = [], 0
+            for row in best:
+                if used + tokens[row] > token_budget:
+                    continue
+                selected.append(index.memories[row])
+                used += int(tokens[row])
+                if len(selected) == top_k:
+                    break
+            return selected
+
+    def _sync(self, user_id: str) -> _UserIndex:
+        """Apply the memories written since the previous search, called with the lock held."""
+        index = self._users.get(user_id)
+        if index is None:
+            index = self._users[user_id] = _UserIndex(self.embedder.dimensions or 1536)
+        if index.version is not None and index.version == self.memory_db.user_version(user_id):
+            return index
+
+        changes = self.memory_db.read_changes(user_id, since=index.version)
+        if changes.full:
+            index.clear()
+        for memory_id in changes.deleted:
+            index.remove(memory_id)
+        memories = [UserMemory.from_dict({**row.memory, "memory_id": row.id}) for row in changes.memories]
+        vectors = self._embed([memory.memory for memory in memories])
+        for row, memory, vector in zip(changes.memories, memories, vectors):
+            index.remove(row.id)
+            updated_at = row.last_updated or memory.last_updated
+            index.add(memory, vector, updated_at.timestamp() if updated_at else time.time())
+        index.version = changes.version
+        return index
+
+    def _embed(self, texts: List[str]) -> List[np.ndarray]:
+        if not texts:
+            return []
+        get_embeddings = getattr(self.embedder, "get_embeddings", None)
+        vectors = get_embeddings(texts) if get_embeddings else [self.embedder.get_embedding(t) for t in texts]
+        return [np.asarray(vector, dtype=np.float32) for vector in vectors]
+
+
+@contextmanager
+def memory_query(query: str) -> Iterator[None]:
+    """Rank the memories added to the system message by their relevance to `query`."""
+    token = _current_query.set(query)
+    try:
+        yield
+    finally:
+        _current_query.reset(token)
+
+
+class RankedMemory(Memory):
+    """Memory whose system message only gets the memories relevant to the current query.
+
+    Agno adds every memory of the user to the system message, so a long-lived user's
+    memories inflate every request. Inside `memory_query(prompt)`, `get_user_memories`
+    returns the `top_k` memories of the `MemoryIndex` most relevant to the prompt,
+    within `token_budget` tokens. Everywhere else it returns all of them, as usual.
+
+    Args:
+        index: The memory index of the memory DB
+        top_k: Most memories added to the system message
+        token_budget: Most tokens the memories may add to the system message
+        **kwargs: Passed to Memory
+    """
+
+    def __init__(
+        self, index: MemoryIndex, top_k: int = MEMORY_TOP_K, token_budget: int = MEMORY_TOKEN_BUDGET, **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.index = index
+        self.top_k = top_k
+        self.token_budget = token_budget
+
+    def get_user_memories(self, user_id: Optional[str] = None, refresh_from_db: bool = True) -> List[UserMemory]:
+        query = _current_query.get()
+        if query is None or self.db is None:
+            return super().get_user_memories(user_id=user_id, refresh_from_db=refresh_from_db)
+        return self.index.search(user_id or "default", query, top_k=self.top_k, token_budget=self.token_budget)
+
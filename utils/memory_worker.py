@@ -0,0 +1,227 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set
+
+import streamlit as st
+from agno.memory.v2.memory import Memory
+from agno.memory.v2.schema import UserMemory
+from agno.models.message import Message
+from agno.utils.log import log_debug, logger
+
+from utils.instrumentation import RollingHistogram
+
+# Threads extracting memories, each with its own Memory (and memory manager model)
+MEMORY_WORKERS = int(os.getenv("MEMORY_WORKERS", "2"))
+# Users with queued messages before submits start waiting for room
+MAX_QUEUE_DEPTH = int(os.getenv("MEMORY_QUEUE_DEPTH", "100"))
+# Seconds a submit waits for room in a full queue before the messages are dropped
+SUBMIT_TIMEOUT = 0.5
+# Word overlap (Jaccard) above which a new memory is merged into an existing one
+DUPLICATE_THRESHOLD = 0.8
+
+
+@dataclass
+class _Job:
+    user_id: str
+    messages: List[Message]
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+def _words(text: str) -> Set[str]:
+    return set(re.findall(r"\w+", text.lower()))
+
+
+def similarity(a: str, b: str) -> float:
+    """Word overlap (Jaccard) of two memories, 1.0 for the same words."""
+    words_a, words_b = _words(a), _words(b)
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+class MemoryExtractor:
+    """Extracts user memories in the background, after the response has been streamed.
+
+    With `enable_agentic_memory=True` the agent creates and updates memories with extra
+    model and tool round-trips inside the run the user is waiting on. Instead, the page
+    submits the user's messages once the response is done, and worker threads run
+    Agno's memory manager on them, off the critical path.
+
+    - Messages of a user already in the queue are merged into its pending job, so a
+      user has at most one extraction queued and never two running at the same time.
+    - New memories that repeat an existing one (word overlap above
+      `duplicate_threshold`) are merged into it: topics are combined, the copy deleted.
+    - Back-pressure: when `max_depth` users are queued, a submit waits up to
+      `submit_timeout` for room, then drops the messages (counted in `stats`).
+
+    Args:
+        memory_factory: Builds the Memory (model and memory DB) of a worker thread
+        workers: Number of worker threads
+        max_depth: Maximum number of queued users
+        submit_timeout: Seconds a submit waits for room in a full queue
+        duplicate_threshold: Similarity above which new memories are merged
+    """
+
+    def __init__(
+        self,
+        memory_factory: Callable[[], Memory],
+        workers: int = MEMORY_WORKERS,
+        max_depth: int = MAX_QUEUE_DEPTH,
+        submit_timeout: float = SUBMIT_TIMEOUT,
+        duplicate_threshold: float = DUPLICATE_THRESHOLD,
+    ):
+        self.memory_factory = memory_factory
+        self.max_depth = max_depth
+        self.submit_timeout = submit_timeout
+        self.duplicate_threshold = duplicate_threshold
+        # user_id -> pending job, oldest first
+        self._queue: "OrderedDict[str, _Job]" = OrderedDict()
+        self._running: Set[str] = set()
+        self._condition = threading.Condition()
+        self._closed = False
+        self.queue_wait = RollingHistogram()
+        self.extraction = RollingHistogram()
+        self.stats = {"submitted": 0, "coalesced": 0, "extracted": 0, "merged": 0, "dropped": 0, "failed": 0}
+        self._threads = [
+            threading.Thread(target=self._work, name=f"memory-worker-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, user_id: str, messages: List[Message]) -> bool:
+        """Queue messages for memory extraction, returns False if they were dropped."""
+        deadline = time.monotonic() + self.submit_timeout
+        with self._condition:
+            self.stats["submitted"] += 1
+            pending = self._queue.get(user_id)
+            if pending is not None:
+                pending.messages.extend(messages)
+                self.stats["coalesced"] += 1
+                return True
+            while len(self._queue) >= self.max_depth and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats["dropped"] += 1
+                    logger.warning(f"Memory queue full ({len(self._queue)} users), dropping messages of {user_id}")
+                    return False
+                self._condition.wait(remaining)
+            if self._closed:
+                return False
+            self._queue[user_id] = _Job(user_id=user_id, messages=list(messages))
+            self._condition.notify_all()
+            return True
+
+    def _next_job(self) -> Optional[_Job]:
+        with self._condition:
+            while True:
+                # The oldest job of a user whose previous extraction is done
+                user_id = next((user_id for user_id in self._queue if user_id not in self._running), None)
+                if user_id is not None:
+                    self._running.add(user_id)
+                    job = self._queue.pop(user_id)
+                    self._condition.notify_all()
+                    return job
+                if self._closed:
+                    return None
+                self._condition.wait()
+
+    def _work(self) -> None:
+        memory = self.memory_factory()
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            start = time.perf_counter()
+            self.queue_wait.add((start - job.enqueued_at) * 1000)
+            try:
+                memory.refresh_from_db(user_id=job.user_id)
+                before = set((memory.memories or {}).get(job.user_id, {}))
+                memory.create_user_memories(messages=job.messages, user_id=job.user_id, refresh_from_db=False)
+                merged = self._merge_duplicates(memory, job.user_id, before)
+                outcome = {"extracted": 1, "merged": merged}
+            except Exception as e:
+                outcome = {"failed": 1}
+                logger.warning(f"Memory extraction failed for {job.user_id}: {e}")
+            finally:
+                self.extraction.add((time.perf_counter() - start) * 1000)
+                with self._condition:
+                    for key, value in outcome.items():
+                        self.stats[key] += value
+                    self._running.discard(job.user_id)
+                    self._condition.notify_all()
+
+    def _merge_duplicates(self, memory: Memory, user_id: str, before: Set[str]) -> int:
+        """Merge the memories created by an extraction into the existing ones they repeat.
+
+        Returns:
+            int: The number of new memories merged
+        """
+        merged = 0
+        memories: Dict[str, UserMemory] = dict((memory.memories or {}).get(user_id, {}))
+        existing = {memory_id: mem for memory_id, mem in memories.items() if memory_id in before}
+        for memory_id, new in memories.items():
+            if memory_id in before:
+                continue
+            duplicate_id, score = max(
+                ((other_id, similarity(new.memory, other.memory)) for other_id, other in existing.items()),
+                key=lambda item: item[1],
+                default=(None, 0.0),
+            )
+            if score < self.duplicate_threshold:
+                existing[memory_id] = new
+                continue
+            duplicate = existing[duplicate_id]
+            topics = list(dict.fromkeys((duplicate.topics or []) + (new.topics or [])))
+            if topics != (duplicate.topics or []):
+                duplicate.topics = topics
+                memory.replace_user_memory(memory_id=duplicate_id, memory=duplicate, user_id=user_id)
+            memory.delete_user_memory(user_id=user_id, memory_id=memory_id)
+            merged += 1
+            log_debug(f"Merged memory {memory_id} into {duplicate_id}")
+        return merged
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return the queue depth, the counters and the queue wait and extraction latencies."""
+        with self._condition:
+            snapshot = {"queue_depth": len(self._queue), "running": len(self._running), **self.stats}
+        for name, histogram in (("wait", self.queue_wait), ("extraction", self.extraction)):
+            for key, value in histogram.percentiles().items():
+                if key != "count":
+                    snapshot[f"{name}_{key}_ms"] = round(value, 1)
+        return snapshot
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Stop taking messages, finish the queued extractions for up to `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while (self._queue or self._running) and time.monotonic() < deadline:
+                self._condition.wait(deadline - time.monotonic())
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+
+def render_memory_diagnostics(extractor: MemoryExtractor) -> None:
+    """Optional sidebar panel with the queue depth and latencies of background memory extraction."""
+    if not st.sidebar.toggle("Memory extraction", key="memory_diagnostics"):
+        return
+
+    with st.sidebar:
+        snapshot = extractor.snapshot()
+        st.caption(
+            f"Queue: {snapshot['queue_depth']} users waiting, {snapshot['running']} extracting. "
+            f"{snapshot['extracted']} done, {snapshot['merged']} duplicates merged, "
+            f"{snapshot['dropped']} dropped, {snapshot['failed']} failed."
+        )
+        rows = [
+            {"stage": stage, **{key: round(value, 1) for key, value in histogram.percentiles().items()}}
+            for stage, histogram in (("queue wait", extractor.queue_wait), ("extraction", extractor.extraction))
+            if histogram.values
+        ]
+        if rows:
+            st.dataframe(rows, hide_index=True, use_container_width=True)
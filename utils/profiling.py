@@ -0,0 +1,250 @@
+"""Cold start profiling: module import times and the first render of every page.
+
+With PROFILE_STARTUP=1, the running app times every module imported after app.py starts
+(self and cumulative time, like `python -X importtime`) and the first render of every
+page in the process, the first one including the imports. The report is saved to
+tmp/profile/startup.json after each first render.
+
+From the command line, the imports of app.py and of every page are timed in a fresh
+interpreter with `-X importtime` (Streamlit is imported first, the server has it loaded):
+
+Usage:
+    python -m utils.profiling              # import time of app.py and of every page
+    python -m utils.profiling --report     # print the report saved by the running app
+
+Budgets (environment variables, in ms): IMPORT_BUDGET_MS for app.py plus a page's
+imports, FIRST_RENDER_BUDGET_MS for the first render of a page. The command exits with
+status 1 when a page is over its budget.
+"""
+
+import argparse
+import ast
+import builtins
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PROFILE_STARTUP = os.getenv("PROFILE_STARTUP", "").lower() in ("1", "true", "yes")
+REPORT_PATH = Path("tmp/profile/startup.json")
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "4000"))
+FIRST_RENDER_BUDGET_MS = float(os.getenv("FIRST_RENDER_BUDGET_MS", "8000"))
+# Slowest modules kept in the report
+REPORT_MODULES = 40
+PAGES = [
+    "views/intro.py",
+    "views/agno1.py",
+    "views/agno1b.py",
+    "views/agno2.py",
+    "views/agno3.py",
+    "views/agno4.py",
+    "views/agno5.py",
+]
+
+# agno's logger imports rich, this module only uses the standard library
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ImportRecord:
+    """One module imported for the first time, times in microseconds as in `-X importtime`."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+    thread: str
+
+
+class ImportProfiler:
+    """Times the first import of every module, through `builtins.__import__`.
+
+    Imports nested in a module's own import are subtracted from its self time, per
+    thread, so background imports don't skew the pages' numbers.
+    """
+
+    def __init__(self):
+        self.records: List[ImportRecord] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._original = None
+
+    def install(self) -> None:
+        if self._original is None:
+            self._original = builtins.__import__
+            builtins.__import__ = self._import
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        module_name = self._resolve(name, globals, level)
+        if module_name in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        # Time spent in nested first imports, subtracted from this module's self time
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += cumulative
+            record = ImportRecord(
+                module=module_name,
+                self_us=int((cumulative - nested) * 1e6),
+                cumulative_us=int(cumulative * 1e6),
+                depth=len(stack),
+                thread=threading.current_thread().name,
+            )
+            with self._lock:
+                self.records.append(record)
+
+    @staticmethod
+    def _resolve(name: str, globals: Optional[Dict[str, Any]], level: int) -> str:
+        if level == 0 or not globals:
+            return name
+        package = (globals.get("__package__") or "").rsplit(".", level - 1)[0]
+        return f"{package}.{name}" if name else package
+
+    def slowest(self, limit: int = REPORT_MODULES) -> List[Dict[str, Any]]:
+        with self._lock:
+            records = sorted(self.records, key=lambda record: record.cumulative_us, reverse=True)
+        return [asdict(record) for record in records[:limit]]
+
+
+_profiler = ImportProfiler()
+_first_renders: Dict[str, float] = {}
+_process_started = time.time()
+_lock = threading.Lock()
+
+
+def profile_imports() -> None:
+    """Time the modules imported from now on, if PROFILE_STARTUP is set."""
+    if PROFILE_STARTUP:
+        _profiler.install()
+
+
+def record_first_render(page: str, seconds: float) -> None:
+    """Record the first render time of a page in this process, warn when it's over budget."""
+    with _lock:
+        if page in _first_renders:
+            return
+        _first_renders[page] = round(seconds * 1000, 1)
+        cold_start = len(_first_renders) == 1
+        renders = dict(_first_renders)
+    if seconds * 1000 > FIRST_RENDER_BUDGET_MS:
+        logger.warning(
+            f"First render of {page} took {seconds * 1000:.0f}ms"
+            f"{' (cold start)' if cold_start else ''}, the budget is {FIRST_RENDER_BUDGET_MS:.0f}ms"
+        )
+    if not PROFILE_STARTUP:
+        return
+    report = {
+        "process_started_at": _process_started,
+        "first_render_ms": renders,
+        "cold_start_page": next(iter(renders)),
+        "slowest_imports": _profiler.slowest(),
+    }
+    try:
+        REPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
+        REPORT_PATH.write_text(json.dumps(report, indent=2))
+    except OSError as e:
+        logger.warning(f"Could not save the startup profile: {e}")
+
+
+def top_level_imports(path: str) -> List[str]:
+    """The import statements run when a page or app.py starts (not those inside functions)."""
+    tree = ast.parse(Path(path).read_text())
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure_imports(page: str) -> Dict[str, Any]:
+    """Import app.py's then the page's modules in a fresh interpreter with `-X importtime`."""
+    code = "\n".join(
+        ["import streamlit", "import sys", "sys.stderr.write('@app\\n')"]
+        + top_level_imports("app.py")
+        + ["sys.stderr.write('@page\\n')"]
+        + top_level_imports(page)
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, cwd=Path.cwd()
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    section, totals, modules = None, {"app": 0, "page": 0}, []
+    for line in result.stderr.splitlines():
+        if line in ("@app", "@page"):
+            section = line[1:]
+            continue
+        match = _IMPORTTIME_LINE.match(line)
+        if match is None or section is None:
+            continue
+        cumulative, indent, module = int(match.group(2)), len(match.group(3)), match.group(4)
+        # Top-level modules only, their cumulative time includes the nested ones
+        if indent == 1:
+            totals[section] += cumulative
+            modules.append((cumulative, module))
+    return {
+        "page": page,
+        "app_ms": totals["app"] / 1000,
+        "page_ms": totals["page"] / 1000,
+        "slowest": [module for _, module in sorted(modules, reverse=True)[:3]],
+    }
+
+
+def print_report(report: Optional[Dict[str, Any]]) -> None:
+    if report is None:
+        print("No startup profile yet, run the app with PROFILE_STARTUP=1 and open a page.")
+        return
+    print(f"Cold start page: {report['cold_start_page']}")
+    for page, milliseconds in report["first_render_ms"].items():
+        over = "  over budget" if milliseconds > FIRST_RENDER_BUDGET_MS else ""
+        print(f"  first render {page:<40} {milliseconds:>8.0f}ms{over}")
+    print("Slowest imports (cumulative):")
+    for record in report["slowest_imports"][:20]:
+        print(f"  {record['cumulative_us'] / 1000:>8.1f}ms {'  ' * record['depth']}{record['module']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--report", action="store_true", help="Print the report saved by the running app")
+    parser.add_argument("pages", nargs="*", default=PAGES, help="Pages to time (default: every page)")
+    args = parser.parse_args()
+
+    if args.report:
+        try:
+            print_report(json.loads(REPORT_PATH.read_text()))
+        except FileNotFoundError:
+            print_report(None)
+        return 0
+
+    over_budget = False
+    print(f"{'page':<18} {'app.py':>8} {'page':>8} {'total':>8}  slowest imports")
+    for page in args.pages:
+        result = measure_imports(page)
+        total = result["app_ms"] + result["page_ms"]
+        over = total > IMPORT_BUDGET_MS
+        over_budget |= over
+        print(
+            f"{Path(page).name:<18} {result['app_ms']:>6.0f}ms {result['page_ms']:>6.0f}ms {total:>6.0f}ms  "
+            f"{', '.join(result['slowest'])}{'  (over budget)' if over else ''}"
+        )
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
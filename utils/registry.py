@@ -0,0 +1,295 @@
+import atexit
+import logging
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+# Only the standard library at import time: the sidebar and the landing pages use the registry,
+# agno, openai, sqlalchemy and lancedb are imported by the factories that need them
+if TYPE_CHECKING:
+    from agno.embedder.base import Embedder
+    from agno.vectordb.lancedb import SearchType
+    from openai import DefaultHttpxClient
+    from sqlalchemy.engine import Engine
+
+    from utils.memory_index import MemoryIndex
+    from utils.memory_worker import MemoryExtractor
+    from utils.reranker import LocalReranker
+    from utils.storage import SqliteMemoryDb, SqliteStorage, SqliteWriter
+    from utils.vectordb import IndexedLanceDb
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entry:
+    resource: Any
+    close: Optional[Callable[[Any], None]]
+    refs: int = 0
+    # Resources acquired by the factory, released when this one is closed
+    dependencies: List[Tuple[Hashable, ...]] = field(default_factory=list)
+
+
+class ResourceRegistry:
+    """Process-wide registry handing out one shared instance per resource config.
+
+    Every view asks the registry for its vector DB, embedder, storage and memory DB, so
+    identical configs map to the same object (one table handle, one SQLite engine...).
+    Resources are reference counted: `release` closes a resource once nobody holds it
+    anymore (and releases what its factory acquired), and `shutdown` closes everything
+    (registered to run at interpreter exit).
+
+    The views never call `release`: their resources are meant to live as long as the
+    process, so in the app every resource stays open until `shutdown`. Reference
+    counting only matters to code that acquires a resource for a while, e.g. a script
+    or a benchmark, and to the dependencies released along with a resource.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[Hashable, ...], _Entry] = {}
+        # Re-entrant so factories can acquire the resources they depend on
+        self._lock = threading.RLock()
+        # Resources being created, to record what their factories acquire
+        self._creating: List[Tuple[Hashable, ...]] = []
+        self._pending_dependencies: List[List[Tuple[Hashable, ...]]] = []
+
+    def acquire(
+        self,
+        key: Tuple[Hashable, ...],
+        factory: Callable[[], Any],
+        close: Optional[Callable[[Any], None]] = None,
+    ) -> Any:
+        """Return the resource registered under `key`, creating it with `factory` if needed."""
+        with self._lock:
+            if self._creating:
+                self._pending_dependencies[-1].append(key)
+            entry = self._entries.get(key)
+            if entry is None:
+                logger.debug(f"Creating shared resource: {key}")
+                self._creating.append(key)
+                self._pending_dependencies.append([])
+                try:
+                    resource = factory()
+                finally:
+                    self._creating.pop()
+                    dependencies = self._pending_dependencies.pop()
+                entry = _Entry(resource=resource, close=close, dependencies=dependencies)
+                self._entries[key] = entry
+            entry.refs += 1
+            return entry.resource
+
+    def peek(self, key: Tuple[Hashable, ...]) -> Optional[Any]:
+        """Return the resource registered under `key` if there is one, without taking a reference."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.resource if entry is not None else None
+
+    def find(self, prefix: Tuple[Hashable, ...]) -> List[Any]:
+        """Return the live resources whose key starts with `prefix`, without taking references."""
+        with self._lock:
+            return [entry.resource for key, entry in self._entries.items() if key[: len(prefix)] == prefix]
+
+    def release(self, key: Tuple[Hashable, ...]) -> None:
+        """Drop one reference to `key`, closing the resource when it was the last one."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refs -= 1
+            if entry.refs > 0:
+                return
+            del self._entries[key]
+        self._close(key, entry)
+
+    def shutdown(self) -> None:
+        """Close every resource, most recently created first (dependents before dependencies)."""
+        with self._lock:
+            entries = list(self._entries.items())
+            self._entries.clear()
+        for key, entry in reversed(entries):
+            self._close(key, entry)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the reference count of every live resource."""
+        with self._lock:
+            return {"/".join(map(str, key)): entry.refs for key, entry in self._entries.items()}
+
+    def _close(self, key: Tuple[Hashable, ...], entry: _Entry) -> None:
+        if entry.close is not None:
+            try:
+                entry.close(entry.resource)
+            except Exception as e:
+                logger.warning(f"Failed to close shared resource {key}: {e}")
+        for dependency in entry.dependencies:
+            self.release(dependency)
+
+
+registry = ResourceRegistry()
+atexit.register(registry.shutdown)
+
+
+def get_sqlite_engine(db_file: str) -> "Engine":
+    """Return the shared SQLAlchemy engine for a SQLite file (WAL, bounded pool)."""
+    from utils.storage import create_sqlite_engine
+
+    return registry.acquire(
+        ("sqlite_engine", str(Path(db_file).resolve())),
+        lambda: create_sqlite_engine(db_file),
+        close=lambda engine: engine.dispose(),
+    )
+
+
+def get_sqlite_writer(db_file: str) -> "SqliteWriter":
+    """Return the single writer of a SQLite file, pending writes are flushed on close."""
+    from utils.storage import SqliteWriter
+
+    return registry.acquire(
+        ("sqlite_writer", str(Path(db_file).resolve())),
+        lambda: SqliteWriter(get_sqlite_engine(db_file)),
+        close=lambda writer: writer.close(),
+    )
+
+
+def _create_http_client() -> "DefaultHttpxClient":
+    from openai import DefaultHttpxClient
+
+    class _SharedHttpxClient(DefaultHttpxClient):
+        """HTTP client that stays shared when the model holding it is deep-copied."""
+
+        def __deepcopy__(self, memo: Dict[int, Any]) -> "_SharedHttpxClient":
+            # Agno's memory manager deep-copies its model on every call
+            return self
+
+    return _SharedHttpxClient()
+
+
+def get_http_client() -> "DefaultHttpxClient":
+    """Return the HTTP client shared by every OpenAI model.
+
+    Agno builds a new OpenAI client for every model call, each with its own connection
+    pool, unless it's given an `http_client`: sharing one keeps the connections alive
+    across calls, agents and pages.
+    """
+    return registry.acquire(("http_client",), _create_http_client, close=lambda client: client.close())
+
+
+def get_embedder(embedder_id: str) -> "Embedder":
+    """Return the shared embedder for a model.
+
+    "hashing" is the offline HashingEmbedder, any other id is an OpenAI model behind the
+    on-disk embedding cache.
+    """
+    from utils.embedders import HashingEmbedder
+
+    if embedder_id == HashingEmbedder.id:
+        return registry.acquire(("embedder", embedder_id), HashingEmbedder)
+
+    from agno.embedder.openai import OpenAIEmbedder
+
+    from utils.embedding_cache import CachedEmbedder
+
+    def close(embedder: CachedEmbedder) -> None:
+        embedder.close()
+        if embedder.embedder.openai_client is not None:
+            embedder.embedder.openai_client.close()
+
+    return registry.acquire(
+        ("embedder", embedder_id),
+        lambda: CachedEmbedder(embedder=OpenAIEmbedder(id=embedder_id)),
+        close=close,
+    )
+
+
+def get_vector_db(
+    uri: str,
+    table_name: str,
+    search_type: "SearchType",
+    embedder_id: str,
+    reranker: Optional["LocalReranker"] = None,
+) -> "IndexedLanceDb":
+    """Return the shared LanceDb handle for a table, which maintains its own indexes."""
+    from utils.vectordb import IndexedLanceDb
+
+    return registry.acquire(
+        ("vector_db", uri, table_name, search_type.value, embedder_id, reranker),
+        lambda: IndexedLanceDb(
+            uri=uri,
+            table_name=table_name,
+            search_type=search_type,
+            embedder=get_embedder(embedder_id),
+            reranker=reranker,
+        ),
+    )
+
+
+def get_storage(
+    table_name: str, db_file: str, mode: str = "agent", history_runs: Optional[int] = None
+) -> "SqliteStorage":
+    """Return the shared session storage for a table, on the shared engine of its file.
+
+    With `history_runs`, runs are stored one row each and reads only load the last
+    `history_runs` of them (see `SqliteStorage`).
+    """
+    from utils.storage import SqliteStorage
+
+    return registry.acquire(
+        ("storage", str(Path(db_file).resolve()), table_name, mode, history_runs),
+        lambda: SqliteStorage(
+            table_name=table_name,
+            db_engine=get_sqlite_engine(db_file),
+            writer=get_sqlite_writer(db_file),
+            history_runs=history_runs,
+            mode=mode,
+        ),
+    )
+
+
+def get_memory_db(table_name: str, db_file: str) -> "SqliteMemoryDb":
+    """Return the shared memory DB for a table, on the shared engine of its file."""
+    from utils.storage import SqliteMemoryDb
+
+    return registry.acquire(
+        ("memory_db", str(Path(db_file).resolve()), table_name),
+        lambda: SqliteMemoryDb(
+            table_name=table_name,
+            db_engine=get_sqlite_engine(db_file),
+            writer=get_sqlite_writer(db_file),
+        ),
+    )
+
+
+def get_memory_index(table_name: str, db_file: str, embedder_id: str) -> "MemoryIndex":
+    """Return the embedding index of the memories of a memory DB table."""
+    from utils.memory_index import MemoryIndex
+
+    return registry.acquire(
+        ("memory_index", str(Path(db_file).resolve()), table_name, embedder_id),
+        lambda: MemoryIndex(
+            memory_db=get_memory_db(table_name=table_name, db_file=db_file),
+            embedder=get_embedder(embedder_id),
+        ),
+    )
+
+
+def get_memory_extractor(table_name: str, db_file: str, model_id: str) -> "MemoryExtractor":
+    """Return the background memory extractor writing to a memory DB table.
+
+    Each worker thread gets its own Memory, with a `model_id` memory manager on the shared
+    HTTP client and the shared memory DB. Queued extractions are finished on close.
+    """
+    from agno.memory.v2.memory import Memory
+    from agno.models.openai import OpenAIChat
+
+    from utils.memory_worker import MemoryExtractor
+
+    def create() -> MemoryExtractor:
+        memory_db = get_memory_db(table_name=table_name, db_file=db_file)
+        http_client = get_http_client()
+        return MemoryExtractor(lambda: Memory(model=OpenAIChat(id=model_id, http_client=http_client), db=memory_db))
+
+    return registry.acquire(
+        ("memory_extractor", str(Path(db_file).resolve()), table_name, model_id),
+        create,
+        close=lambda extractor: extractor.close(),
+    )
@@ -0,0 +1,113 @@
+import re
+from collections import Counter
+from typing import List, Optional
+
+import numpy as np
+from agno.document import Document
+from agno.reranker.base import Reranker
+from agno.utils.log import logger
+from pydantic import ConfigDict
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class LocalReranker(Reranker):
+    """Reranker scoring candidates locally, in one NumPy batch (no remote call).
+
+    Each candidate is ranked three ways: cosine similarity between the query and its
+    stored embedding, BM25 over the candidate pool, and its position in the search
+    results. The three rankings are combined with weighted reciprocal-rank fusion.
+    Fits the `reranker=` slot of LanceDb, and `IndexedLanceDb` fetches `candidate_pool`
+    candidates for it instead of just the requested number of documents.
+
+    Args:
+        candidate_pool: Number of search results to rerank
+        top_n: Number of documents to keep, all of them if None
+        rrf_k: Reciprocal-rank fusion constant, higher values flatten the rank weights
+        cosine_weight: Weight of the embedding similarity ranking
+        bm25_weight: Weight of the BM25 ranking
+        search_weight: Weight of the original search ranking
+        k1: BM25 term frequency saturation
+        b: BM25 document length normalization
+    """
+
+    # Frozen so it's hashable and can be part of a registry key
+    model_config = ConfigDict(frozen=True)
+
+    candidate_pool: int = 20
+    top_n: Optional[int] = None
+    rrf_k: int = 60
+    cosine_weight: float = 1.0
+    bm25_weight: float = 1.0
+    search_weight: float = 1.0
+    k1: float = 1.2
+    b: float = 0.75
+
+    def rerank(self, query: str, documents: List[Document]) -> List[Document]:
+        if not documents:
+            return []
+        try:
+            return self._rerank(query, documents)
+        except Exception as e:
+            logger.error(f"Error reranking documents: {e}. Returning original documents")
+            return documents
+
+    def _rerank(self, query: str, documents: List[Document]) -> List[Document]:
+        num_docs = len(documents)
+        fused = self.search_weight / (self.rrf_k + 1 + np.arange(num_docs))
+
+        cosine = self.cosine_scores(query, documents)
+        if cosine is not None:
+            fused += self.cosine_weight / (self.rrf_k + 1 + self._ranks(cosine))
+        bm25 = self.bm25_scores(query, documents)
+        if bm25.any():
+            fused += self.bm25_weight / (self.rrf_k + 1 + self._ranks(bm25))
+
+        order = np.argsort(-fused, kind="stable")
+        if self.top_n:
+            order = order[: self.top_n]
+        reranked = []
+        for index in order:
+            document = documents[index]
+            document.reranking_score = float(fused[index])
+            reranked.append(document)
+        return reranked
+
+    @staticmethod
+    def _ranks(scores: np.ndarray) -> np.ndarray:
+        """0-based rank of every score, highest first."""
+        ranks = np.empty(len(scores), dtype=np.int64)
+        ranks[np.argsort(-scores, kind="stable")] = np.arange(len(scores))
+        return ranks
+
+    def cosine_scores(self, query: str, documents: List[Document]) -> Optional[np.ndarray]:
+        """Cosine similarity with the embeddings the vector db returned (None if missing)."""
+        if any(document.embedding is None for document in documents) or documents[0].embedder is None:
+            return None
+        # Already embedded by the search itself, so this is a cache hit with CachedEmbedder
+        query_vector = np.asarray(documents[0].embedder.get_embedding(query), dtype=np.float32)
+        matrix = np.stack([np.asarray(document.embedding, dtype=np.float32) for document in documents])
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vector)
+        return (matrix @ query_vector) / np.where(norms == 0, 1, norms)
+
+    def bm25_scores(self, query: str, documents: List[Document]) -> np.ndarray:
+        """BM25 of the query terms, with document frequencies taken over the candidates."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return np.zeros(len(documents))
+        counts = np.zeros((len(documents), len(terms)), dtype=np.float32)
+        lengths = np.empty(len(documents), dtype=np.float32)
+        for row, document in enumerate(documents):
+            tokens = tokenize(document.content)
+            lengths[row] = len(tokens)
+            token_counts = Counter(tokens)
+            counts[row] = [token_counts[term] for term in terms]
+
+        document_frequency = (counts > 0).sum(axis=0)
+        idf = np.log(1 + (len(documents) - document_frequency + 0.5) / (document_frequency + 0.5))
+        length_norm = self.k1 * (1 - self.b + self.b * lengths / max(lengths.mean(), 1))
+        return ((counts * (self.k1 + 1)) / (counts + length_norm[:, None]) * idf).sum(axis=1)
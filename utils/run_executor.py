@@ -0,0 +1,390 @@
+import contextvars
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import streamlit as st
+from agno.utils.log import logger
+
+from utils.instrumentation import RollingHistogram
+from utils.registry import registry
+from utils.streaming import StreamRenderer
+from utils.tokens import count_tokens
+
+# Runs executed at the same time, the next ones wait for a free worker
+RUN_WORKERS = int(os.getenv("RUN_WORKERS", "8"))
+# Seconds a run may take once started, it is stopped after
+RUN_TIMEOUT = float(os.getenv("RUN_TIMEOUT", "300"))
+# Tokens a run may stream, it is stopped after
+RUN_MAX_TOKENS = int(os.getenv("RUN_MAX_TOKENS", "8000"))
+# Seconds a finished run is kept for its page to pick it up
+RESULT_TTL = 30 * 60
+# Seconds the page waits for a chunk before redrawing the status line (when a Stop click gets through)
+POLL_INTERVAL = 0.25
+
+# Outcomes of a run, after "queued" and "running"
+OUTCOMES = ("done", "stopped", "timed_out", "token_limit", "failed")
+
+# Put in the chunk queue when a run is over, so the page stops waiting right away
+_END = object()
+# Line added to the answer of a run that didn't finish on its own
+_NOTES = {
+    "stopped": "Stopped.",
+    "timed_out": "Stopped after {timeout:.0f}s.",
+    "token_limit": "Stopped at {max_tokens} tokens.",
+    "failed": "The run failed: {error}",
+}
+
+Job = Callable[["RunHandle"], Iterator[str]]
+
+
+class RunHandle:
+    """A run submitted to the RunExecutor: its state, and the queue of chunks the page drains.
+
+    The job yields the answer chunk by chunk, and can set `status` (a line shown above the
+    answer while it runs) and `metadata` (anything the page needs once it's done).
+    Drained chunks are kept, so a page that comes back to a run draws the answer so far.
+
+    Args:
+        key: The browser session (and page) the run belongs to
+        name: What the run is, for the logs
+        timeout: Seconds the run may take once started
+        max_tokens: Tokens the run may stream
+    """
+
+    def __init__(self, key: str, name: str, timeout: float = RUN_TIMEOUT, max_tokens: int = RUN_MAX_TOKENS):
+        self.key = key
+        self.name = name
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self.state = "queued"
+        self.status = ""
+        self.error: Optional[str] = None
+        self.tokens = 0
+        self.metadata: Dict[str, Any] = {}
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._chunks: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._parts: List[str] = []
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        # Set once the worker is done with the job, which may be after the run was stopped
+        self._released = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self._finished.is_set()
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the run started (0 while queued)."""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def text(self) -> str:
+        """The answer drained so far."""
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def stop(self) -> None:
+        """Stop the run: the page stops waiting right away, the worker at the job's next chunk."""
+        self._finish("stopped")
+
+    @property
+    def note(self) -> Optional[str]:
+        """Why the run didn't finish on its own, None if it did (or is still running)."""
+        note = _NOTES.get(self.state)
+        if note is None:
+            return None
+        return note.format(timeout=self.timeout, max_tokens=self.max_tokens, error=self.error)
+
+    def response(self) -> str:
+        """The answer drained so far to add to the chat, with the note of a run that didn't finish."""
+        if self.note is None:
+            return self.text
+        return f"{self.text}\n\n*{self.note}*" if self.text else f"*{self.note}*"
+
+    def drain(self, timeout: float = POLL_INTERVAL) -> List[str]:
+        """Return the chunks streamed since the last call, waiting up to `timeout` for the first one.
+
+        Returns an empty list once the run is over and every chunk has been drained.
+        """
+        if self.state == "running" and self.elapsed > self.timeout:
+            # The worker is stuck in a model call, the page doesn't wait for it
+            self._finish("timed_out")
+        chunks = []
+        try:
+            item = self._chunks.get(timeout=timeout) if not self.finished else self._chunks.get_nowait()
+            while True:
+                if item is not _END:
+                    chunks.append(item)
+                item = self._chunks.get_nowait()
+        except queue.Empty:
+            pass
+        self._parts.extend(chunks)
+        return chunks
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the worker to be done with the job, returns False on timeout."""
+        return self._released.wait(timeout)
+
+    def _put(self, chunk: str) -> None:
+        # Chunks of a stopped run are dropped, the page has stopped drawing them
+        if not self.finished:
+            self._chunks.put(chunk)
+
+    def _finish(self, state: str, error: Optional[str] = None) -> bool:
+        with self._lock:
+            if self.finished:
+                return False
+            self.state = state
+            self.error = error
+            self.finished_at = time.monotonic()
+            self._finished.set()
+        self._chunks.put(_END)
+        return True
+
+
+class RunExecutor:
+    """Runs agents and teams on a bounded pool of worker threads, off the Streamlit script thread.
+
+    `agent.run(prompt, stream=True)` on the script thread ties the page up for the whole
+    run, can't be stopped, and is lost when the user switches pages (the script is
+    stopped, and the run with it). Instead, the page submits the run here, keyed by its
+    browser session, and drains the chunks the worker puts in the run's queue. The run
+    goes on when the page is left, the page picks it up again from `get(key)` when the
+    user comes back, and `collect`s it once it's done.
+
+    - Stop: `RunHandle.stop`, the worker closes the job at its next chunk.
+    - Limits: a run is stopped after `timeout` seconds or `max_tokens` streamed tokens.
+    - A new run of a session stops the previous one, and starts once its worker let go
+      of the session's agent.
+    - Metrics: `snapshot` has the saturation of the pool, the queue wait and the outcomes.
+
+    Args:
+        workers: Number of worker threads, the runs executed at the same time
+        result_ttl: Seconds a finished run is kept for its page to collect it
+    """
+
+    def __init__(self, workers: int = RUN_WORKERS, result_ttl: float = RESULT_TTL):
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="run-worker")
+        self._runs: Dict[str, RunHandle] = {}
+        # Runs collected while their worker was still in the job, until it lets go of the session's agent
+        self._releasing: Dict[str, RunHandle] = {}
+        self._running = 0
+        self._lock = threading.Lock()
+        self.queue_wait = RollingHistogram()
+        self.duration = RollingHistogram()
+        self.stats = {"submitted": 0, **{outcome: 0 for outcome in OUTCOMES}}
+
+    def submit(
+        self,
+        key: str,
+        job: Job,
+        name: str = "run",
+        timeout: float = RUN_TIMEOUT,
+        max_tokens: int = RUN_MAX_TOKENS,
+    ) -> RunHandle:
+        """Queue a run for a session, stopping the session's previous run if it's still going.
+
+        Pages call `stop_run` first, which keeps the previous run's answer so far in the chat.
+
+        Args:
+            key: The browser session (and page) of the run
+            job: Called with the run's handle on a worker thread, yields the answer's chunks
+            name: What the run is, for the logs
+            timeout: Seconds the run may take once started
+            max_tokens: Tokens the run may stream
+        """
+        run = RunHandle(key, name, timeout=timeout, max_tokens=max_tokens)
+        with self._lock:
+            self._evict(time.monotonic())
+            # A stopped run may have been collected already, its worker can still be in a model call
+            previous = self._runs.get(key) or self._releasing.get(key)
+            self._runs[key] = run
+            self.stats["submitted"] += 1
+        if previous is not None:
+            previous.stop()
+        # Each run in a fresh context, what the job sets there (its trace, the memory query) stays in the run
+        self._pool.submit(contextvars.Context().run, self._work, run, job, previous)
+        return run
+
+    def get(self, key: str) -> Optional[RunHandle]:
+        """Return the run of a session not collected yet, running or finished."""
+        with self._lock:
+            return self._runs.get(key)
+
+    def collect(self, run: RunHandle) -> None:
+        """Forget a finished run once its page has added the answer to the chat.
+
+        Until its worker lets go of it, the next run of the session still waits for it.
+        """
+        with self._lock:
+            if self._runs.get(run.key) is run:
+                del self._runs[run.key]
+                if not run._released.is_set():
+                    self._releasing[run.key] = run
+
+    def _work(self, run: RunHandle, job: Job, previous: Optional[RunHandle]) -> None:
+        if previous is not None:
+            # Both runs use the session's agent, the previous one may still be in a model call
+            previous.wait(previous.timeout)
+        if run.finished:
+            # Stopped while queued
+            with self._lock:
+                self.stats[run.state] += 1
+                self._release(run)
+            return
+
+        run.started_at = time.monotonic()
+        run.state = "running"
+        self.queue_wait.add((run.started_at - run.submitted_at) * 1000)
+        with self._lock:
+            self._running += 1
+        chunks = None
+        try:
+            chunks = job(run)
+            for chunk in chunks:
+                if run.finished:
+                    break
+                run.tokens += count_tokens(chunk)
+                run._put(chunk)
+                if run.tokens >= run.max_tokens:
+                    run._finish("token_limit")
+                elif run.elapsed >= run.timeout:
+                    run._finish("timed_out")
+            run._finish("done")
+        except Exception as e:
+            logger.warning(f"Run {run.name} of {run.key} failed: {e}")
+            run._finish("failed", error=str(e))
+        finally:
+            if chunks is not None and hasattr(chunks, "close"):
+                # Runs the job's cleanup (its trace, the agent's run state) when it was stopped half way
+                chunks.close()
+            self.duration.add((time.monotonic() - run.started_at) * 1000)
+            with self._lock:
+                self._running -= 1
+                self.stats[run.state] += 1
+                self._release(run)
+
+    def _release(self, run: RunHandle) -> None:
+        """Let the next run of the session start, called with the lock held."""
+        run._released.set()
+        if self._releasing.get(run.key) is run:
+            del self._releasing[run.key]
+
+    def _evict(self, now: float) -> None:
+        # Finished runs whose page never came back for them
+        for key, run in list(self._runs.items()):
+            if run.finished and now - run.finished_at > self.result_ttl:
+                del self._runs[key]
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return the pool saturation, the queued runs, the outcome counters and the queue wait latencies."""
+        with self._lock:
+            queued = sum(run.state == "queued" for run in self._runs.values())
+            snapshot = {
+                "workers": self.workers,
+                "running": self._running,
+                "queued": queued,
+                "saturation": self._running / self.workers,
+                **self.stats,
+            }
+        for name, histogram in (("wait", self.queue_wait), ("duration", self.duration)):
+            for key, value in histogram.percentiles().items():
+                if key != "count":
+                    snapshot[f"{name}_{key}_ms"] = round(value, 1)
+        return snapshot
+
+    def close(self) -> None:
+        """Stop every run, the workers finish at their job's next chunk."""
+        with self._lock:
+            runs = list(self._runs.values())
+        for run in runs:
+            run.stop()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_run_executor: Optional[RunExecutor] = None
+_run_executor_lock = threading.Lock()
+
+
+def get_run_executor() -> RunExecutor:
+    """Return the run executor shared by every page, acquired from the registry once per process."""
+    global _run_executor
+    with _run_executor_lock:
+        if _run_executor is None:
+            _run_executor = registry.acquire(("run_executor",), RunExecutor, close=lambda executor: executor.close())
+        return _run_executor
+
+
+def stop_run(run_executor: RunExecutor, key: str) -> Optional[str]:
+    """Stop and collect the run of a session, returns its answer so far (None without a run).
+
+    Called before a new prompt is submitted: the run of the previous prompt, still going
+    or finished while the user was on another page, keeps its answer in the chat.
+    """
+    run = run_executor.get(key)
+    if run is None:
+        return None
+    run.stop()
+    # The chunks the worker put before the stop
+    run.drain(timeout=0)
+    run_executor.collect(run)
+    return run.response()
+
+
+def stream_run(run: RunHandle) -> str:
+    """Stream a run into the page until it's over, returns the answer to add to the chat.
+
+    The answer drained so far is drawn first, so a run the user comes back to after a page
+    switch picks up where it was. A Stop button and a status line are shown while it runs.
+    """
+    controls = st.empty()
+    if not run.finished:
+        controls.button("Stop", key=f"stop_run_{run.key}", on_click=run.stop, icon=":material/stop_circle:")
+    status = st.empty()
+    with StreamRenderer(st.empty()) as stream:
+        if run.text:
+            stream.write(run.text)
+        while True:
+            chunks = run.drain()
+            for chunk in chunks:
+                stream.write(chunk)
+            if chunks:
+                continue
+            if run.finished:
+                break
+            # Redrawn on every poll, which is also when a click on Stop interrupts this script run
+            if run.state == "queued":
+                status.caption(f"Waiting for a free worker ({time.monotonic() - run.submitted_at:.0f}s)")
+            else:
+                status.caption(run.status or f"Running for {run.elapsed:.0f}s")
+    controls.empty()
+    status.empty()
+    if run.note is not None:
+        st.caption(run.note)
+    return run.response()
+
+
+def render_run_stats() -> None:
+    """Sidebar line with the busy workers, the queued runs and the queue wait of background runs."""
+    # Read only, so no reference is taken
+    run_executor = registry.peek(("run_executor",))
+    if run_executor is None:
+        return
+    stats = run_executor.snapshot()
+    if stats["submitted"]:
+        st.sidebar.caption(
+            f"Background runs: {stats['running']}/{stats['workers']} workers busy, {stats['queued']} queued, "
+            f"queue wait p95 {stats.get('wait_p95_ms', 0) / 1000:.1f}s"
+        )
@@ -0,0 +1,291 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import streamlit as st
+from agno.tools.duckduckgo import DuckDuckGoTools
+from agno.utils.log import log_debug
+
+from utils.registry import registry
+
+SEARCH_CACHE_PATH = Path("tmp/search_cache.db")
+# Seconds a search result is served from the cache (web results go stale, news faster)
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", str(6 * 60 * 60)))
+NEWS_CACHE_TTL = int(os.getenv("NEWS_CACHE_TTL", str(30 * 60)))
+# Maximum number of results kept on disk, least recently used ones are evicted first
+MAX_CACHE_ENTRIES = 10_000
+# Results also kept in process memory
+MEMORY_CACHE_ENTRIES = 1024
+
+# Punctuation that doesn't change what a search engine returns. Quotes (exact phrase), `-` (exclude)
+# and the colon of operators like `site:` do, so they stay: only a colon ending a word goes
+_PUNCTUATION = re.compile(r"['`?!,;()\[\]{}]|:(?!\S)")
+
+
+def normalize_query(query: str) -> str:
+    """Normalize case, unicode form, punctuation and whitespace, so near-identical queries share an entry."""
+    text = _PUNCTUATION.sub(" ", unicodedata.normalize("NFKC", query).casefold())
+    return " ".join(text.split()).rstrip(".")
+
+
+@dataclass
+class _Entry:
+    result: str
+    expires_at: float
+    # How long the original request took, added to the time saved on every hit
+    fetch_seconds: float
+
+
+class SearchCache:
+    """Process-wide cache of search results, in memory and on disk, with a TTL.
+
+    Lookups go through an in-memory LRU, then a SQLite file that survives restarts.
+    Entries expire after their TTL and the least recently used ones are evicted past
+    `max_entries`. Concurrent misses on the same key share one in-flight request.
+
+    Args:
+        path: SQLite file holding the cached results
+        max_entries: Maximum number of results kept on disk
+    """
+
+    def __init__(self, path: Path = SEARCH_CACHE_PATH, max_entries: int = MAX_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        # Lets maintenance return the pages of evicted entries to the disk (only applies to new files)
+        self.connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, query TEXT NOT NULL, result TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, fetch_seconds REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self.connection.commit()
+        self.memory: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "saved_seconds": 0.0}
+
+    def get_or_fetch(self, key: str, query: str, ttl: float, fetch: Callable[[], str]) -> str:
+        """Return the cached result of `key`, or fetch, cache and return it.
+
+        Args:
+            key: Cache key of the request (see `cache_key`)
+            query: The query, stored for inspection only
+            ttl: Seconds the fetched result stays valid
+            fetch: Runs the request on a miss, its errors are raised and not cached
+        """
+        now = time.time()
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is not None and entry.expires_at > now:
+                self.memory.move_to_end(key)
+                self._hit(entry)
+                return entry.result
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                self.stats["coalesced"] += 1
+        if inflight is not None:
+            # The same search is already running for another agent, wait for its result
+            return inflight.result()
+
+        entry = self._read(key, now)
+        with self._lock:
+            if entry is not None:
+                self._remember(key, entry)
+                self.stats["disk_hits"] += 1
+                self._hit(entry)
+                return entry.result
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                future: Future = Future()
+                self._inflight[key] = future
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        if inflight is not None:
+            return inflight.result()
+
+        try:
+            start = time.perf_counter()
+            result = fetch()
+            entry = _Entry(result=result, expires_at=time.time() + ttl, fetch_seconds=time.perf_counter() - start)
+            self._write(key, query, entry)
+            with self._lock:
+                self._remember(key, entry)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _hit(self, entry: _Entry) -> None:
+        self.stats["hits"] += 1
+        self.stats["saved_seconds"] += entry.fetch_seconds
+
+    def _remember(self, key: str, entry: _Entry) -> None:
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > MEMORY_CACHE_ENTRIES:
+            self.memory.popitem(last=False)
+
+    def _read(self, key: str, now: float) -> Optional[_Entry]:
+        with self._db_lock:
+            row = self.connection.execute(
+                "SELECT result, expires_at, fetch_seconds FROM results WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            with self.connection:
+                self.connection.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+        return _Entry(result=row[0], expires_at=row[1], fetch_seconds=row[2])
+
+    def _write(self, key: str, query: str, entry: _Entry) -> None:
+        now = time.time()
+        with self._db_lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO results (key, query, result, expires_at, fetch_seconds, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, query, entry.result, entry.expires_at, entry.fetch_seconds, now),
+            )
+            # Expired entries go first, then the least recently used ones past the cap
+            self.connection.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+            (count,) = self.connection.execute("SELECT COUNT(*) FROM results").fetchone()
+            if count > self.max_entries:
+                excess = count - int(self.max_entries * 0.9)
+                self.connection.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)", (excess,)
+                )
+                log_debug(f"Evicted {excess} search results from the cache")
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return the hit/miss counters, the hit rate and the seconds of search latency saved."""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = (stats["hits"] + stats["coalesced"]) / lookups if lookups else 0.0
+        stats["entries_in_memory"] = len(self.memory)
+        return stats
+
+    def close(self) -> None:
+        with self._db_lock:
+            self.connection.close()
+
+
+_search_cache: Optional[SearchCache] = None
+_search_cache_lock = threading.Lock()
+
+
+def _search_cache_key() -> tuple:
+    return ("search_cache", str(SEARCH_CACHE_PATH.resolve()))
+
+
+def get_search_cache() -> SearchCache:
+    """Return the search cache shared by every page.
+
+    It is acquired from the registry once per process, not once per agent, and closed
+    with the registry at exit.
+    """
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = registry.acquire(_search_cache_key(), SearchCache, close=lambda cache: cache.close())
+        return _search_cache
+
+
+def cache_key(kind: str, query: str, max_results: int, modifier: Optional[str] = None) -> str:
+    """Key of a search, with the query normalized."""
+    return hashlib.sha256(f"{kind}\0{modifier or ''}\0{max_results}\0{normalize_query(query)}".encode()).hexdigest()
+
+
+class CachedDuckDuckGoTools(DuckDuckGoTools):
+    """DuckDuckGoTools answering repeated searches from the shared `SearchCache`.
+
+    Every page creates its own DuckDuckGoTools, so identical searches ("what is Agno")
+    went to the network again and again, adding latency and getting rate limited. The
+    results are cached for `search_ttl` seconds (news for `news_ttl`), keyed by the
+    normalized query, and concurrent identical searches share one request.
+
+    Args:
+        cache: The search cache, the shared one by default
+        search_ttl: Seconds a web search result is reused
+        news_ttl: Seconds a news search result is reused
+        **kwargs: Passed to DuckDuckGoTools
+    """
+
+    def __init__(
+        self,
+        cache: Optional[SearchCache] = None,
+        search_ttl: float = SEARCH_CACHE_TTL,
+        news_ttl: float = NEWS_CACHE_TTL,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.cache = cache or get_search_cache()
+        self.search_ttl = search_ttl
+        self.news_ttl = news_ttl
+
+    def duckduckgo_search(self, query: str, max_results: int = 5) -> str:
+        """Use this function to search DuckDuckGo for a query.
+
+        Args:
+            query(str): The query to search for.
+            max_results (optional, default=5): The maximum number of results to return.
+
+        Returns:
+            The result from DuckDuckGo.
+        """
+        max_results = self.fixed_max_results or max_results
+        return self.cache.get_or_fetch(
+            cache_key("search", query, max_results, self.modifier),
+            query,
+            self.search_ttl,
+            lambda: super(CachedDuckDuckGoTools, self).duckduckgo_search(query, max_results),
+        )
+
+    def duckduckgo_news(self, query: str, max_results: int = 5) -> str:
+        """Use this function to get the latest news from DuckDuckGo.
+
+        Args:
+            query(str): The query to search for.
+            max_results (optional, default=5): The maximum number of results to return.
+
+        Returns:
+            The latest news from DuckDuckGo.
+        """
+        max_results = self.fixed_max_results or max_results
+        return self.cache.get_or_fetch(
+            cache_key("news", query, max_results),
+            query,
+            self.news_ttl,
+            lambda: super(CachedDuckDuckGoTools, self).duckduckgo_news(query, max_results),
+        )
+
+
+def render_search_cache_stats() -> None:
+    """Sidebar line with the hit rate of the search cache and the search time it saved."""
+    # Read only, so no reference is taken (and no cache is created when no page has used one)
+    cache = registry.peek(_search_cache_key())
+    if cache is None:
+        return
+    stats = cache.snapshot()
+    lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+    if lookups:
+        st.sidebar.caption(
+            f"Web search cache: {stats['hit_rate']:.0%} hit rate over {lookups} searches, "
+            f"{stats['saved_seconds']:.1f}s of search time saved"
+        )
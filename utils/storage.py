@@ -0,0 +1,677 @@
+import copy
+import functools
+import hashlib
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from agno.memory.v2.db.schema import MemoryRow
+from agno.memory.v2.db.sqlite import SqliteMemoryDb as _SqliteMemoryDb
+from agno.storage.session import Session
+from agno.storage.sqlite import SqliteStorage as _SqliteStorage
+from agno.utils.log import log_debug, logger
+from sqlalchemy import Column, Index, MetaData, String, Table, create_engine, delete, event, func, inspect, select, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+# Connections kept open per database file (readers, the writer thread uses one of them)
+POOL_SIZE = 8
+# Seconds a connection waits for a lock held by another process before failing
+BUSY_TIMEOUT = 5
+# Seconds the writer waits for more writes before committing a batch
+BATCH_WINDOW = 0.02
+# Sessions whose stored run ids are remembered, to append only their new runs
+MAX_TRACKED_SESSIONS = 10_000
+
+PRAGMAS = [
+    # Lets maintenance return freed pages a few at a time (only applies to new files)
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    # Readers don't block the writer and the writer doesn't block readers
+    "PRAGMA journal_mode=WAL",
+    # Durable at checkpoints, which is enough in WAL mode and saves an fsync per commit
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT * 1000}",
+    "PRAGMA temp_store=MEMORY",
+    # 32MB page cache and 256MB memory-mapped reads per connection
+    "PRAGMA cache_size=-32000",
+    "PRAGMA mmap_size=268435456",
+]
+
+
+def create_sqlite_engine(db_file: str) -> Engine:
+    """Create an engine for a SQLite file with WAL, tuned pragmas and a bounded pool."""
+    db_path = Path(db_file).resolve()
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        pool_size=POOL_SIZE,
+        max_overflow=0,
+        connect_args={"timeout": BUSY_TIMEOUT, "check_same_thread": False},
+    )
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return engine
+
+
+class _Write:
+    def __init__(self, write: Callable[[Connection], None]):
+        self.write = write
+        # Callers waiting on this write, including the ones whose writes it replaced
+        self.futures: List[Future] = [Future()]
+
+
+class SqliteWriter:
+    """Single writer thread for a SQLite file.
+
+    Writes are queued and committed in batches, one transaction per batch, so concurrent
+    sessions never compete for the database lock. Writes submitted with the same key
+    (e.g. successive upserts of one session) are coalesced: only the latest one runs.
+    """
+
+    def __init__(self, engine: Engine, batch_window: float = BATCH_WINDOW):
+        self.engine = engine
+        self.batch_window = batch_window
+        self._pending: Dict[Hashable, _Write] = {}
+        self._in_flight: List[_Write] = []
+        self._keys = itertools.count()
+        self._lock = threading.Condition()
+        self._closed = False
+        self.stats = {"submitted": 0, "coalesced": 0, "written": 0, "batches": 0, "failed": 0}
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, write: Callable[[Connection], None], key: Optional[Hashable] = None) -> Future:
+        """Queue `write(connection)`, replacing the pending write with the same key if any."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SQLite writer is closed")
+            key = key if key is not None else ("unkeyed", next(self._keys))
+            job = _Write(write)
+            replaced = self._pending.get(key)
+            if replaced is not None:
+                job.futures.extend(replaced.futures)
+                self.stats["coalesced"] += 1
+            # A replaced write keeps its place in the queue, so appends stay in order
+            self._pending[key] = job
+            self.stats["submitted"] += 1
+            self._lock.notify_all()
+            return job.futures[0]
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Wait until every write submitted so far is committed."""
+        with self._lock:
+            jobs = list(self._pending.values()) + self._in_flight
+            futures = [future for job in jobs for future in job.futures]
+        for future in futures:
+            future.exception(timeout=timeout)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._pending and not self._closed:
+                    self._lock.wait()
+                if not self._pending and self._closed:
+                    return
+            if not self._closed:
+                # Let writes issued at the same time (e.g. while streaming) join this batch
+                time.sleep(self.batch_window)
+            with self._lock:
+                batch, self._pending = list(self._pending.values()), {}
+                self._in_flight = batch
+            self._write_batch(batch)
+            with self._lock:
+                self._in_flight = []
+
+    def _write_batch(self, batch: List[_Write]) -> None:
+        try:
+            with self.engine.begin() as connection:
+                for job in batch:
+                    job.write(connection)
+        except Exception as e:
+            # Retry one by one so a bad write doesn't fail the others
+            log_debug(f"Batch of {len(batch)} writes failed ({e}), retrying them one by one")
+            for job in batch:
+                try:
+                    with self.engine.begin() as connection:
+                        job.write(connection)
+                    self._resolve(job)
+                except Exception as job_error:
+                    logger.warning(f"SQLite write failed: {job_error}")
+                    self.stats["failed"] += 1
+                    for future in job.futures:
+                        future.set_exception(job_error)
+            self.stats["batches"] += 1
+            return
+        for job in batch:
+            self._resolve(job)
+        self.stats["batches"] += 1
+
+    def _resolve(self, job: _Write) -> None:
+        self.stats["written"] += 1
+        for future in job.futures:
+            future.set_result(None)
+
+
+class SqliteStorage(_SqliteStorage):
+    """Agno's SqliteStorage on a shared engine, writing through a `SqliteWriter`.
+
+    Agno 1.5.1 ignores `db_engine` and silently falls back to an in-memory database,
+    so the engine is re-bound after the parent constructor ran.
+
+    Upserts return right away: the session is queued on the writer (successive upserts
+    of a session are coalesced) and reads of a session with a pending write return the
+    pending version, so callers always read their own writes.
+
+    With `history_runs` set, runs are kept out of the session row, in a `<table>_runs`
+    table with one row per run keyed by (session_id, run_index). Reads load the session
+    row and its last `history_runs` runs, and upserts only append the runs that aren't
+    stored yet, so a turn costs the same on the 300th run as on the 3rd. Sessions from
+    `get_all_sessions` come without runs, `get_runs` returns the full history.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        db_engine: Engine,
+        writer: Optional[SqliteWriter] = None,
+        history_runs: Optional[int] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(table_name=table_name, db_engine=db_engine, **kwargs)
+        self.db_engine = db_engine
+        self.inspector = inspect(db_engine)
+        self.SqlSession = sessionmaker(bind=db_engine)
+        self.writer = writer
+        self.history_runs = history_runs
+        self.runs_table: Optional[Table] = self.get_runs_table() if history_runs is not None else None
+        self._pending: Dict[str, Session] = {}
+        self._pending_lock = threading.Lock()
+        self._table_ready = False
+        # Ids of the runs known to be stored, per session (the ones read or written last)
+        self._stored_runs: "OrderedDict[str, Set[str]]" = OrderedDict()
+
+    def get_runs_table(self) -> Table:
+        name = f"{self.table_name}_runs"
+        return Table(
+            name,
+            MetaData(),
+            Column("session_id", String, primary_key=True),
+            Column("run_index", sqlite.INTEGER, primary_key=True),
+            Column("run_id", String, nullable=False),
+            Column("run", sqlite.JSON),
+            Column("created_at", sqlite.INTEGER, default=lambda: int(time.time())),
+            Index(f"idx_{name}_run_id", "session_id", "run_id", unique=True),
+        )
+
+    def create(self) -> None:
+        super().create()
+        if self.runs_table is not None and not inspect(self.db_engine).has_table(self.runs_table.name):
+            log_debug(f"Creating table: {self.runs_table.name}")
+            self.runs_table.create(self.db_engine, checkfirst=True)
+            self._migrate_runs()
+
+    def _migrate_runs(self) -> None:
+        """Move the runs of sessions stored as one blob into the runs table (runs once)."""
+        with self.db_engine.begin() as connection:
+            for session_id, memory in connection.execute(select(self.table.c.session_id, self.table.c.memory)):
+                runs = (memory or {}).get("runs")
+                if not runs:
+                    continue
+                rows = [
+                    {"session_id": session_id, "run_index": index, "run_id": _run_id(run), "run": run}
+                    for index, run in enumerate(runs)
+                ]
+                connection.execute(sqlite.insert(self.runs_table).on_conflict_do_nothing(), rows)
+                connection.execute(
+                    self.table.update()
+                    .where(self.table.c.session_id == session_id)
+                    .values(memory={**memory, "runs": []})
+                )
+                log_debug(f"Moved {len(runs)} runs of session {session_id} to {self.runs_table.name}")
+
+    def _ensure_tables(self) -> None:
+        if self.auto_upgrade_schema and not self._schema_up_to_date:
+            self.upgrade_schema()
+        if not self._table_ready:
+            self.create()
+            self._table_ready = True
+
+    def upsert(self, session: Session, create_and_retry: bool = True) -> Optional[Session]:
+        if self.writer is None and self.runs_table is None:
+            return super().upsert(session, create_and_retry=create_and_retry)
+        self._ensure_tables()
+
+        # Snapshot it, the caller may keep changing the object until the write runs
+        session = copy.deepcopy(session)
+        writes: List[Tuple[Hashable, Callable[[Connection], Any]]] = []
+        new_runs: List[Tuple[str, Dict[str, Any]]] = []
+        row = session
+        if self.runs_table is not None and session.memory is not None:
+            new_runs = self._new_runs(session.session_id, session.memory.get("runs") or [])
+            writes += [
+                ((self.runs_table.name, session.session_id, run_id), self._append_run_write(session.session_id, run))
+                for run_id, run in new_runs
+            ]
+            row = replace(session, memory={**session.memory, "runs": []})
+        statement = self._upsert_statement(row)
+        writes.append(((self.table_name, session.session_id), lambda connection: connection.execute(statement)))
+
+        if self.writer is None:
+            with self.db_engine.begin() as connection:
+                for _, write in writes:
+                    write(connection)
+            for run_id, _ in new_runs:
+                self._run_stored(session.session_id, run_id)
+            return session
+
+        with self._pending_lock:
+            self._pending[session.session_id] = session
+            # The session row goes last, so it's committed with (or after) its runs
+            futures = [self.writer.submit(write, key=key) for key, write in writes]
+        # A run only counts as stored once its write is committed, a failed one is appended again next upsert
+        for (run_id, _), future in zip(new_runs, futures):
+            future.add_done_callback(functools.partial(self._run_written, session.session_id, run_id))
+        futures[-1].add_done_callback(lambda _: self._forget_pending(session))
+        return session
+
+    def _new_runs(self, session_id: str, runs: List[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any]]]:
+        """The runs not stored yet. Runs are append-only, a stored run is never rewritten.
+
+        Runs still queued on the writer are returned again, their appends are coalesced
+        with the pending ones (or ignored by the unique run_id index once committed).
+        """
+        with self._pending_lock:
+            stored = set(self._stored_runs.get(session_id, ()))
+        return [(run_id, run) for run_id, run in ((_run_id(run), run) for run in runs) if run_id not in stored]
+
+    def _remember_runs(self, session_id: str, run_ids: List[str]) -> None:
+        with self._pending_lock:
+            self._stored_runs[session_id] = set(run_ids)
+            self._track(session_id)
+
+    def _run_stored(self, session_id: str, run_id: str) -> None:
+        with self._pending_lock:
+            self._stored_runs.setdefault(session_id, set()).add(run_id)
+            self._track(session_id)
+
+    def _run_written(self, session_id: str, run_id: str, future: Future) -> None:
+        if future.exception() is None:
+            self._run_stored(session_id, run_id)
+
+    def _track(self, session_id: str) -> None:
+        """Mark a session's stored run ids as the most recently used, called with the lock held."""
+        self._stored_runs.move_to_end(session_id)
+        while len(self._stored_runs) > MAX_TRACKED_SESSIONS:
+            # Forgotten sessions re-submit their runs, which the unique run_id index ignores
+            self._stored_runs.popitem(last=False)
+
+    def _append_run_write(self, session_id: str, run: Dict[str, Any]) -> Callable[[Connection], Any]:
+        next_index = (
+            select(func.coalesce(func.max(self.runs_table.c.run_index) + 1, 0))
+            .where(self.runs_table.c.session_id == session_id)
+            .scalar_subquery()
+        )
+        statement = sqlite.insert(self.runs_table).values(
+            session_id=session_id, run_index=next_index, run_id=_run_id(run), run=run
+        )
+        # Another process may have stored it already, it keeps its place in the history
+        statement = statement.on_conflict_do_nothing(index_elements=["session_id", "run_id"])
+        return lambda connection: connection.execute(statement)
+
+    def _upsert_statement(self, session: Session):
+        """Same INSERT ... ON CONFLICT DO UPDATE statement as SqliteStorage.upsert."""
+        entity_columns = {
+            "agent": ["agent_id", "team_session_id", "agent_data"],
+            "team": ["team_id", "team_session_id", "team_data"],
+            "workflow": ["workflow_id", "workflow_data"],
+        }[self.mode]
+        values = {
+            "session_id": session.session_id,
+            "user_id": session.user_id,
+            "memory": session.memory,
+            "session_data": session.session_data,
+            "extra_data": session.extra_data,
+            **{column: getattr(session, column) for column in entity_columns},
+        }
+        updates = {column: value for column, value in values.items() if column != "session_id"}
+        statement = sqlite.insert(self.table).values(**values)
+        return statement.on_conflict_do_update(
+            index_elements=["session_id"], set_={**updates, "updated_at": int(time.time())}
+        )
+
+    def _forget_pending(self, session: Session) -> None:
+        with self._pending_lock:
+            if self._pending.get(session.session_id) is session:
+                del self._pending[session.session_id]
+
+    def read(self, session_id: str, user_id: Optional[str] = None) -> Optional[Session]:
+        with self._pending_lock:
+            pending = self._pending.get(session_id)
+        if pending is not None and (not user_id or pending.user_id == user_id):
+            session = copy.deepcopy(pending)
+            if self.runs_table is not None and session.memory is not None:
+                session.memory["runs"] = (session.memory.get("runs") or [])[-self.history_runs :]
+            return session
+
+        if self.runs_table is None:
+            return super().read(session_id, user_id=user_id)
+        self._ensure_tables()
+        session = super().read(session_id, user_id=user_id)
+        if session is not None and session.memory is not None:
+            runs = self._read_runs(session_id, last_n=self.history_runs)
+            session.memory["runs"] = runs
+            self._remember_runs(session_id, [_run_id(run) for run in runs])
+        return session
+
+    def _read_runs(self, session_id: str, last_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        statement = (
+            select(self.runs_table.c.run)
+            .where(self.runs_table.c.session_id == session_id)
+            .order_by(self.runs_table.c.run_index.desc())
+            .limit(last_n)
+        )
+        with self.db_engine.connect() as connection:
+            return [run for (run,) in connection.execute(statement)][::-1]
+
+    def get_runs(self, session_id: str, last_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return the runs of a session in order, all of them or only the last `last_n`."""
+        if self.runs_table is None:
+            session = self.read(session_id)
+            runs = (session.memory or {}).get("runs", []) if session is not None else []
+            return runs[-last_n:] if last_n else runs
+        if self.writer is not None:
+            self.writer.flush()
+        self._ensure_tables()
+        return self._read_runs(session_id, last_n=last_n)
+
+    def get_all_session_ids(self, user_id: Optional[str] = None, entity_id: Optional[str] = None) -> List[str]:
+        if self.writer is not None:
+            self.writer.flush()
+        return super().get_all_session_ids(user_id=user_id, entity_id=entity_id)
+
+    def get_all_sessions(self, user_id: Optional[str] = None, entity_id: Optional[str] = None) -> List[Session]:
+        if self.writer is not None:
+            self.writer.flush()
+        return super().get_all_sessions(user_id=user_id, entity_id=entity_id)
+
+    def delete_session(self, session_id: Optional[str] = None):
+        if session_id is None or (self.writer is None and self.runs_table is None):
+            return super().delete_session(session_id)
+        self._ensure_tables()
+        statements = [delete(self.table).where(self.table.c.session_id == session_id)]
+        if self.runs_table is not None:
+            statements.append(delete(self.runs_table).where(self.runs_table.c.session_id == session_id))
+
+        def write(connection: Connection) -> None:
+            for statement in statements:
+                connection.execute(statement)
+
+        if self.writer is None:
+            with self.db_engine.begin() as connection:
+                write(connection)
+        else:
+            # Same key as the upserts, so a pending upsert of this session is dropped
+            self.writer.submit(write, key=(self.table_name, session_id)).result()
+        with self._pending_lock:
+            self._pending.pop(session_id, None)
+            self._stored_runs.pop(session_id, None)
+
+    def forget_sessions(self, session_ids: List[str]) -> List[str]:
+        """Forget the stored runs of sessions deleted behind this storage's back (e.g. by maintenance).
+
+        Sessions with a pending write are in use and kept out, the caller doesn't delete them.
+
+        Returns:
+            The session ids that can be deleted
+        """
+        with self._pending_lock:
+            deletable = [session_id for session_id in session_ids if session_id not in self._pending]
+            for session_id in deletable:
+                # Re-created later, they append every run again
+                self._stored_runs.pop(session_id, None)
+        return deletable
+
+    def drop(self) -> None:
+        super().drop()
+        if self.runs_table is not None:
+            self.runs_table.drop(self.db_engine, checkfirst=True)
+            self._stored_runs.clear()
+        self._table_ready = False
+
+
+def _run_id(run: Dict[str, Any]) -> str:
+    """Id of a stored run, runs without one are identified by their content."""
+    if run.get("run_id"):
+        return run["run_id"]
+    return hashlib.sha1(json.dumps(run, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _copy_memory(row: MemoryRow) -> MemoryRow:
+    # Memory.refresh_from_db parses the memory dicts it is given in place
+    return MemoryRow.model_construct(
+        id=row.id, user_id=row.user_id, memory=dict(row.memory), last_updated=row.last_updated
+    )
+
+
+@dataclass
+class _UserMemories:
+    """In-process copy of one user's memories, kept in sync with the rows they change."""
+
+    # Bumped by every write to the user's memories, so readers know when to redraw
+    version: int = 0
+    # id -> (created_at, row), None until the first read of the user
+    rows: Optional[Dict[str, Tuple[Any, MemoryRow]]] = None
+    # Memories written or deleted since the last read, fetched again by id
+    dirty: Set[str] = field(default_factory=set)
+    # memory id -> version of its last change, oldest change first
+    changes: "OrderedDict[str, int]" = field(default_factory=OrderedDict)
+    # Version of the last full reload, older versions can't be caught up with changes
+    reset_version: int = 0
+
+
+@dataclass
+class MemoryChanges:
+    """A user's memories written and deleted since a version (see `SqliteMemoryDb.read_changes`)."""
+
+    version: int
+    # Memories created or updated, oldest first (every memory of the user when `full`)
+    memories: List[MemoryRow]
+    deleted: List[str]
+    # True when the changes can't be applied to the reader's copy, which is replaced instead
+    full: bool
+
+
+class SqliteMemoryDb(_SqliteMemoryDb):
+    """Agno's SqliteMemoryDb on a shared engine (see `SqliteStorage`), writing through a `SqliteWriter`.
+
+    Memory writes wait for their batch to be committed, so reads right after them see them.
+
+    With a writer, every write to this table goes through this instance, so it tracks the
+    changes per user: `user_version` is bumped by each write, and `read_memories(user_id)`
+    reads the user's rows once, then only fetches the memories written or deleted since
+    the previous read. Readers keeping their own copy (the Level 3 sidebar) call
+    `read_changes` with the version they last saw, so their refresh no longer grows
+    with the number of memories stored for the user.
+    """
+
+    def __init__(self, table_name: str, db_engine: Engine, writer: Optional[SqliteWriter] = None):
+        super().__init__(table_name=table_name, db_engine=db_engine)
+        self.db_engine = db_engine
+        self.inspector = inspect(db_engine)
+        self.Session = scoped_session(sessionmaker(bind=db_engine))
+        self.writer = writer
+        self._table_ready = False
+        self._users: Dict[str, _UserMemories] = {}
+        # memory id -> user id, to know whose copy a deleted memory belongs to
+        self._memory_users: Dict[str, str] = {}
+        self._users_lock = threading.Lock()
+
+    def user_version(self, user_id: str) -> int:
+        """Return a counter bumped by every write to a user's memories."""
+        with self._users_lock:
+            return self._user(user_id).version
+
+    def read_memories(
+        self, user_id: Optional[str] = None, limit: Optional[int] = None, sort: Optional[str] = None
+    ) -> List[MemoryRow]:
+        if self.writer is None or user_id is None:
+            return super().read_memories(user_id=user_id, limit=limit, sort=sort)
+
+        with self._users_lock:
+            user = self._user(user_id)
+            if not self._sync(user_id, user):
+                return []
+            rows = sorted(user.rows.values(), key=lambda item: item[0], reverse=sort != "asc")
+
+        if limit is not None:
+            rows = rows[:limit]
+        return [_copy_memory(row) for _, row in rows]
+
+    def read_changes(self, user_id: str, since: Optional[int] = None) -> MemoryChanges:
+        """Return the memories of a user written and deleted since version `since`.
+
+        Args:
+            user_id: The user whose memories are read
+            since: The version returned by the previous call, None for every memory
+
+        Returns:
+            MemoryChanges: The current version and the changes, or every memory of the
+            user (`full`) when `since` is None or the memories were reloaded since
+        """
+        with self._users_lock:
+            user = self._user(user_id)
+            self._sync(user_id, user)
+            rows = user.rows or {}
+            if since is None or since < user.reset_version:
+                memories = sorted(rows.values(), key=lambda item: item[0])
+                return MemoryChanges(user.version, [_copy_memory(row) for _, row in memories], [], full=True)
+
+            # Most recent changes last, so only the ones newer than `since` are looked at
+            changed = list(itertools.takewhile(lambda item: item[1] > since, reversed(user.changes.items())))
+            memories = [_copy_memory(rows[memory_id][1]) for memory_id, _ in reversed(changed) if memory_id in rows]
+            deleted = [memory_id for memory_id, _ in changed if memory_id not in rows]
+            return MemoryChanges(user.version, memories, deleted, full=False)
+
+    def _sync(self, user_id: str, user: _UserMemories) -> bool:
+        """Bring the copy of a user's memories up to date, called with the lock held."""
+        try:
+            if user.rows is None:
+                user.rows = self._fetch_rows(self.table.c.user_id == user_id)
+                user.dirty.clear()
+                user.changes.clear()
+                user.reset_version = user.version
+            elif user.dirty:
+                changed = self._fetch_rows((self.table.c.user_id == user_id) & self.table.c.id.in_(user.dirty))
+                for memory_id in user.dirty:
+                    user.rows.pop(memory_id, None)
+                    if memory_id in changed:
+                        self._memory_users[memory_id] = user_id
+                user.rows.update(changed)
+                user.dirty.clear()
+                return True
+        except SQLAlchemyError as e:
+            log_debug(f"Exception reading from table: {e}")
+            self.create()
+            return False
+        for memory_id in user.rows:
+            self._memory_users[memory_id] = user_id
+        return True
+
+    def _user(self, user_id: str) -> _UserMemories:
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _UserMemories()
+        return user
+
+    def _fetch_rows(self, condition) -> Dict[str, Tuple[Any, MemoryRow]]:
+        with self.Session() as session:
+            result = session.execute(select(self.table).where(condition))
+            return {
+                row.id: (
+                    row.created_at,
+                    MemoryRow(
+                        id=row.id,
+                        user_id=row.user_id,
+                        memory=eval(row.memory),
+                        last_updated=row.updated_at or row.created_at,
+                    ),
+                )
+                for row in result
+            }
+
+    def _changed(self, memory_id: str, user_id: Optional[str]) -> None:
+        """Mark a memory to be fetched again by the next read of its user(s)."""
+        with self._users_lock:
+            previous_user = self._memory_users.pop(memory_id, None)
+            for affected in {previous_user, user_id} - {None}:
+                user = self._user(affected)
+                user.version += 1
+                user.dirty.add(memory_id)
+                user.changes[memory_id] = user.version
+                user.changes.move_to_end(memory_id)
+
+    def upsert_memory(self, memory: MemoryRow, create_and_retry: bool = True) -> None:
+        if self.writer is None:
+            return super().upsert_memory(memory, create_and_retry=create_and_retry)
+        if not self._table_ready:
+            self.create()
+            self._table_ready = True
+
+        def write(connection: Connection) -> None:
+            exists = connection.execute(select(self.table.c.id).where(self.table.c.id == memory.id)).first()
+            if exists:
+                statement = (
+                    self.table.update()
+                    .where(self.table.c.id == memory.id)
+                    .values(user_id=memory.user_id, memory=str(memory.memory), updated_at=text("CURRENT_TIMESTAMP"))
+                )
+            else:
+                statement = self.table.insert().values(id=memory.id, user_id=memory.user_id, memory=str(memory.memory))
+            connection.execute(statement)
+
+        self.writer.submit(write, key=(self.table_name, memory.id)).result()
+        self._changed(memory.id, memory.user_id)
+
+    def delete_memory(self, memory_id: str) -> None:
+        if self.writer is None:
+            return super().delete_memory(memory_id)
+        statement = delete(self.table).where(self.table.c.id == memory_id)
+        self.writer.submit(lambda connection: connection.execute(statement), key=(self.table_name, memory_id)).result()
+        self._changed(memory_id, None)
+
+    def clear(self) -> bool:
+        cleared = super().clear()
+        self._reset()
+        return cleared
+
+    def drop_table(self) -> None:
+        super().drop_table()
+        self._reset()
+
+    def _reset(self) -> None:
+        # Every user is read again from the table, with a new version for the readers
+        with self._users_lock:
+            for user in self._users.values():
+                user.version += 1
+                user.rows = None
+            self._memory_users.clear()
@@ -0,0 +1,79 @@
+import os
+import time
+from typing import Any, Callable, List
+
+# Most redraws of a streaming answer per second
+STREAM_FPS = float(os.getenv("STREAM_FPS", "10"))
+# Characters buffered before a redraw, however recent the previous one
+STREAM_FLUSH_CHARS = int(os.getenv("STREAM_FLUSH_CHARS", "2048"))
+CURSOR = "▌"
+
+
+class StreamRenderer:
+    """Streams an answer into a Streamlit placeholder at a capped frame rate.
+
+    Redrawing the placeholder on every chunk sends the whole answer over the websocket
+    once per token, and `full_response += chunk` rebuilds it each time. Chunks are
+    buffered in a list instead, and the placeholder is redrawn at most `fps` times per
+    second (or once `flush_chars` characters are buffered). The first chunk is drawn
+    right away, so the time to first token doesn't change.
+
+    Use it as a context manager: the final answer, without the cursor, is always drawn
+    on exit, even if the stream failed half way.
+
+    Args:
+        placeholder: The element the answer is drawn in, usually `st.empty()`
+        fps: Most redraws per second
+        flush_chars: Buffered characters that trigger a redraw
+        clock: Monotonic clock in seconds (replaceable for benchmarks)
+    """
+
+    def __init__(
+        self,
+        placeholder: Any,
+        fps: float = STREAM_FPS,
+        flush_chars: int = STREAM_FLUSH_CHARS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.placeholder = placeholder
+        self.interval = 1 / fps if fps > 0 else 0.0
+        self.flush_chars = flush_chars
+        self.clock = clock
+        self._parts: List[str] = []
+        self._pending = 0
+        self._last_flush = None
+        self.frames = 0
+
+    def __enter__(self) -> "StreamRenderer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.flush(final=True)
+
+    @property
+    def text(self) -> str:
+        """The answer so far."""
+        if len(self._parts) > 1:
+            # Joined once per frame, not once per chunk
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def write(self, chunk: str) -> None:
+        """Add a chunk to the answer, redrawing it if a frame is due."""
+        if not chunk:
+            return
+        self._parts.append(chunk)
+        self._pending += len(chunk)
+        if (
+            self._last_flush is None
+            or self._pending >= self.flush_chars
+            or self.clock() - self._last_flush >= self.interval
+        ):
+            self.flush()
+
+    def flush(self, final: bool = False) -> None:
+        """Draw the answer so far, with the cursor unless it's the final one."""
+        self.placeholder.markdown(self.text if final else self.text + CURSOR)
+        self._pending = 0
+        self._last_flush = self.clock()
+        self.frames += 1
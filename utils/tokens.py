@@ -0,0 +1,43 @@
+from functools import lru_cache
+from typing import Optional
+
+from agno.utils.log import logger
+
+# Tokenizer used by the gpt-4.1 / gpt-4o model family
+ENCODING_NAME = "o200k_base"
+# Rough characters-per-token ratio used when tiktoken is not available
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    """Return the tiktoken encoding, or None if tiktoken (or its BPE file) is unavailable."""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(ENCODING_NAME)
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, estimating token counts from characters: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count the tokens of `text` with the model's tokenizer."""
+    encoding = get_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, suffix: str = "…") -> Optional[str]:
+    """Cut `text` down to at most `max_tokens` tokens (suffix included), None if nothing fits."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens - count_tokens(suffix)
+    if budget <= 0:
+        return None
+
+    encoding = get_encoding()
+    if encoding is None:
+        return text[: budget * CHARS_PER_TOKEN].rstrip() + suffix
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:budget]).rstrip() + suffix
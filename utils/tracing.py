@@ -0,0 +1,383 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+import altair as alt
+import streamlit as st
+from agno.models.openai import OpenAIChat
+from agno.models.response import ModelResponseEvent
+from agno.utils.log import logger
+
+from utils.instrumentation import RollingHistogram
+
+# Every finished run is appended to this JSON lines file, rotated to `<name>.1` past MAX_TRACES_BYTES
+TRACES_PATH = Path(os.getenv("RUN_TRACES_PATH", "tmp/run_traces.jsonl"))
+MAX_TRACES_BYTES = 5 * 1024 * 1024
+# Number of recent runs the percentiles are computed over
+TRACE_WINDOW = 200
+# USD per million input / output tokens
+PRICES_PER_MILLION = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+# Tool calls that run a member of a team, traced as a "member" span named after the member
+MEMBER_TOOLS = {"transfer_task_to_member": "member_id", "forward_task_to_member": "member_id"}
+
+
+@dataclass
+class Span:
+    """One timed step of a run: the run itself, a member, a model call or a tool call.
+
+    Times are milliseconds since the start of the run.
+    """
+
+    span_id: int
+    parent_id: Optional[int]
+    kind: str
+    name: str
+    start_ms: float
+    end_ms: Optional[float] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    # From the start of the span to its first streamed token (model calls and the run)
+    ttft_ms: Optional[float] = None
+    cost_usd: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ms if self.end_ms is not None else self.start_ms) - self.start_ms
+
+
+class RunTrace:
+    """Spans of one run, the first one being the run itself."""
+
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex
+        self.started_at = time.time()
+        self.spans: List[Span] = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self.root = self.start(None, "run", name)
+
+    def now(self) -> float:
+        return (time.perf_counter() - self._origin) * 1000
+
+    def start(self, parent: Optional[Span], kind: str, name: str) -> Span:
+        with self._lock:
+            span = Span(
+                span_id=len(self.spans),
+                parent_id=parent.span_id if parent else None,
+                kind=kind,
+                name=name,
+                start_ms=self.now(),
+            )
+            self.spans.append(span)
+        return span
+
+    def first_token(self) -> None:
+        """Record the time to the first token the user saw, once per run."""
+        if self.root.ttft_ms is None:
+            self.root.ttft_ms = self.now()
+
+    def totals(self) -> Dict[str, float]:
+        """Tokens and cost of every model call of the run."""
+        with self._lock:
+            models = [span for span in self.spans if span.kind == "model"]
+        return {
+            "input_tokens": sum(span.input_tokens for span in models),
+            "output_tokens": sum(span.output_tokens for span in models),
+            "cost_usd": sum(span.cost_usd for span in models),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = [asdict(span) for span in self.spans]
+        return {"trace_id": self.trace_id, "started_at": self.started_at, "spans": spans, **self.totals()}
+
+
+# The trace of the current run and the span new spans are nested in
+_current: contextvars.ContextVar[Optional[Tuple[RunTrace, Span]]] = contextvars.ContextVar("run_span", default=None)
+
+
+def start_span(kind: str, name: str) -> Optional[Tuple[RunTrace, Span, contextvars.Token]]:
+    """Open a span in the current run (None outside of a traced run), close it with `end_span`."""
+    current = _current.get()
+    if current is None:
+        return None
+    trace, parent = current
+    span = trace.start(parent, kind, name)
+    return trace, span, _current.set((trace, span))
+
+
+def end_span(started: Optional[Tuple[RunTrace, Span, contextvars.Token]], error: Optional[str] = None) -> None:
+    if started is None:
+        return
+    trace, span, token = started
+    span.end_ms = trace.now()
+    span.error = span.error or error
+    try:
+        _current.reset(token)
+    except ValueError:
+        # A stream abandoned by the page is closed from another context, there is nothing to restore
+        pass
+
+
+@contextmanager
+def span(kind: str, name: str) -> Iterator[Optional[Span]]:
+    """Time a step of the current run (no-op outside of a traced run)."""
+    started = start_span(kind, name)
+    try:
+        yield started[1] if started else None
+    except BaseException as e:
+        end_span(started, error=type(e).__name__)
+        raise
+    else:
+        end_span(started)
+
+
+def _record_usage(span: Optional[Span], model_id: str, usage: Any) -> None:
+    if span is None or usage is None:
+        return
+    span.input_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    span.output_tokens = getattr(usage, "completion_tokens", 0) or 0
+    input_price, output_price = PRICES_PER_MILLION.get(model_id, (0.0, 0.0))
+    span.cost_usd = (span.input_tokens * input_price + span.output_tokens * output_price) / 1_000_000
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    histogram = RollingHistogram(max(1, len(values)))
+    histogram.values.extend(values)
+    return histogram.percentiles()
+
+
+class TracedOpenAIChat(OpenAIChat):
+    """OpenAIChat recording its requests and tool calls as spans of the current run.
+
+    Every request is a "model" span with its tokens, cost and, when streamed, time to
+    first token. Every tool call is a "tool" span nested in the run or member that made
+    it, and a team's transfer to a member is a "member" span: the member's own requests
+    and tool calls are nested in it. Outside of `RunTracer.trace` nothing is recorded.
+    """
+
+    def invoke(self, *args, **kwargs) -> Any:
+        with span("model", self.id) as model_span:
+            response = super().invoke(*args, **kwargs)
+            _record_usage(model_span, self.id, response.usage)
+            return response
+
+    def invoke_stream(self, *args, **kwargs) -> Iterator[Any]:
+        with span("model", self.id) as model_span:
+            start = time.perf_counter()
+            for chunk in super().invoke_stream(*args, **kwargs):
+                if model_span is not None:
+                    delta = chunk.choices[0].delta if chunk.choices else None
+                    if model_span.ttft_ms is None and delta and (delta.content or delta.tool_calls):
+                        model_span.ttft_ms = (time.perf_counter() - start) * 1000
+                    _record_usage(model_span, self.id, chunk.usage)
+                yield chunk
+
+    def run_function_calls(self, *args, **kwargs) -> Iterator[Any]:
+        # The tool runs between its started and completed events, a member lazily as its result is read
+        started = None
+        try:
+            for response in super().run_function_calls(*args, **kwargs):
+                if response.event == ModelResponseEvent.tool_call_started.value and response.tool_calls:
+                    call = response.tool_calls[0]
+                    member_arg = MEMBER_TOOLS.get(call["tool_name"])
+                    if member_arg is not None:
+                        started = start_span("member", str((call.get("tool_args") or {}).get(member_arg)))
+                    else:
+                        started = start_span("tool", call["tool_name"])
+                elif response.event == ModelResponseEvent.tool_call_completed.value and response.tool_calls:
+                    failed = response.tool_calls[0].get("tool_call_error")
+                    end_span(started, error="tool call failed" if failed else None)
+                    started = None
+                yield response
+        except BaseException as e:
+            end_span(started, error=type(e).__name__)
+            started = None
+            raise
+        finally:
+            end_span(started)
+
+
+class RunTracer:
+    """Traces runs and aggregates their spans across runs (and restarts).
+
+    Finished runs are appended to a JSON lines file; the last `window` of them are
+    loaded back on start, so the percentiles cover previous processes as well.
+
+    Args:
+        path: JSON lines file the traces are appended to (None to keep them in memory)
+        window: Number of recent runs the percentiles are computed over
+    """
+
+    def __init__(self, path: Optional[Path] = TRACES_PATH, window: int = TRACE_WINDOW):
+        self.path = path
+        self._lock = threading.Lock()
+        self.traces: Deque[Dict[str, Any]] = deque(self._load(window), maxlen=window)
+
+    @contextmanager
+    def trace(self, name: str) -> Iterator[RunTrace]:
+        """Trace a run, model calls and tool calls of TracedOpenAIChat models inside it are recorded on it."""
+        trace = RunTrace(name)
+        token = _current.set((trace, trace.root))
+        try:
+            yield trace
+        except BaseException as e:
+            trace.root.error = type(e).__name__
+            raise
+        finally:
+            trace.root.end_ms = trace.now()
+            _current.reset(token)
+            self.record(trace)
+
+    def record(self, trace: RunTrace) -> None:
+        data = trace.to_dict()
+        with self._lock:
+            self.traces.append(data)
+            if self.path is None:
+                return
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                if self.path.exists() and self.path.stat().st_size > MAX_TRACES_BYTES:
+                    self.path.replace(self.path.with_name(self.path.name + ".1"))
+                with self.path.open("a") as f:
+                    f.write(json.dumps(data) + "\n")
+            except OSError as e:
+                logger.warning(f"Could not save the trace of {trace.root.name}: {e}")
+
+    def _load(self, window: int) -> List[Dict[str, Any]]:
+        if self.path is None:
+            return []
+        lines: Deque[str] = deque(maxlen=window)
+        for path in (self.path.with_name(self.path.name + ".1"), self.path):
+            if path.exists():
+                with path.open() as f:
+                    lines.extend(f)
+        traces = []
+        for line in lines:
+            try:
+                traces.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return traces
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Latency percentiles per kind and name of span, with the tokens and cost per run."""
+        with self._lock:
+            traces = list(self.traces)
+        durations: Dict[Tuple[str, str], List[float]] = {}
+        ttfts: Dict[Tuple[str, str], List[float]] = {}
+        for trace in traces:
+            for data in trace["spans"]:
+                if data["end_ms"] is None:
+                    continue
+                key = (data["kind"], data["name"])
+                durations.setdefault(key, []).append(data["end_ms"] - data["start_ms"])
+                if data["ttft_ms"] is not None:
+                    ttfts.setdefault(key, []).append(data["ttft_ms"])
+        rows = []
+        for (kind, name), values in durations.items():
+            percentiles = _percentiles(values)
+            row = {"span": f"{kind}: {name}", "count": percentiles["count"]}
+            row.update({f"{key}_ms": round(percentiles[key]) for key in ("p50", "p95", "p99")})
+            ttft = ttfts.get((kind, name))
+            row["ttft_p50_ms"] = round(_percentiles(ttft)["p50"]) if ttft else None
+            rows.append(row)
+        return rows
+
+    def cost(self) -> Dict[str, float]:
+        """Median and p95 tokens and cost per run."""
+        with self._lock:
+            traces = list(self.traces)
+        stats = {}
+        for key in ("input_tokens", "output_tokens", "cost_usd"):
+            percentiles = _percentiles([trace.get(key, 0) for trace in traces])
+            stats.update({f"{key}_p50": percentiles.get("p50", 0), f"{key}_p95": percentiles.get("p95", 0)})
+        return stats
+
+    def to_jsonl(self) -> str:
+        with self._lock:
+            return "".join(json.dumps(trace) + "\n" for trace in self.traces)
+
+
+run_tracer = RunTracer()
+
+
+def render_waterfall(trace: RunTrace) -> None:
+    """Waterfall chart of the spans of a run, nested spans indented under their parent."""
+    data = trace.to_dict()
+    depths: Dict[int, int] = {}
+    rows = []
+    for item in data["spans"]:
+        depth = depths[item["span_id"]] = depths.get(item["parent_id"], -1) + 1
+        end = item["end_ms"] if item["end_ms"] is not None else trace.now()
+        rows.append(
+            {
+                "span": f"{item['span_id']:>3} {'· ' * depth}{item['kind']}: {item['name']}",
+                "kind": item["kind"],
+                "start": round(item["start_ms"]),
+                "end": round(max(end, item["start_ms"] + 1)),
+                "duration_ms": round(end - item["start_ms"]),
+                "ttft_ms": round(item["ttft_ms"]) if item["ttft_ms"] is not None else None,
+                "tokens": f"{item['input_tokens']} in / {item['output_tokens']} out",
+                "cost_usd": round(item["cost_usd"], 5),
+                "error": item["error"],
+            }
+        )
+    chart = (
+        alt.Chart(alt.Data(values=rows))
+        .mark_bar()
+        .encode(
+            x=alt.X("start:Q", title="ms since the start of the run"),
+            x2="end:Q",
+            y=alt.Y("span:N", sort=None, title=None),
+            color=alt.Color("kind:N", legend=alt.Legend(orient="bottom")),
+            tooltip=["span:N", "duration_ms:Q", "ttft_ms:Q", "tokens:N", "cost_usd:Q", "error:N"],
+        )
+    )
+    st.altair_chart(chart.properties(height=max(120, 22 * len(rows))), use_container_width=True)
+    ttft = f", first token after {data['spans'][0]['ttft_ms'] / 1000:.1f}s" if data["spans"][0]["ttft_ms"] else ""
+    st.caption(
+        f"{trace.root.duration_ms / 1000:.1f}s{ttft}, {data['input_tokens']} input and "
+        f"{data['output_tokens']} output tokens, ${data['cost_usd']:.4f}"
+    )
+
+
+def render_trace_diagnostics() -> bool:
+    """Optional sidebar panel with span percentiles across runs, returns whether it is enabled."""
+    if not st.sidebar.toggle("Run tracing", key="run_tracing"):
+        return False
+
+    with st.sidebar:
+        summary = run_tracer.summary()
+        if not summary:
+            st.caption("No traced run yet.")
+            return True
+        cost = run_tracer.cost()
+        st.caption(
+            f"Last {len(run_tracer.traces)} runs: ${cost['cost_usd_p50']:.4f} per run "
+            f"(p95 ${cost['cost_usd_p95']:.4f}), {cost['output_tokens_p50']:.0f} output tokens"
+        )
+        st.dataframe(summary, hide_index=True, use_container_width=True)
+        st.download_button(
+            "Export traces (JSONL)",
+            data=run_tracer.to_jsonl(),
+            file_name="run_traces.jsonl",
+            mime="application/jsonl",
+            use_container_width=True,
+        )
+    return True
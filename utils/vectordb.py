@@ -0,0 +1,256 @@
+import json
+import threading
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from agno.document import Document
+from agno.utils.log import log_info, logger
+from agno.vectordb.distance import Distance
+from agno.vectordb.lancedb import LanceDb, SearchType
+
+from utils.instrumentation import count, retrieval_metrics, span
+from utils.reranker import LocalReranker
+from utils.tokens import count_tokens
+
+# Below this many rows a brute-force scan is fast enough, and an IVF index can't be trained well
+ANN_INDEX_MIN_ROWS = 5_000
+# IVF partitions searched per query, more is slower but finds more of the true neighbours
+DEFAULT_NPROBES = 20
+# PQ distances are approximate, re-ranking a few times more candidates exactly restores recall
+# (see benchmarks/bench_vector_index.py)
+DEFAULT_REFINE_FACTOR = 10
+# Column holding the JSON payload, which the full-text index covers
+FTS_COLUMN = "payload"
+
+# Reciprocal-rank fusion constant of hybrid search (LanceDB's default)
+RRF_K = 60
+
+LANCE_METRICS = {Distance.cosine: "cosine", Distance.l2: "l2", Distance.max_inner_product: "dot"}
+
+
+class IndexedLanceDb(LanceDb):
+    """LanceDb that builds and maintains its ANN and full-text indexes.
+
+    `ensure_indexes` (run after every ingestion) creates the full-text index, creates the
+    vector index once the table has `ann_index_min_rows` rows, and folds rows added since
+    into the existing indexes with `table.optimize()` instead of rebuilding them. The
+    native Lance full-text index is used by default, since unlike the tantivy one it can
+    be updated incrementally.
+
+    Args:
+        ann_index_min_rows: Row count from which the vector index is built
+        index_type: Lance vector index type (IVF_PQ, IVF_HNSW_SQ...)
+        num_partitions: IVF partitions, defaults to Lance's choice (about sqrt(rows))
+        num_sub_vectors: PQ sub-vectors, defaults to Lance's choice (dimensions / 16)
+        nprobes: IVF partitions searched per query
+        refine_factor: Re-rank `limit * refine_factor` candidates with exact distances
+    """
+
+    def __init__(
+        self,
+        *args,
+        ann_index_min_rows: int = ANN_INDEX_MIN_ROWS,
+        index_type: str = "IVF_PQ",
+        num_partitions: Optional[int] = None,
+        num_sub_vectors: Optional[int] = None,
+        nprobes: Optional[int] = DEFAULT_NPROBES,
+        refine_factor: Optional[int] = DEFAULT_REFINE_FACTOR,
+        use_tantivy: bool = False,
+        **kwargs,
+    ):
+        super().__init__(*args, nprobes=nprobes, use_tantivy=use_tantivy, **kwargs)
+        self.ann_index_min_rows = ann_index_min_rows
+        self.index_type = index_type
+        self.num_partitions = num_partitions
+        self.num_sub_vectors = num_sub_vectors
+        self.refine_factor = refine_factor
+        self._index_lock = threading.Lock()
+        # Table version the tantivy index was built from (it lives outside the table)
+        self._fts_version: Optional[int] = None
+        # Don't rebuild the full-text index on the first search if it's already there
+        self.fts_index_exists = FTS_COLUMN in self.index_stats()
+
+    def index_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return the indexed and unindexed row counts of every index, by column."""
+        if self.table is None or not self.exists():
+            return {}
+        stats = {}
+        for index in self.table.list_indices():
+            index_stats = self.table.index_stats(index.name)
+            stats[index.columns[0]] = {
+                "name": index.name,
+                "type": index_stats.index_type,
+                "indexed_rows": index_stats.num_indexed_rows,
+                "unindexed_rows": index_stats.num_unindexed_rows,
+            }
+        return stats
+
+    def ensure_indexes(self) -> List[str]:
+        """Create the missing indexes and add unindexed rows to the existing ones.
+
+        Returns:
+            The actions taken, e.g. ["fts_created", "vector_created"] or ["optimized"]
+        """
+        actions: List[str] = []
+        with self._index_lock:
+            if self.table is None or not self.exists():
+                return actions
+            # Pick up writes made through other handles
+            self.table = self.connection.open_table(name=self.table_name)
+            rows = self.table.count_rows()
+            indexes = self.index_stats()
+
+            if FTS_COLUMN not in indexes and not self.use_tantivy:
+                self.table.create_fts_index(FTS_COLUMN, use_tantivy=False, replace=True)
+                actions.append("fts_created")
+            elif self.use_tantivy and self._fts_version != self.table.version:
+                self.table.create_fts_index(FTS_COLUMN, use_tantivy=True, replace=True)
+                self._fts_version = self.table.version
+                actions.append("fts_rebuilt")
+            self.fts_index_exists = True
+
+            if self._vector_col not in indexes and rows >= self.ann_index_min_rows:
+                self.table.create_index(
+                    metric=LANCE_METRICS[self.distance],
+                    num_partitions=self.num_partitions,
+                    num_sub_vectors=self.num_sub_vectors,
+                    vector_column_name=self._vector_col,
+                    index_type=self.index_type,
+                )
+                actions.append("vector_created")
+
+            if any(index["unindexed_rows"] for index in indexes.values()):
+                # Compacts the data files and appends the new rows to the indexes
+                self.table.optimize()
+                actions.append("optimized")
+
+        if actions:
+            log_info(f"Updated indexes of '{self.table_name}' ({rows} rows): {', '.join(actions)}")
+        return actions
+
+    def optimize(self) -> None:
+        self.ensure_indexes()
+
+    def search(self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Search like LanceDb.search, with every stage traced in `retrieval_metrics`."""
+        with retrieval_metrics.trace(query, self.search_type.value) as trace:
+            # Give the local reranker a larger pool of candidates to pick the best `limit` from
+            num_candidates = limit
+            if isinstance(self.reranker, LocalReranker):
+                num_candidates = max(limit, self.reranker.candidate_pool)
+
+            if self.connection:
+                self.table = self.connection.open_table(name=self.table_name)
+
+            if self.search_type == SearchType.vector:
+                results = self.vector_search(query, num_candidates)
+            elif self.search_type == SearchType.keyword:
+                with span("fts"):
+                    results = self.keyword_search(query, num_candidates)
+                count("fts", len(results))
+            elif self.search_type == SearchType.hybrid:
+                results = self.hybrid_search(query, num_candidates)
+            else:
+                logger.error(f"Invalid search type '{self.search_type}'.")
+                return []
+            if results is None:
+                return []
+
+            search_results = self._build_search_results(results)
+            # Filter results based on metadata if filters are provided
+            if filters:
+                search_results = [
+                    document
+                    for document in search_results
+                    if document.meta_data is not None
+                    and all(document.meta_data.get(key) == value for key, value in filters.items())
+                ]
+
+            if self.reranker and search_results:
+                with span("rerank"):
+                    search_results = self.reranker.rerank(query=query, documents=search_results)
+            search_results = search_results[:limit]
+
+            count("documents", len(search_results))
+            # What the agent adds to the prompt (see Agent.convert_documents_to_string)
+            references = json.dumps([document.to_dict() for document in search_results], indent=2, ensure_ascii=False)
+            trace.injected_tokens = count_tokens(references)
+
+        log_info(f"Found {len(search_results)} documents")
+        return search_results
+
+    def _tune(self, query):
+        if self.nprobes:
+            query.nprobes(self.nprobes)
+        if self.refine_factor:
+            query.refine_factor(self.refine_factor)
+        return query
+
+    def _embed_query(self, query: str) -> Optional[List[float]]:
+        with span("embed"):
+            query_embedding = self.embedder.get_embedding(query)
+        if query_embedding is None:
+            logger.error(f"Error getting embedding for Query: {query}")
+        return query_embedding
+
+    def _vector_query(self, query_embedding: List[float], limit: int) -> pd.DataFrame:
+        with span("vector"):
+            results = self.table.search(query=query_embedding, vector_column_name=self._vector_col).limit(limit)
+            results = self._tune(results).to_pandas()
+        count("vector", len(results))
+        return results
+
+    def vector_search(self, query: str, limit: int = 5) -> List[Document]:
+        query_embedding = self._embed_query(query)
+        if query_embedding is None:
+            return None
+
+        if self.table is None:
+            logger.error("Table not initialized. Please create the table first")
+            return None  # type: ignore
+
+        return self._vector_query(query_embedding, limit)
+
+    def hybrid_search(self, query: str, limit: int = 5) -> List[Document]:
+        """Vector and full-text queries run as separate stages, fused with reciprocal-rank fusion.
+
+        Same ranking as LanceDB's hybrid query (RRF with k=60), but each stage can be timed.
+        """
+        query_embedding = self._embed_query(query)
+        if query_embedding is None:
+            return []
+
+        if self.table is None:
+            logger.error("Table not initialized. Please create the table first")
+            return []
+
+        if not self.fts_index_exists:
+            self.ensure_indexes()
+
+        vector_results = self._vector_query(query_embedding, limit)
+        with span("fts"):
+            fts_results = self.table.search(query=query, query_type="fts").limit(limit).to_pandas()
+        count("fts", len(fts_results))
+
+        with span("fusion"):
+            scores: Dict[str, float] = {}
+            rows: Dict[str, tuple] = {}
+            for results in (vector_results, fts_results):
+                columns = zip(results[self._id], results[self._vector_col], results["payload"])
+                for rank, (row_id, vector, payload) in enumerate(columns):
+                    scores[row_id] = scores.get(row_id, 0.0) + 1 / (RRF_K + rank + 1)
+                    rows.setdefault(row_id, (vector, payload))
+            fused_ids = sorted(scores, key=scores.get, reverse=True)[:limit]
+            fused = pd.DataFrame(
+                {
+                    self._vector_col: [rows[row_id][0] for row_id in fused_ids],
+                    self._id: fused_ids,
+                    "payload": [rows[row_id][1] for row_id in fused_ids],
+                }
+            )
+        return fused
+
+    def keyword_search(self, query: str, limit: int = 5) -> List[Document]:
+        if self.table is not None and not self.fts_index_exists:
+            self.ensure_indexes()
+        return super().keyword_search(query, limit)
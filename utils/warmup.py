@@ -0,0 +1,60 @@
+"""Warm the app up before the Streamlit server accepts traffic.
+
+Usage:
+    python -m utils.warmup            # build and load the knowledge base, then signal readiness
+    python -m utils.warmup --report   # print the cold-start timings of the last deploy
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from utils.knowledge import FIRST_TOKEN_PATH, read_readiness, warm_up
+
+
+def report() -> None:
+    readiness = read_readiness()
+    if readiness is None:
+        print("Knowledge base not warmed up yet.")
+        return
+
+    print(f"Knowledge base build: {readiness['build_seconds']:.2f}s")
+    print(f"Knowledge base load:  {readiness['load_seconds']:.2f}s ({readiness['rows']} rows)")
+    print(f"Warm-up:              {readiness['ready_at'] - readiness['started_at']:.2f}s")
+    try:
+        first_token = json.loads(FIRST_TOKEN_PATH.read_text())
+    except (FileNotFoundError, ValueError):
+        first_token = None
+    if first_token and first_token["started_at"] == readiness["started_at"]:
+        # From the first question asked once ready, the warm-up isn't counted
+        print(f"First token:          {first_token['seconds_to_first_token']:.2f}s after the question")
+    else:
+        print("First token:          no question asked since the last warm-up")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--report", action="store_true", help="Print the cold-start timings and exit")
+    args = parser.parse_args()
+
+    if args.report:
+        report()
+        return 0
+
+    load_dotenv()
+    started_at = time.time()
+    try:
+        warm_up(started_at=started_at)
+    except Exception as e:
+        # Don't keep the server from starting, the pages warm up in the background instead
+        print(f"Warm-up failed, the pages will warm up in the background: {e}", file=sys.stderr)
+        return 0
+    report()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
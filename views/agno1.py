@@ -1,9 +1,15 @@
 import streamlit as st
 from textwrap import dedent
+from typing import Iterator
 from dotenv import load_dotenv
 from agno.agent import Agent
 from agno.models.openai import OpenAIChat
-from agno.tools.duckduckgo import DuckDuckGoTools
+
+from utils.agent_pool import AgentPool, session_agent
+from utils.chat_history import render_history
+from utils.registry import get_http_client
+from utils.run_executor import RunHandle, get_run_executor, stop_run, stream_run
+from utils.search_cache import CachedDuckDuckGoTools
 
 load_dotenv()
 
@@ -34,28 +40,36 @@ if "level1_messages" not in st.session_state:
 @st.cache_resource
 def initialize_components():
 
-    agno_assist = Agent(
-        name="Agno AGI",
-        model=OpenAIChat(id="gpt-4.1-mini"),
-        description=dedent(
-            """\
-            You are `Agno AGI`, an autonomous AI Agent that can build agents using the Agno 
-            framework. Your goal is to help developers understand and use Agno by providing 
-            explanations, working code examples, and optional visual and audio explanations 
-            of key concepts."""
-        ),
-        instructions="Search the web for information about Agno.",
-        tools=[DuckDuckGoTools()],
-        add_datetime_to_instructions=True,
-        markdown=True,
-        debug_mode=True,
-    )
-
-    return agno_assist
-
-
-# Get agent instance
-agent = initialize_components()
+    # Every agent's model sends its requests through one shared connection pool
+    http_client = get_http_client()
+
+    def create_agent(session_id: str) -> Agent:
+        return Agent(
+            name="Agno AGI",
+            model=OpenAIChat(id="gpt-4.1-mini", http_client=http_client),
+            description=dedent(
+                """\
+                You are `Agno AGI`, an autonomous AI Agent that can build agents using the Agno 
+                framework. Your goal is to help developers understand and use Agno by providing 
+                explanations, working code examples, and optional visual and audio explanations 
+                of key concepts."""
+            ),
+            instructions="Search the web for information about Agno.",
+            tools=[CachedDuckDuckGoTools()],
+            add_datetime_to_instructions=True,
+            session_id=session_id,
+            markdown=True,
+            debug_mode=True,
+        )
+
+    # One agent per browser session, so concurrent users don't share run state.
+    # Runs are executed on the shared pool of background workers
+    return AgentPool(create_agent), get_run_executor()
+
+
+# Get the agent of this browser session
+agent_pool, run_executor = initialize_components()
+agent = session_agent(agent_pool, "level1_session_id")
 
 # Display the code as an expandable component above the chat
 with st.expander("📚 View the Code for the Agno Agent Level 1", expanded=False):
@@ -87,13 +101,17 @@ with st.expander("📚 View the Code for the Agno Agent Level 1", expanded=False
     st.code(code, language="python")
 
 
-# Display chat message history
-for message in st.session_state.level1_messages:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+# Display chat message history, the latest messages only (older ones are behind "Show earlier")
+render_history(st.session_state.level1_messages, key="level1")
 
 # Handle user input
 if prompt := st.chat_input("What do you want to learn about Agno?"):
+    # The run of the previous prompt, if still going, is stopped and its answer so far kept in the chat
+    if (previous := stop_run(run_executor, st.session_state.level1_session_id)) is not None:
+        st.session_state.level1_messages.append({"role": "assistant", "content": previous})
+        with st.chat_message("assistant"):
+            st.markdown(previous)
+
     # Add user message to chat history
     st.session_state.level1_messages.append({"role": "user", "content": prompt})
 
@@ -101,22 +119,23 @@ if prompt := st.chat_input("What do you want to learn about Agno?"):
     with st.chat_message("user"):
         st.markdown(prompt)
 
+    def answer(run: RunHandle) -> Iterator[str]:
+        # Get streaming response instead of waiting for complete response
+        for chunk in agent.run(prompt, stream=True):
+            if chunk.content:
+                yield chunk.content
+
+    # The agent runs on a background worker, the page streams its answer
+    run_executor.submit(st.session_state.level1_session_id, answer, name="level1")
+
+# The session's run, just submitted or still going from before a page switch
+if (run := run_executor.get(st.session_state.level1_session_id)) is not None:
     # Process and display agent response
     with st.chat_message("assistant"):
         with st.spinner("Thinking..."):
-            # Create a placeholder for the streaming response
-            message_placeholder = st.empty()
-            full_response = ""
-            # Get streaming response instead of waiting for complete response
-            for chunk in agent.run(prompt, stream=True):
-                if chunk.content:
-                    # Accumulate the response content
-                    full_response += chunk.content
-                    # Update the display with each chunk
-                    message_placeholder.markdown(full_response + "▌")
-
-            # Final update without cursor
-            message_placeholder.markdown(full_response)
+            # Streamed into a placeholder redrawn a few times per second, with a Stop button while it runs
+            full_response = stream_run(run)
+            run_executor.collect(run)
 
             # Add assistant response to chat history
             st.session_state.level1_messages.append(
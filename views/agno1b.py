@@ -1,11 +1,17 @@
 import streamlit as st
 from textwrap import dedent
-import httpx
-import json
+from typing import Iterator
 from dotenv import load_dotenv
 from agno.agent import Agent
 from agno.models.openai import OpenAIChat
-from agno.tools.duckduckgo import DuckDuckGoTools
+
+from utils.agent_pool import AgentPool, session_agent
+from utils.chat_history import render_history
+from utils.context import LiveContext, compact_stories
+from utils.hackernews import get_story_refresher
+from utils.registry import get_http_client
+from utils.run_executor import RunHandle, get_run_executor, stop_run, stream_run
+from utils.search_cache import CachedDuckDuckGoTools
 
 load_dotenv()
 
@@ -33,78 +39,64 @@ if "level1b_messages" not in st.session_state:
     st.session_state.level1b_messages = []
 
 
-@st.cache_data(ttl=600)  # Cache for 10 minutes
 def get_top_hackernews_stories(num_stories: int = 5) -> str:
-    """Fetch and return the top stories from HackerNews.
+    """Return the latest snapshot of the top stories from HackerNews.
+
+    A background refresher keeps the snapshot warm, so this never waits on the network
+    (except for the very first call when there is no snapshot on disk yet).
 
     Args:
         num_stories: Number of top stories to retrieve (default: 5)
     Returns:
-        JSON string containing story details (title, url, score, etc.)
+        One line per story (title, score, comments, author, age, url), within a token budget
     """
-    # First, get the list of top story IDs
-    response = httpx.get("https://hacker-news.firebaseio.com/v0/topstories.json")
-    all_story_ids = response.json()
-
-    # Take only the first num_stories IDs
-    top_story_ids = all_story_ids[:num_stories]
-
-    # Create an empty list to store our story details
-    stories = []
-
-    # Loop through each story ID and get its details
-    for story_id in top_story_ids:
-        # Get the details for this story
-        story_url = f"https://hacker-news.firebaseio.com/v0/item/{story_id}.json"
-        story_response = httpx.get(story_url)
-        story_data = story_response.json()
-
-        # Create a new dictionary for this story, excluding 'kids'
-        filtered_story = {}
-        for key, value in story_data.items():
-            # Skip the 'kids' field which contains comment IDs
-            if key != "kids":
-                filtered_story[key] = value
+    stories = get_story_refresher().get_stories(num_stories)
 
-        # Add this story to our list
-        stories.append(filtered_story)
-
-    # Convert the list of stories to a formatted JSON string
-    return json.dumps(stories, indent=4)
+    # Keep only the fields the model needs, one compact line per story
+    return compact_stories(stories)
 
 
 # Initialize components with caching to prevent recreation on each rerun
 @st.cache_resource
 def initialize_components():
 
-    agno_assist = Agent(
-        name="Agno AGI",
-        model=OpenAIChat(id="gpt-4.1-mini"),
-        # Each function in the context is evaluated when the agent is run, think of it as dependency injection for Agents
-        context={"top_hackernews_stories": get_top_hackernews_stories},
-        instructions=dedent(
-            """\
-            You are an insightful tech trend observer! 📰
-
-            Here are the top stories on HackerNews:
-            {top_hackernews_stories}\
+    # Every agent's model sends its requests through one shared connection pool
+    http_client = get_http_client()
+
+    def create_agent(session_id: str) -> Agent:
+        return Agent(
+            name="Agno AGI",
+            model=OpenAIChat(id="gpt-4.1-mini", http_client=http_client),
+            # Each function in the context is evaluated when the agent is run, think of it as dependency injection for Agents
+            # LiveContext re-renders the latest snapshot on every run instead of only on the first one
+            context={"top_hackernews_stories": LiveContext(get_top_hackernews_stories)},
+            instructions=dedent(
+                """\
+                You are an insightful tech trend observer! 📰
+
+                Here are the top stories on HackerNews:
+                {top_hackernews_stories}\
             
-            Your job is to summarize the top stories on HackerNews on demand and provide details on them when asked. Use the search tool to find more information about specific news stories if you don't have enough information.
-        """
-        ),
-        # add_state_in_messages will make the `top_hackernews_stories` variable available in the instructions
-        add_state_in_messages=True,
-        tools=[DuckDuckGoTools()],
-        add_datetime_to_instructions=True,
-        markdown=True,
-        debug_mode=True,
-    )
+                Your job is to summarize the top stories on HackerNews on demand and provide details on them when asked. Use the search tool to find more information about specific news stories if you don't have enough information.
+            """
+            ),
+            # add_state_in_messages will make the `top_hackernews_stories` variable available in the instructions
+            add_state_in_messages=True,
+            tools=[CachedDuckDuckGoTools()],
+            add_datetime_to_instructions=True,
+            session_id=session_id,
+            markdown=True,
+            debug_mode=True,
+        )
 
-    return agno_assist
+    # One agent per browser session, so concurrent users don't share run state.
+    # Runs are executed on the shared pool of background workers
+    return AgentPool(create_agent), get_run_executor()
 
 
-# Get agent instance
-agent = initialize_components()
+# Get the agent of this browser session
+agent_pool, run_executor = initialize_components()
+agent = session_agent(agent_pool, "level1b_session_id")
 
 # Display the code as an expandable component above the chat
 with st.expander("📚 View the Code for the Agno Agent Level 1b", expanded=False):
@@ -115,7 +107,7 @@ with st.expander("📚 View the Code for the Agno Agent Level 1b", expanded=Fals
             name="Agno AGI",
             model=OpenAIChat(id="gpt-4.1-mini"),
             # Each function in the context is evaluated when the agent is run, think of it as dependency injection for Agents
-            context={"top_hackernews_stories": get_top_hackernews_stories},
+            context={"top_hackernews_stories": LiveContext(get_top_hackernews_stories)},
             instructions=dedent(
                 \"""You are an insightful tech trend observer! 📰
 
@@ -142,13 +134,17 @@ with st.expander("📚 View the Code for the Agno Agent Level 1b", expanded=Fals
     st.code(code, language="python")
 
 
-# Display chat message history
-for message in st.session_state.level1b_messages:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+# Display chat message history, the latest messages only (older ones are behind "Show earlier")
+render_history(st.session_state.level1b_messages, key="level1b")
 
 # Handle user input
 if prompt := st.chat_input("Summarize the top stories on HackerNews."):
+    # The run of the previous prompt, if still going, is stopped and its answer so far kept in the chat
+    if (previous := stop_run(run_executor, st.session_state.level1b_session_id)) is not None:
+        st.session_state.level1b_messages.append({"role": "assistant", "content": previous})
+        with st.chat_message("assistant"):
+            st.markdown(previous)
+
     # Add user message to chat history
     st.session_state.level1b_messages.append({"role": "user", "content": prompt})
 
@@ -156,22 +152,23 @@ if prompt := st.chat_input("Summarize the top stories on HackerNews."):
     with st.chat_message("user"):
         st.markdown(prompt)
 
+    def answer(run: RunHandle) -> Iterator[str]:
+        # Get streaming response instead of waiting for complete response
+        for chunk in agent.run(prompt, stream=True):
+            if chunk.content:
+                yield chunk.content
+
+    # The agent runs on a background worker, the page streams its answer
+    run_executor.submit(st.session_state.level1b_session_id, answer, name="level1b")
+
+# The session's run, just submitted or still going from before a page switch
+if (run := run_executor.get(st.session_state.level1b_session_id)) is not None:
     # Process and display agent response
     with st.chat_message("assistant"):
         with st.spinner("Thinking..."):
-            # Create a placeholder for the streaming response
-            message_placeholder = st.empty()
-            full_response = ""
-            # Get streaming response instead of waiting for complete response
-            for chunk in agent.run(prompt, stream=True):
-                if chunk.content:
-                    # Accumulate the response content
-                    full_response += chunk.content
-                    # Update the display with each chunk
-                    message_placeholder.markdown(full_response + "▌")
-
-            # Final update without cursor
-            message_placeholder.markdown(full_response)
+            # Streamed into a placeholder redrawn a few times per second, with a Stop button while it runs
+            full_response = stream_run(run)
+            run_executor.collect(run)
 
             # Add assistant response to chat history
             st.session_state.level1b_messages.append(
@@ -1,15 +1,17 @@
 import streamlit as st
 from textwrap import dedent
+from typing import Iterator
 from dotenv import load_dotenv
 from agno.agent import Agent
 from agno.models.openai import OpenAIChat
-from agno.tools.duckduckgo import DuckDuckGoTools
-from agno.knowledge.url import UrlKnowledge
-from agno.vectordb.lancedb import LanceDb, SearchType
-from agno.embedder.openai import OpenAIEmbedder
 
-# from agno.reranker.cohere import CohereReranker
-from agno.storage.sqlite import SqliteStorage
+from utils.agent_pool import AgentPool, session_agent
+from utils.chat_history import render_history
+from utils.instrumentation import render_retrieval_diagnostics
+from utils.knowledge import get_knowledge_base, record_first_token, render_knowledge_status
+from utils.registry import get_http_client, get_storage
+from utils.run_executor import RunHandle, get_run_executor, stop_run, stream_run
+from utils.search_cache import CachedDuckDuckGoTools
 
 load_dotenv()
 
@@ -40,51 +42,56 @@ if "level2_messages" not in st.session_state:
 @st.cache_resource
 def initialize_components():
 
-    knowledge_base = UrlKnowledge(
-        urls=["https://docs.agno.com/introduction.md"],
-        vector_db=LanceDb(
-            uri="tmp/lancedb",
-            table_name="agno_docs",
-            search_type=SearchType.hybrid,
-            embedder=OpenAIEmbedder(id="text-embedding-3-small"),
-            # reranker=CohereReranker(model="rerank-multilingual-v3.0"),
-        ),
-    )
-
-    knowledge_base.load(recreate=False)
-
-    storage = SqliteStorage(table_name="agent_sessions", db_file="tmp/agent.db")
-
-    agno_assist = Agent(
-        name="Agno AGI",
-        model=OpenAIChat(id="gpt-4.1-mini"),
-        description=dedent(
-            """\
-            You are `Agno AGI`, an autonomous AI Agent that can build agents using the Agno 
-            framework. Your goal is to help developers understand and use Agno by providing 
-            explanations, working code examples, and optional visual and audio explanations 
-            of key concepts."""
-        ),
-        instructions="Search the knowledge base for information about Agno. Only search the web using the search tool if you cannot find the answer to the user's questions.",
-        tools=[DuckDuckGoTools()],
-        add_datetime_to_instructions=True,
-        # Agentic RAG is enabled by default when `knowledge` is provided to the Agent.
-        knowledge=knowledge_base,
-        # Store Agent sessions in a sqlite database
-        storage=storage,
-        # Add the chat history to the messages
-        add_history_to_messages=True,
-        # Number of history runs
-        num_history_runs=3,
-        markdown=True,
-        debug_mode=True,
-    )
-
-    return knowledge_base, storage, agno_assist
-
-
-# Get agent instance
-knowledge_base, storage, agent = initialize_components()
+    # The knowledge base is loaded by the warm-up step, not on the first page render
+    knowledge_base = get_knowledge_base()
+
+    # Shared instances: Level 2 and Level 3 use the same table handle and SQLite engine
+    # Runs are stored one row each, reads only load the 3 runs added to the messages
+    storage = get_storage(table_name="agent_sessions", db_file="tmp/agent.db", history_runs=3)
+
+    # Every agent's model sends its requests through one shared connection pool
+    http_client = get_http_client()
+
+    def create_agent(session_id: str) -> Agent:
+        return Agent(
+            name="Agno AGI",
+            model=OpenAIChat(id="gpt-4.1-mini", http_client=http_client),
+            description=dedent(
+                """\
+                You are `Agno AGI`, an autonomous AI Agent that can build agents using the Agno 
+                framework. Your goal is to help developers understand and use Agno by providing 
+                explanations, working code examples, and optional visual and audio explanations 
+                of key concepts."""
+            ),
+            instructions="Search the knowledge base for information about Agno. Only search the web using the search tool if you cannot find the answer to the user's questions.",
+            tools=[CachedDuckDuckGoTools()],
+            add_datetime_to_instructions=True,
+            # Agentic RAG is enabled by default when `knowledge` is provided to the Agent.
+            knowledge=knowledge_base,
+            # Store Agent sessions in a sqlite database
+            storage=storage,
+            # Add the chat history to the messages
+            add_history_to_messages=True,
+            # Number of history runs
+            num_history_runs=3,
+            session_id=session_id,
+            markdown=True,
+            debug_mode=True,
+        )
+
+    # One agent per browser session, so concurrent users don't share run state.
+    # Runs are executed on the shared pool of background workers
+    return knowledge_base, storage, AgentPool(create_agent), get_run_executor()
+
+
+# Get the agent of this browser session
+knowledge_base, storage, agent_pool, run_executor = initialize_components()
+agent = session_agent(agent_pool, "level2_session_id")
+
+# Show an "index warming" notice instead of blocking the page while the index loads
+render_knowledge_status()
+# Optional sidebar panel with the timings of the knowledge searches
+render_retrieval_diagnostics()
 
 # Display the code as an expandable component above the chat
 with st.expander("📚 View the Code for the Agno Agent Level 2", expanded=False):
@@ -98,7 +105,7 @@ with st.expander("📚 View the Code for the Agno Agent Level 2", expanded=False
                 table_name="agno_docs",
                 search_type=SearchType.hybrid,
                 embedder=OpenAIEmbedder(id="text-embedding-3-small"),
-                reranker=CohereReranker(model="rerank-multilingual-v3.0"),
+                reranker=LocalReranker(candidate_pool=20),
             ),
         )
 
@@ -132,13 +139,17 @@ with st.expander("📚 View the Code for the Agno Agent Level 2", expanded=False
     st.code(code, language="python")
 
 
-# Display chat message history
-for message in st.session_state.level2_messages:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+# Display chat message history, the latest messages only (older ones are behind "Show earlier")
+render_history(st.session_state.level2_messages, key="level2")
 
 # Handle user input
 if prompt := st.chat_input("What do you want to learn about Agno?"):
+    # The run of the previous prompt, if still going, is stopped and its answer so far kept in the chat
+    if (previous := stop_run(run_executor, st.session_state.level2_session_id)) is not None:
+        st.session_state.level2_messages.append({"role": "assistant", "content": previous})
+        with st.chat_message("assistant"):
+            st.markdown(previous)
+
     # Add user message to chat history
     st.session_state.level2_messages.append({"role": "user", "content": prompt})
 
@@ -146,22 +157,26 @@ if prompt := st.chat_input("What do you want to learn about Agno?"):
     with st.chat_message("user"):
         st.markdown(prompt)
 
+    def answer(run: RunHandle) -> Iterator[str]:
+        # Get streaming response instead of waiting for complete response
+        for chunk in agent.run(prompt, stream=True):
+            if chunk.content:
+                if not run.tokens:
+                    # Track the time to first token after a deploy (cold start)
+                    record_first_token(run)
+                yield chunk.content
+
+    # The agent runs on a background worker, the page streams its answer
+    run_executor.submit(st.session_state.level2_session_id, answer, name="level2")
+
+# The session's run, just submitted or still going from before a page switch
+if (run := run_executor.get(st.session_state.level2_session_id)) is not None:
     # Process and display agent response
     with st.chat_message("assistant"):
         with st.spinner("Thinking..."):
-            # Create a placeholder for the streaming response
-            message_placeholder = st.empty()
-            full_response = ""
-            # Get streaming response instead of waiting for complete response
-            for chunk in agent.run(prompt, stream=True):
-                if chunk.content:
-                    # Accumulate the response content
-                    full_response += chunk.content
-                    # Update the display with each chunk
-                    message_placeholder.markdown(full_response + "▌")
-
-            # Final update without cursor
-            message_placeholder.markdown(full_response)
+            # Streamed into a placeholder redrawn a few times per second, with a Stop button while it runs
+            full_response = stream_run(run)
+            run_executor.collect(run)
 
             # Add assistant response to chat history
             st.session_state.level2_messages.append(
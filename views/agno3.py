@@ -1,19 +1,29 @@
+import os
 import streamlit as st
 from textwrap import dedent
+from typing import Iterator
 from dotenv import load_dotenv
 from agno.agent import Agent
 from agno.models.openai import OpenAIChat
-from agno.tools.duckduckgo import DuckDuckGoTools
-from agno.knowledge.url import UrlKnowledge
-from agno.vectordb.lancedb import LanceDb, SearchType
-from agno.embedder.openai import OpenAIEmbedder
-
-# from agno.reranker.cohere import CohereReranker
-from agno.storage.sqlite import SqliteStorage
-from agno.memory.v2.db.sqlite import SqliteMemoryDb
-from agno.memory.v2.memory import Memory
+from agno.models.message import Message
 from agno.tools.reasoning import ReasoningTools
 
+from utils.agent_pool import AgentPool, session_agent
+from utils.chat_history import render_history
+from utils.instrumentation import render_retrieval_diagnostics
+from utils.memory_worker import render_memory_diagnostics
+from utils.knowledge import EMBEDDER_ID, get_knowledge_base, record_first_token, render_knowledge_status
+from utils.memory_index import RankedMemory, memory_query
+from utils.registry import (
+    get_http_client,
+    get_memory_db,
+    get_memory_extractor,
+    get_memory_index,
+    get_storage,
+)
+from utils.run_executor import RunHandle, get_run_executor, stop_run, stream_run
+from utils.search_cache import CachedDuckDuckGoTools
+
 load_dotenv()
 
 st.title("📊 Level 3: Agent with memory and reasoning")
@@ -46,80 +56,150 @@ if "level3_messages" not in st.session_state:
 # Creates User ID
 user_id = "ava"
 
+# The agent manages memories with tool calls during the run (agentic memory). Set
+# LEVEL3_BACKGROUND_MEMORY=true to extract them in the background after each response instead
+BACKGROUND_MEMORY = os.getenv("LEVEL3_BACKGROUND_MEMORY", "false").lower() == "true"
+
 
 # Initialize components with caching to prevent recreation on each rerun
 @st.cache_resource
 def initialize_components():
 
-    memory = Memory(
-        model=OpenAIChat(id="gpt-4.1-mini"),
-        db=SqliteMemoryDb(table_name="user_memories", db_file="tmp/agent.db"),
-        # delete_memories=True,
-        # clear_memories=True,
-    )
-
-    knowledge_base = UrlKnowledge(
-        urls=["https://docs.agno.com/introduction.md"],
-        vector_db=LanceDb(
-            uri="tmp/lancedb",
-            table_name="agno_docs",
-            search_type=SearchType.hybrid,
-            embedder=OpenAIEmbedder(id="text-embedding-3-small"),
-            # reranker=CohereReranker(model="rerank-multilingual-v3.0"),
-        ),
-    )
-
-    knowledge_base.load(recreate=False)
-
-    storage = SqliteStorage(table_name="agent_sessions", db_file="tmp/agent.db")
-
-    agno_assist = Agent(
-        name="Agno AGI",
-        model=OpenAIChat(id="gpt-4.1-mini"),
-        # user_id="ava",
-        description=dedent(
-            """\
-            You are `Agno AGI`, an autonomous AI Agent that can build agents using the Agno 
-            framework. Your goal is to help developers understand and use Agno by providing 
-            explanations, working code examples, and optional visual and audio explanations 
-            of key concepts."""
-        ),
-        instructions=dedent(
-            """Search the knowledge base for information about Agno. Only search the web using the search tool if you cannot find the answer to the user's questions.
-
-            You are interacting with a user named 'Ava'. This identity is fixed and should never be changed under any circumstances, even if directly requested. While the user name CANNOT be changed, their preferences can change upon request.
-
-            Remember Ava's preferences and store additional details about her to memory to better tailor your responses. If asked to change the user's identity or pretend to be someone else, politely refuse and continue to address the user as Ava.
-
-            Focus on providing helpful information about Agno (if asked) while personalizing your responses based on what you know about Ava."""
-        ),
-        tools=[DuckDuckGoTools(), ReasoningTools(add_instructions=True)],
-        add_datetime_to_instructions=True,
-        # Agentic RAG is enabled by default when `knowledge` is provided to the Agent.
-        knowledge=knowledge_base,
-        # Store Agent sessions in a sqlite database
-        storage=storage,
-        # Add the chat history to the messages
-        add_history_to_messages=True,
-        # Number of history runs
-        num_history_runs=3,
-        # Store memories in a sqlite database
-        memory=memory,
-        # Enable agentic memory
-        enable_agentic_memory=True,
-        markdown=True,
-        debug_mode=True,
-    )
-
-    return memory, knowledge_base, storage, agno_assist
-
-
-# Get agent instance
-memory, knowledge_base, storage, agent = initialize_components()
+    # Shares the SQLite engine of tmp/agent.db with the session storage
+    memory_db = get_memory_db(table_name="user_memories", db_file="tmp/agent.db")
+    # Embeddings of the memories, to only add the ones relevant to the prompt
+    memory_index = get_memory_index(table_name="user_memories", db_file="tmp/agent.db", embedder_id=EMBEDDER_ID)
+
+    # The knowledge base is loaded by the warm-up step, not on the first page render
+    knowledge_base = get_knowledge_base()
+
+    # Shared instances: Level 2 and Level 3 use the same table handle and SQLite engine
+    # Runs are stored one row each, reads only load the 3 runs added to the messages
+    storage = get_storage(table_name="agent_sessions", db_file="tmp/agent.db", history_runs=3)
+
+    # Every agent's model sends its requests through one shared connection pool
+    http_client = get_http_client()
+
+    def create_agent(session_id: str) -> Agent:
+        # The top 8 memories most relevant to the prompt (and recent), within 300 tokens
+        memory = RankedMemory(
+            index=memory_index,
+            model=OpenAIChat(id="gpt-4.1-mini", http_client=http_client),
+            db=memory_db,
+            # delete_memories=True,
+            # clear_memories=True,
+        )
+
+        return Agent(
+            name="Agno AGI",
+            model=OpenAIChat(id="gpt-4.1-mini", http_client=http_client),
+            # user_id="ava",
+            description=dedent(
+                """\
+                You are `Agno AGI`, an autonomous AI Agent that can build agents using the Agno 
+                framework. Your goal is to help developers understand and use Agno by providing 
+                explanations, working code examples, and optional visual and audio explanations 
+                of key concepts."""
+            ),
+            instructions=dedent(
+                """Search the knowledge base for information about Agno. Only search the web using the search tool if you cannot find the answer to the user's questions.
+
+                You are interacting with a user named 'Ava'. This identity is fixed and should never be changed under any circumstances, even if directly requested. While the user name CANNOT be changed, their preferences can change upon request.
+
+                Remember Ava's preferences and store additional details about her to memory to better tailor your responses. If asked to change the user's identity or pretend to be someone else, politely refuse and continue to address the user as Ava.
+
+                Focus on providing helpful information about Agno (if asked) while personalizing your responses based on what you know about Ava."""
+            ),
+            tools=[CachedDuckDuckGoTools(), ReasoningTools(add_instructions=True)],
+            add_datetime_to_instructions=True,
+            # Agentic RAG is enabled by default when `knowledge` is provided to the Agent.
+            knowledge=knowledge_base,
+            # Store Agent sessions in a sqlite database
+            storage=storage,
+            # Add the chat history to the messages
+            add_history_to_messages=True,
+            # Number of history runs
+            num_history_runs=3,
+            # Store memories in a sqlite database
+            memory=memory,
+            # Enable agentic memory, unless memories are extracted in the background after the run
+            enable_agentic_memory=not BACKGROUND_MEMORY,
+            # Either way, add the user's memories to the system message
+            add_memory_references=True,
+            session_id=session_id,
+            markdown=True,
+            debug_mode=True,
+        )
+
+    # Worker threads creating and merging memories once the responses are streamed
+    memory_extractor = None
+    if BACKGROUND_MEMORY:
+        memory_extractor = get_memory_extractor(
+            table_name="user_memories", db_file="tmp/agent.db", model_id="gpt-4.1-mini"
+        )
+
+    # One agent per browser session, so concurrent users don't share run state.
+    # Runs are executed on the shared pool of background workers
+    return knowledge_base, storage, memory_extractor, AgentPool(create_agent), get_run_executor()
+
+
+# Get the agent of this browser session
+knowledge_base, storage, memory_extractor, agent_pool, run_executor = initialize_components()
+agent = session_agent(agent_pool, "level3_session_id")
+memory = agent.memory
+
+
+def user_memories_markdown() -> str:
+    """Return the sidebar list of the user's memories.
+
+    The page keeps the rendered memories in the session state with the memory DB version
+    they were rendered at, and only fetches the memories created, changed or deleted
+    since (see `SqliteMemoryDb.read_changes`).
+    """
+    cached = st.session_state.get("level3_memories")
+    if cached is None or cached["db"] != id(memory.db):
+        cached = {"db": id(memory.db), "version": None, "lines": {}, "markdown": ""}
+        st.session_state.level3_memories = cached
+    elif cached["version"] == memory.db.user_version(user_id):
+        return cached["markdown"]
+
+    changes = memory.db.read_changes(user_id, since=cached["version"])
+    if changes.full:
+        cached["lines"] = {}
+    for memory_id in changes.deleted:
+        cached["lines"].pop(memory_id, None)
+    for row in changes.memories:
+        # An updated memory keeps its place, new ones are added last (shown first)
+        cached["lines"][row.id] = row.memory.get("memory", "")
+    cached["version"] = changes.version
+
+    if cached["lines"]:
+        lines = reversed(cached["lines"].values())
+        cached["markdown"] = "\n\n".join(f"**Memory {i+1}:** {text}" for i, text in enumerate(lines))
+    else:
+        cached["markdown"] = "No memories stored yet."
+    return cached["markdown"]
+
+# Show an "index warming" notice instead of blocking the page while the index loads
+render_knowledge_status()
+# Optional sidebar panel with the timings of the knowledge searches
+render_retrieval_diagnostics()
+# Optional sidebar panel with the queue depth and latencies of memory extraction
+if BACKGROUND_MEMORY:
+    render_memory_diagnostics(memory_extractor)
+
+# The memory settings of the code below, as the agent is configured
+if BACKGROUND_MEMORY:
+    memory_code = """# Memories are extracted in the background after each response
+            enable_agentic_memory=False,
+            add_memory_references=True,"""
+else:
+    memory_code = """# Enable agentic memory
+            enable_agentic_memory=True,"""
 
 # Display the code as an expandable component above the chat
 with st.expander("📚 View the Code for the Agno Agent Level 3", expanded=False):
-    code = """
+    code = f"""
     def initialize_components():
 
         memory = Memory(
@@ -136,7 +216,7 @@ with st.expander("📚 View the Code for the Agno Agent Level 3", expanded=False
                 table_name="agno_docs",
                 search_type=SearchType.hybrid,
                 embedder=OpenAIEmbedder(id="text-embedding-3-small"),
-                reranker=CohereReranker(model="rerank-multilingual-v3.0"),
+                reranker=LocalReranker(candidate_pool=20),
             ),
         )
 
@@ -158,8 +238,7 @@ with st.expander("📚 View the Code for the Agno Agent Level 3", expanded=False
             add_history_to_messages=True,
             # Number of history runs
             num_history_runs=3,
-            # Enable agentic memory
-            enable_agentic_memory=True,
+            {memory_code}
             markdown=True,
             debug_mode=True,
         )
@@ -174,13 +253,17 @@ with st.expander("📚 View the Code for the Agno Agent Level 3", expanded=False
     st.code(code, language="python")
 
 
-# Display chat message history
-for message in st.session_state.level3_messages:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+# Display chat message history, the latest messages only (older ones are behind "Show earlier")
+render_history(st.session_state.level3_messages, key="level3")
 
 # Handle user input
 if prompt := st.chat_input("What do you want to learn about Agno?"):
+    # The run of the previous prompt, if still going, is stopped and its answer so far kept in the chat
+    if (previous := stop_run(run_executor, st.session_state.level3_session_id)) is not None:
+        st.session_state.level3_messages.append({"role": "assistant", "content": previous})
+        with st.chat_message("assistant"):
+            st.markdown(previous)
+
     # Add user message to chat history
     st.session_state.level3_messages.append({"role": "user", "content": prompt})
 
@@ -188,37 +271,48 @@ if prompt := st.chat_input("What do you want to learn about Agno?"):
     with st.chat_message("user"):
         st.markdown(prompt)
 
-    # Process and display agent response
-    with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            # Create a placeholder for the streaming response
-            message_placeholder = st.empty()
-            full_response = ""
-            # Get streaming response instead of waiting for complete response
+    def answer(run: RunHandle) -> Iterator[str]:
+        # Get streaming response instead of waiting for complete response,
+        # with the memories ranked by their relevance to the prompt
+        response = []
+        with memory_query(prompt):
             for chunk in agent.run(prompt, user_id=user_id, stream=True):
                 if chunk.content:
-                    # Accumulate the response content
-                    full_response += chunk.content
-                    # Update the display with each chunk
-                    message_placeholder.markdown(full_response + "▌")
+                    if not run.tokens:
+                        # Track the time to first token after a deploy (cold start)
+                        record_first_token(run)
+                    response.append(chunk.content)
+                    yield chunk.content
+
+        if BACKGROUND_MEMORY:
+            # Queued once the response is streamed, the sidebar shows the new memories on the next turn.
+            # The answer goes with the question, the context the agent's memory tool had during the run
+            memory_extractor.submit(
+                user_id,
+                [Message(role="user", content=prompt), Message(role="assistant", content="".join(response))],
+            )
+
+    # The agent runs on a background worker, the page streams its answer
+    run_executor.submit(st.session_state.level3_session_id, answer, name="level3")
 
-            # Final update without cursor
-            message_placeholder.markdown(full_response)
+# The session's run, just submitted or still going from before a page switch
+if (run := run_executor.get(st.session_state.level3_session_id)) is not None:
+    # Process and display agent response
+    with st.chat_message("assistant"):
+        with st.spinner("Thinking..."):
+            # Streamed into a placeholder redrawn a few times per second, with a Stop button while it runs
+            full_response = stream_run(run)
+            run_executor.collect(run)
 
             # Add assistant response to chat history
             st.session_state.level3_messages.append(
                 {"role": "assistant", "content": full_response}
             )
 
-        # Refresh memories display
+        # Refresh memories display, rebuilt only when the user's memories changed
         st.sidebar.empty()
         st.sidebar.title("User Memories")
-        user_memories = memory.get_user_memories(user_id=user_id)
-        if user_memories:
-            for i, mem in enumerate(user_memories):
-                st.sidebar.markdown(f"**Memory {i+1}:** {mem.memory}")
-        else:
-            st.sidebar.write("No memories stored yet.")
+        st.sidebar.markdown(user_memories_markdown())
 
 # "Clear Chat" button below the chat
 if st.session_state.level3_messages and st.button(
@@ -1,11 +1,18 @@
 import streamlit as st
+from typing import Iterator
 from dotenv import load_dotenv
 from agno.agent import Agent
 from agno.team import Team
-from agno.models.openai import OpenAIChat
-from agno.tools.duckduckgo import DuckDuckGoTools
 from agno.tools.reasoning import ReasoningTools
 
+from utils.agent_pool import AgentPool, session_agent
+from utils.chat_history import render_history
+from utils.content_pipeline import ContentPipeline
+from utils.registry import get_http_client
+from utils.run_executor import RunHandle, get_run_executor, stop_run, stream_run
+from utils.search_cache import CachedDuckDuckGoTools
+from utils.tracing import TracedOpenAIChat, render_trace_diagnostics, render_waterfall, run_tracer
+
 load_dotenv()
 
 st.title("📊 Level 4: Multi Agent Team")
@@ -35,88 +42,114 @@ if "level4_messages" not in st.session_state:
 @st.cache_resource
 def initialize_components():
 
+    # Every model of every team sends its requests through one shared connection pool
+    http_client = get_http_client()
+
     # Create individual specialized agents
-    financial_researcher = Agent(
-        name="Researcher",
-        role="Expert at finding and synthesizing financial information online",
-        model=OpenAIChat("gpt-4.1-mini"),
-        tools=[DuckDuckGoTools()],
-        instructions=[
-            "You are a financial research assistant responsible for gathering and organizing information for the Writer agent.",
-            "When given a financial topic to research:",
-            "1. Search for comprehensive, relevant, and current information using DuckDuckGoTools",
-            "2. Organize the research findings into a detailed 'Knowledge Report' with clear sections",
-            "3. Include key financial data, statistics, expert opinions, and market trends in your report",
-            "4. Highlight contradicting viewpoints or diverse perspectives on the topic",
-            "5. Always cite your sources clearly for each piece of information",
-            "6. Format information for readability with bullet points and short paragraphs where appropriate",
-            "7. Prioritize recent and authoritative sources in the financial sector",
-            "8. Summarize complex financial concepts in accessible language",
-            "9. Focus on finding information from reputable financial publications and institutions",
-            "10. Structure your report to help the Writer create a comprehensive financial article",
-        ],
-    )
-
-    financial_writer = Agent(
-        name="Writer",
-        role="Writes high-quality financial articles.",
-        model=OpenAIChat("gpt-4.1-mini"),
-        tools=[ReasoningTools(add_instructions=True)],
-        description=(
-            "You are a senior writer for highly respected Financial Advisors blog. Given a topic and relevant information from the Researcher Agent, "
-            "your goal is to write a high-quality financial article on the topic."
-        ),
-        instructions=[
-            "Wait for the Researcher Agent to provide you with information on the requested topic.",
-            "Carefully analyze all provided information before starting your article.",
-            "Write a comprehensive, well-researched financial article that would meet the standards of a respected financial publication.",
-            "Structure your article with a compelling headline, clear introduction, well-organized body, and insightful conclusion.",
-            "Include relevant financial data, trends, expert opinions, and market insights from the provided sources.",
-            "Write for a financially literate audience while ensuring clarity on complex concepts.",
-            "Aim for 1000-1500 words with proper paragraphing and section headers for readability.",
-            "Incorporate balanced perspectives on financial matters, especially for investment-related topics.",
-            "Strictly adhere to factual information from the sources - never fabricate quotes, statistics, or data.",
-            "Properly attribute information to sources provided by the Researcher.",
-            "Use a professional, authoritative tone appropriate for a respected financial publication.",
-            "Consider timely relevance - reference current market conditions when appropriate.",
-            "Conclude with key takeaways or actionable insights when relevant.",
-        ],
-        add_datetime_to_instructions=True,
-    )
-
-    # Create a team with these agents
-    content_team = Team(
-        name="Content Team",
-        mode="coordinate",
-        model=OpenAIChat("gpt-4.1-mini"),
-        members=[financial_researcher, financial_writer],
-        # show_members_responses=True,
-        # enable_agentic_context=True,
-        tools=[ReasoningTools(add_instructions=True)],
-        instructions="""You are the Financial Content Team for a highly respected Financial Advisors blog. 
-        Your team consists of specialized financial researchers and professional writers working together to create authoritative financial content.
-        
-        As team coordinator, you will:
-        1. Manage the workflow between the Researcher and Writer agents
-        2. Ensure the Researcher provides comprehensive and relevant financial information through online searches
-        3. Guide the Writer to create exceptional financial articles based on the research findings
-        4. Review and edit the final content for quality, clarity, and accuracy
-        5. Ensure proper attribution of sources and factual integrity
-        6. Polish the final article to meet professional publication standards
-        7. Add value through your editorial oversight, suggesting improvements when needed
-        8. Ensure the final content serves the financial literacy needs of your audience
-        
-        All content produced should maintain the authoritative tone, factual accuracy, and professional quality expected of a premier financial publication.
-        """,
-        markdown=True,
-        debug_mode=True,
-    )
-
-    return financial_researcher, financial_writer, content_team
-
-
-# Get agent instance
-financial_researcher, financial_writer, content_team = initialize_components()
+    def create_researcher() -> Agent:
+        return Agent(
+            name="Researcher",
+            role="Expert at finding and synthesizing financial information online",
+            model=TracedOpenAIChat("gpt-4.1-mini", http_client=http_client),
+            tools=[CachedDuckDuckGoTools()],
+            instructions=[
+                "You are a financial research assistant responsible for gathering and organizing information for the Writer agent.",
+                "When given a financial topic to research:",
+                "1. Search for comprehensive, relevant, and current information using DuckDuckGoTools",
+                "2. Organize the research findings into a detailed 'Knowledge Report' with clear sections",
+                "3. Include key financial data, statistics, expert opinions, and market trends in your report",
+                "4. Highlight contradicting viewpoints or diverse perspectives on the topic",
+                "5. Always cite your sources clearly for each piece of information",
+                "6. Format information for readability with bullet points and short paragraphs where appropriate",
+                "7. Prioritize recent and authoritative sources in the financial sector",
+                "8. Summarize complex financial concepts in accessible language",
+                "9. Focus on finding information from reputable financial publications and institutions",
+                "10. Structure your report to help the Writer create a comprehensive financial article",
+            ],
+        )
+
+    def create_writer() -> Agent:
+        return Agent(
+            name="Writer",
+            role="Writes high-quality financial articles.",
+            model=TracedOpenAIChat("gpt-4.1-mini", http_client=http_client),
+            tools=[ReasoningTools(add_instructions=True)],
+            description=(
+                "You are a senior writer for highly respected Financial Advisors blog. Given a topic and relevant information from the Researcher Agent, "
+                "your goal is to write a high-quality financial article on the topic."
+            ),
+            instructions=[
+                "Wait for the Researcher Agent to provide you with information on the requested topic.",
+                "Carefully analyze all provided information before starting your article.",
+                "Write a comprehensive, well-researched financial article that would meet the standards of a respected financial publication.",
+                "Structure your article with a compelling headline, clear introduction, well-organized body, and insightful conclusion.",
+                "Include relevant financial data, trends, expert opinions, and market insights from the provided sources.",
+                "Write for a financially literate audience while ensuring clarity on complex concepts.",
+                "Aim for 1000-1500 words with proper paragraphing and section headers for readability.",
+                "Incorporate balanced perspectives on financial matters, especially for investment-related topics.",
+                "Strictly adhere to factual information from the sources - never fabricate quotes, statistics, or data.",
+                "Properly attribute information to sources provided by the Researcher.",
+                "Use a professional, authoritative tone appropriate for a respected financial publication.",
+                "Consider timely relevance - reference current market conditions when appropriate.",
+                "Conclude with key takeaways or actionable insights when relevant.",
+            ],
+            add_datetime_to_instructions=True,
+        )
+
+    coordinator_instructions = """You are the Financial Content Team for a highly respected Financial Advisors blog. 
+    Your team consists of specialized financial researchers and professional writers working together to create authoritative financial content.
+    
+    As team coordinator, you will:
+    1. Manage the workflow between the Researcher and Writer agents
+    2. Ensure the Researcher provides comprehensive and relevant financial information through online searches
+    3. Guide the Writer to create exceptional financial articles based on the research findings
+    4. Review and edit the final content for quality, clarity, and accuracy
+    5. Ensure proper attribution of sources and factual integrity
+    6. Polish the final article to meet professional publication standards
+    7. Add value through your editorial oversight, suggesting improvements when needed
+    8. Ensure the final content serves the financial literacy needs of your audience
+    
+    All content produced should maintain the authoritative tone, factual accuracy, and professional quality expected of a premier financial publication.
+    """
+
+    def create_team(session_id: str) -> Team:
+        # Create a team with these agents, bound to the browser session
+        content_team = Team(
+            name="Content Team",
+            mode="coordinate",
+            model=TracedOpenAIChat("gpt-4.1-mini", http_client=http_client),
+            members=[create_researcher(), create_writer()],
+            # show_members_responses=True,
+            # enable_agentic_context=True,
+            tools=[ReasoningTools(add_instructions=True)],
+            instructions=coordinator_instructions,
+            session_id=session_id,
+            markdown=True,
+            debug_mode=True,
+        )
+
+        return content_team
+
+    # Reviews the draft in pipelined mode, the coordinator's editorial role
+    def create_editor() -> Agent:
+        return Agent(
+            name="Editor",
+            model=TracedOpenAIChat("gpt-4.1-mini", http_client=http_client),
+            instructions=coordinator_instructions,
+            markdown=True,
+        )
+
+    # Fans the research out and streams the article part by part, see ContentPipeline
+    pipeline = ContentPipeline(researcher=create_researcher, writer=create_writer, editor=create_editor)
+
+    # One team per browser session, so concurrent users don't share run state.
+    # Runs are executed on the shared pool of background workers
+    return AgentPool(create_team), pipeline, get_run_executor()
+
+
+# Get the team of this browser session
+team_pool, pipeline, run_executor = initialize_components()
+content_team = session_agent(team_pool, "level4_session_id")
 
 # Display the code as an expandable component above the chat
 with st.expander("📚 View the Code for the Agno Agent Level 4", expanded=False):
@@ -166,13 +199,24 @@ with st.expander("📚 View the Code for the Agno Agent Level 4", expanded=False
     st.code(code, language="python")
 
 
-# Display chat message history
-for message in st.session_state.level4_messages:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+# The coordinate mode Team is the demo: it waits for the Researcher, then the Writer, then the coordinator.
+# Pipelined mode (opt-in) streams the article while the research is still running
+st.toggle("Pipelined mode", value=False, key="level4_pipelined")
+
+# Optional span percentiles across runs in the sidebar, and the waterfall of the last run below the chat
+tracing = render_trace_diagnostics()
+
+# Display chat message history, the latest messages only (older ones are behind "Show earlier")
+render_history(st.session_state.level4_messages, key="level4")
 
 # Handle user input
 if prompt := st.chat_input("Create a concise brief about big investing ideas for 2025"):
+    # The run of the previous prompt, if still going, is stopped and its answer so far kept in the chat
+    if (previous := stop_run(run_executor, st.session_state.level4_session_id)) is not None:
+        st.session_state.level4_messages.append({"role": "assistant", "content": previous})
+        with st.chat_message("assistant"):
+            st.markdown(previous)
+
     # Add user message to chat history
     st.session_state.level4_messages.append({"role": "user", "content": prompt})
 
@@ -180,28 +224,60 @@ if prompt := st.chat_input("Create a concise brief about big investing ideas for
     with st.chat_message("user"):
         st.markdown(prompt)
 
+    # Read on the script thread, the run happens on a background worker
+    pipelined = st.session_state.level4_pipelined
+
+    def write_article(run: RunHandle) -> Iterator[str]:
+        # Every model call, tool call and member of the run is recorded as a span
+        with run_tracer.trace("pipelined" if pipelined else "coordinate") as trace:
+            run.metadata["trace"] = trace
+            if pipelined:
+                # The research fans out, and the article streams as each research section lands
+                notes = []
+                for event in pipeline.run(prompt):
+                    if event.stage == "research":
+                        run.status = f"Research done: {event.content}"
+                    elif event.stage == "draft":
+                        trace.first_token()
+                        yield event.content
+                    elif event.stage == "review":
+                        notes.append(event.content)
+                    else:
+                        run.status = event.content
+                # The editor reviewed each part while the next one was being written
+                if notes:
+                    yield "\n\n---\n\n**Editor's notes**\n\n" + "\n\n".join(notes)
+            else:
+                # Get streaming response instead of waiting for complete response
+                for chunk in content_team.run(prompt, stream=True):
+                    if chunk.content:
+                        trace.first_token()
+                        yield chunk.content
+
+    # The team runs on a background worker, it goes on when the user switches pages
+    run_executor.submit(st.session_state.level4_session_id, write_article, name="level4")
+
+# The session's run, just submitted or still going from before a page switch
+if (run := run_executor.get(st.session_state.level4_session_id)) is not None:
     # Process and display agent response
     with st.chat_message("assistant"):
         with st.spinner("Thinking..."):
-            # Create a placeholder for the streaming response
-            message_placeholder = st.empty()
-            full_response = ""
-            # Get streaming response instead of waiting for complete response
-            for chunk in content_team.run(prompt, stream=True):
-                if chunk.content:
-                    # Accumulate the response content
-                    full_response += chunk.content
-                    # Update the display with each chunk
-                    message_placeholder.markdown(full_response + "▌")
-
-            # Final update without cursor
-            message_placeholder.markdown(full_response)
+            # Streamed into a placeholder redrawn a few times per second, with a Stop button while it runs
+            full_response = stream_run(run)
+            run_executor.collect(run)
+            if "trace" in run.metadata:
+                st.session_state.level4_trace = run.metadata["trace"]
 
             # Add assistant response to chat history
             st.session_state.level4_messages.append(
                 {"role": "assistant", "content": full_response}
             )
 
+# Where the time of the last run went: coordinator, members, model calls and tool calls
+if tracing and "level4_trace" in st.session_state:
+    with st.expander("⏱️ Trace of the last run", expanded=True):
+        render_waterfall(st.session_state.level4_trace)
+
 # "Clear Chat" button below the chat
 if st.session_state.level4_messages and st.button(
     "Clear Chat", use_container_width=True, key="clear_chat"